@@ -0,0 +1,260 @@
+#
+# Error analysis: distances and errors in ulps, singly and in bulk over packed buffers
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+
+from fractions import Fraction
+from struct import unpack
+
+from .ieee754 import Binary, host_endianness
+
+
+__all__ = ()
+
+
+def ulp_distance(a, b):
+    '''Return the number of ulps between a and b, two non-NaN values of the same format: the
+    number of times next_up() must be applied to the lesser to reach the greater.  Zeroes are
+    zero ulps apart.'''
+    if a.fmt != b.fmt:
+        raise ValueError('ulp_distance requires values of the same format')
+    if a.is_nan() or b.is_nan():
+        raise ValueError('ulp_distance of a NaN')
+    return _key_distance(a.total_order_key(), b.total_order_key())
+
+
+def _key_distance(a_key, b_key):
+    distance = abs(a_key - b_key)
+    # The two zeroes have adjacent keys but are the same value
+    if (a_key < 0) != (b_key < 0):
+        distance -= 1
+    return distance
+
+
+def ulp_error(approx, exact):
+    '''Return the error of approx in ulps of its format as an exact Fraction.
+
+    exact is the reference value, typically of a wider format, or anything else with an
+    as_integer_ratio() method such as an int or Fraction.  The ulp is that of exact in
+    approx's format.  The error is computed exactly with integer arithmetic.  The error is
+    zero if both are NaNs or infinities of the same sign; otherwise neither can be a NaN or
+    infinity.
+    '''
+    if not approx.is_finite() or (isinstance(exact, Binary) and not exact.is_finite()):
+        if isinstance(exact, Binary):
+            if approx.is_nan() and exact.is_nan():
+                return Fraction(0)
+            if approx.is_infinite() and exact.is_infinite() and approx.sign == exact.sign:
+                return Fraction(0)
+        raise ValueError('ulp_error of a NaN or infinity')
+    return _ratio_error(approx.fmt, *approx.as_integer_ratio(), *exact.as_integer_ratio())
+
+
+def _ulp_exponent(fmt, n, d):
+    # The exponent of the ulp of n / d in fmt, where d is positive
+    n = abs(n)
+    if n == 0:
+        return fmt.e_min - (fmt.precision - 1)
+    # The exponent of the most significant bit; the estimate is at most one too high
+    exponent = n.bit_length() - d.bit_length()
+    if (n < d << exponent) if exponent >= 0 else (n << -exponent < d):
+        exponent -= 1
+    return max(exponent, fmt.e_min) - (fmt.precision - 1)
+
+
+def _ratio_error(fmt, an, ad, xn, xd):
+    # The error of an / ad in ulps of xn / xd in fmt; denominators are positive
+    ulp_exponent = _ulp_exponent(fmt, xn, xd)
+    numerator = abs(an * xd - xn * ad)
+    denominator = ad * xd
+    if ulp_exponent >= 0:
+        denominator <<= ulp_exponent
+    else:
+        numerator <<= -ulp_exponent
+    return Fraction(numerator, denominator)
+
+
+class ErrorReport:
+    '''The result of comparing a buffer of approximations with references.
+
+    count is the number of pairs compared.  histogram maps an error bucket to the number of
+    pairs whose error lies in it; a bucket is the lower bound of its errors.  max_error is
+    the largest error and max_index the index of its first occurrence, or None if no pairs
+    were comparable.  invalid lists the indices of the pairs that could not be compared, for
+    example a NaN and a number.
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.histogram = {}
+        self.max_error = None
+        self.max_index = None
+        self.invalid = []
+
+    def __repr__(self):
+        return (f'<ErrorReport count={self.count:,d} max_error={self.max_error} '
+                f'max_index={self.max_index} invalid={len(self.invalid):,d}>')
+
+
+def _encodings(fmt, raw, endianness):
+    # Return the encodings in the packed buffer raw as a sequence of integers
+    if not fmt.fmt_width:
+        raise RuntimeError('not an interchange format')
+    size = fmt.fmt_width // 8
+    if len(raw) % size:
+        raise ValueError(f'buffer length {len(raw):,d} is not a multiple of {size}')
+    endianness = endianness or host_endianness
+    code = {2: 'H', 4: 'I', 8: 'Q'}.get(size)
+    if code:
+        order = '<' if endianness == 'little' else '>'
+        return unpack(f'{order}{len(raw) // size}{code}', raw)
+    return [int.from_bytes(raw[n: n + size], endianness) for n in range(0, len(raw), size)]
+
+
+def _decoder(fmt):
+    '''Return a function that maps an encoding of fmt to the total order key of the value and
+    an exact representation (m, q) of it as m * 2^q, or None if it is not finite.'''
+    int_bit = fmt.int_bit
+    implicit = fmt.fmt_width % 8 == 1
+    shift = fmt.precision - implicit
+    sign_bit = (fmt.e_max + 1) * 2 << shift
+    magnitude_mask = sign_bit - 1
+    e_all_ones = fmt.e_max * 2 + 1
+    subnormal_q = fmt.e_min - (fmt.precision - 1)
+    q_offset = fmt.e_bias + fmt.precision - 1
+
+    if not implicit:
+        size = fmt.fmt_width // 8
+        unpack_value = fmt._unpack_value_quiet
+
+        def decode(encoding):
+            value = unpack_value(encoding.to_bytes(size, 'little'), 'little')
+            if not value.is_finite():
+                return value.total_order_key(), None
+            m = -value.significand if value.sign else value.significand
+            return value.total_order_key(), (m, value.exponent_int())
+
+        return decode
+
+    def decode(encoding):
+        magnitude = encoding & magnitude_mask
+        key = encoding if encoding == magnitude else -magnitude - 1
+        e_field = magnitude >> shift
+        if e_field == e_all_ones:
+            return key, None
+        significand = magnitude & (int_bit - 1)
+        if e_field:
+            significand |= int_bit
+            q = e_field - q_offset
+        else:
+            q = subnormal_q
+        return key, (-significand if key < 0 else significand, q)
+
+    return decode
+
+
+def ulp_distances(fmt, approx, reference, endianness=None):
+    '''Compare two buffers of packed values of fmt pairwise and return an ErrorReport of the
+    ulp distances between them.  Histogram buckets are the distances.  Pairs with one NaN
+    are invalid; two NaNs are zero ulps apart.'''
+    approx = _encodings(fmt, approx, endianness)
+    reference = _encodings(fmt, reference, endianness)
+    if len(approx) != len(reference):
+        raise ValueError('buffers hold different numbers of values')
+    report = ErrorReport()
+    histogram = report.histogram
+    if fmt.fmt_width % 8 == 1:
+        # With an implicit integer bit the key of a value is a simple function of its
+        # encoding; see BinaryFormat.iter_range()
+        sign_bit = 1 << (fmt.fmt_width - 2)
+        approx = [a if a < sign_bit else sign_bit - 1 - a for a in approx]
+        reference = [x if x < sign_bit else sign_bit - 1 - x for x in reference]
+    else:
+        decode = _decoder(fmt)
+        approx = [decode(a)[0] for a in approx]
+        reference = [decode(x)[0] for x in reference]
+    # Keys beyond those of the infinities are NaNs
+    inf_key = fmt.make_infinity(False).total_order_key()
+    max_distance = -1
+    max_index = None
+    for index, (a_key, x_key) in enumerate(zip(approx, reference)):
+        a_nan = a_key > inf_key or a_key < -inf_key - 1
+        x_nan = x_key > inf_key or x_key < -inf_key - 1
+        if a_nan or x_nan:
+            if a_nan and x_nan:
+                distance = 0
+            else:
+                report.invalid.append(index)
+                continue
+        else:
+            distance = abs(a_key - x_key)
+            if (a_key < 0) != (x_key < 0):
+                distance -= 1
+        histogram[distance] = histogram.get(distance, 0) + 1
+        if distance > max_distance:
+            max_distance = distance
+            max_index = index
+    report.count = len(approx)
+    if max_index is not None:
+        report.max_error = max_distance
+        report.max_index = max_index
+    return report
+
+
+def ulp_errors(fmt, approx, reference_fmt, reference, endianness=None, resolution=4):
+    '''Compare a buffer of packed values of fmt with a buffer of packed exact reference values
+    of reference_fmt, typically a wider format, pairwise.  Return an ErrorReport of the
+    errors in ulps; see ulp_error().  The histogram buckets are 1/resolution ulps wide and
+    are Fractions.'''
+    approx = _encodings(fmt, approx, endianness)
+    reference = _encodings(reference_fmt, reference, endianness)
+    if len(approx) != len(reference):
+        raise ValueError('buffers hold different numbers of values')
+    report = ErrorReport()
+    buckets = {}
+    decode_approx = _decoder(fmt)
+    decode_reference = _decoder(reference_fmt)
+    e_min = fmt.e_min
+    precision = fmt.precision
+    # The largest error so far is max_diff * 2^max_shift
+    max_diff = -1
+    max_shift = 0
+    max_index = None
+    for index, (a, x) in enumerate(zip(approx, reference)):
+        a_key, a_parts = decode_approx(a)
+        x_key, x_parts = decode_reference(x)
+        if a_parts is None or x_parts is None:
+            # Rare; take the general path
+            try:
+                error = ulp_error(fmt.from_total_order_key(a_key),
+                                  reference_fmt.from_total_order_key(x_key))
+            except ValueError:
+                report.invalid.append(index)
+                continue
+            diff, shift = error.numerator, -(error.denominator.bit_length() - 1)
+        else:
+            # Both values are dyadic, so the error is diff * 2^shift for integer diff.  This
+            # avoids building a Fraction for each pair.
+            (am, aq), (xm, xq) = a_parts, x_parts
+            q = min(aq, xq)
+            diff = abs((am << (aq - q)) - (xm << (xq - q)))
+            if xm:
+                ulp_exponent = max(abs(xm).bit_length() - 1 + xq, e_min) - (precision - 1)
+            else:
+                ulp_exponent = e_min - (precision - 1)
+            shift = q - ulp_exponent
+        bucket = (diff * resolution << shift) if shift >= 0 else (diff * resolution >> -shift)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+        if max_index is None or diff and (
+                (diff << shift - max_shift > max_diff) if shift >= max_shift
+                else (diff > max_diff << max_shift - shift)):
+            max_diff, max_shift, max_index = diff, shift, index
+    report.count = len(approx)
+    report.histogram = {Fraction(bucket, resolution): count
+                        for bucket, count in sorted(buckets.items())}
+    if max_index is not None:
+        report.max_error = Fraction(max_diff << max_shift if max_shift >= 0 else max_diff,
+                                    1 if max_shift >= 0 else 1 << -max_shift)
+        report.max_index = max_index
+    return report
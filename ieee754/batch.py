@@ -0,0 +1,162 @@
+#
+# Elementwise evaluation of operations across a pool of worker processes
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+
+from .ieee754 import (
+    Binary, Context, get_context,
+    OP_ADD, OP_SUBTRACT, OP_MULTIPLY, OP_DIVIDE, OP_FMA, OP_CONVERT, OP_FROM_STRING,
+    OP_TO_DECIMAL_STRING, _unpickle_format,
+)
+
+
+__all__ = ()
+
+
+# The number of operand columns each operation takes
+OPERAND_COUNTS = {
+    OP_ADD: 2,
+    OP_SUBTRACT: 2,
+    OP_MULTIPLY: 2,
+    OP_DIVIDE: 2,
+    OP_FMA: 3,
+    OP_CONVERT: 1,
+    OP_FROM_STRING: 1,
+    OP_TO_DECIMAL_STRING: 1,
+}
+
+
+def map(op, fmt, operand_columns, context=None, workers=None, chunksize=None):
+    '''Apply an operation elementwise and return a list of the results in order.
+
+    op is one of OP_ADD, OP_SUBTRACT, OP_MULTIPLY, OP_DIVIDE, OP_FMA, OP_CONVERT,
+    OP_FROM_STRING and OP_TO_DECIMAL_STRING, and is performed as the BinaryFormat method
+    of the same name of fmt, the destination format.  OP_TO_DECIMAL_STRING calls
+    Binary.to_decimal_string() on each value with default arguments and ignores fmt.
+
+    operand_columns is a sequence of equal-length sequences, one per operand of the
+    operation.  The work is split into chunks of chunksize elements and shared among
+    workers processes; if workers is None os.cpu_count() is used, and if it is 1 the
+    work is done in this process.  Binary operands and results are shipped as packed
+    encodings where their format permits.
+
+    Each chunk is evaluated with a fresh context with the rounding, tininess detection,
+    resource limits and handlers of context.  Once all are done, the flags raised are merged
+    into context and any recorded exceptions appended to context.exceptions in order.  If
+    context has counters enabled, the operations counted in each chunk are merged into
+    them.  An exception raised in a worker propagates to the caller.
+    '''
+    count = OPERAND_COUNTS.get(op)
+    if count is None:
+        raise ValueError(f'unsupported batch operation {op!r}')
+    if len(operand_columns) != count:
+        raise ValueError(f'{op} requires {count} operand columns')
+    columns = [list(column) for column in operand_columns]
+    length = len(columns[0])
+    if any(len(column) != length for column in columns):
+        raise ValueError('operand columns must be of equal length')
+
+    context = context or get_context()
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, ceil(length / (workers * 4)))
+    triple = _triple(fmt)
+    limits = (context.max_input_digits, context.max_output_digits, context.max_bit_length,
+              context.max_escalations)
+    state = (context.rounding, context.tininess_after, limits, context.handlers,
+             context.counters is not None)
+    chunks = [(op, triple, [_encode_column(column[start: start + chunksize])
+                            for column in columns], state)
+              for start in range(0, length, chunksize)]
+
+    if workers == 1:
+        chunk_results = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(_run_chunk, chunks))
+
+    results = []
+    for encoded_results, flags, exceptions, counts in chunk_results:
+        results.extend(_decode_column(encoded_results, fmt))
+        context.flags |= flags
+        context.exceptions.extend(exceptions)
+        if counts is not None:
+            context.counters.merge(counts)
+    return results
+
+
+def _run_chunk(chunk):
+    '''Evaluate a chunk of operations.  Runs in a worker process.  Returns a tuple
+    (encoded_results, flags, exceptions, counts) where counts is a snapshot of the
+    operations counted, or None if not counting.'''
+    op, triple, encoded_columns, (rounding, tininess_after, limits, handlers,
+                                  counting) = chunk
+    fmt = _format(triple)
+    max_input_digits, max_output_digits, max_bit_length, max_escalations = limits
+    context = Context(rounding=rounding, tininess_after=tininess_after,
+                      max_input_digits=max_input_digits, max_output_digits=max_output_digits,
+                      max_bit_length=max_bit_length, max_escalations=max_escalations)
+    context.handlers = handlers
+    if counting:
+        context.enable_counters()
+    columns = [_decode_column(column, fmt) for column in encoded_columns]
+
+    if op == OP_TO_DECIMAL_STRING:
+        results = [value.to_decimal_string(context=context) for value in columns[0]]
+    else:
+        method = getattr(fmt, op)
+        results = [method(*operands, context) for operands in zip(*columns)]
+    counters = context.disable_counters()
+    counts = None if counters is None else counters.snapshot()
+    return _encode_column(results), context.flags, context.exceptions, counts
+
+
+def _triple(fmt):
+    return (fmt.precision, fmt.e_max, fmt.e_min)
+
+
+def _format(triple, fmt=None):
+    '''Return the format with the given triple: fmt if it has that triple, so that identity
+    fast paths apply, otherwise the equal interned format if there is one, otherwise an
+    uninterned format.  Formats are never interned.'''
+    if fmt is not None and _triple(fmt) == triple:
+        return fmt
+    return _unpickle_format(triple)
+
+
+def _encode_column(values):
+    '''Return a compact picklable encoding of a list of values.
+
+    Binary values sharing an interchange format are packed into a single bytes object with
+    the format triple given once.  Other Binary values are encoded as their parts.  Other
+    values, such as strings, are passed as-is.'''
+    if values and all(isinstance(value, Binary) for value in values):
+        fmt = values[0].fmt
+        if all(value.fmt is fmt for value in values):
+            if fmt.fmt_width:
+                return ('P', _triple(fmt), b''.join(value.pack('little') for value in values))
+            return ('F', _triple(fmt), [value[1:] for value in values])
+        return ('B', [(_triple(value.fmt), ) + value[1:] for value in values])
+    return ('V', values)
+
+
+def _decode_column(encoded, fmt=None):
+    '''The inverse of _encode_column().  Values with the triple of fmt are decoded to fmt.'''
+    kind = encoded[0]
+    if kind == 'V':
+        return encoded[1]
+    if kind == 'P':
+        fmt = _format(encoded[1], fmt)
+        raw = encoded[2]
+        size = fmt.fmt_width // 8
+        unpack = fmt._unpack_value_quiet
+        return [unpack(raw[start: start + size], 'little') for start in range(0, len(raw), size)]
+    if kind == 'F':
+        fmt = _format(encoded[1], fmt)
+        return [Binary(fmt, *parts) for parts in encoded[2]]
+    return [Binary(_format(triple, fmt), sign, e_biased, significand)
+            for triple, sign, e_biased, significand in encoded[1]]
@@ -0,0 +1,423 @@
+#
+# Benchmark suite timing the public operations across formats and rounding modes.
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+# Usage: python -m ieee754.bench --help
+#
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import platform
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+from .ieee754 import (
+    Binary, BinaryFormat, Context, Flags,
+    IEEEhalf, IEEEsingle, IEEEdouble, IEEEquad, x87extended,
+    ROUND_CEILING, ROUND_FLOOR, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN, ROUND_HALF_UP,
+    ROUND_HALF_DOWN, get_context, local_context,
+)
+
+
+__all__ = ()
+
+
+FORMATS = {
+    'IEEEhalf': IEEEhalf,
+    'IEEEsingle': IEEEsingle,
+    'IEEEdouble': IEEEdouble,
+    'IEEEquad': IEEEquad,
+    'x87extended': x87extended,
+    'IEEE256': BinaryFormat.from_IEEE(256),
+    'wide1024': BinaryFormat.from_triple(1024, (1 << 24) - 1, 2 - (1 << 24)),
+}
+
+ROUNDINGS = (ROUND_CEILING, ROUND_FLOOR, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN,
+             ROUND_HALF_UP, ROUND_HALF_DOWN)
+
+# The format codes used in tests/data, whose following token is a value
+DATA_FORMAT_CODES = {'H', 'S', 'D', 'Q', 'x', 'xd'}
+
+# The number of concurrent asyncio tasks the concurrent benchmarks share their work among
+TASKS = 100
+
+
+class Operation:
+    '''A benchmarked operation.
+
+    make_operands(fmt, pool) returns a list of argument tuples given pool, a list of
+    operand values of format fmt.  make_func(fmt, context) returns the function to time,
+    which is called with each argument tuple.  rounds indicates whether the rounding mode
+    affects the operation.  interchange indicates the operation requires an interchange
+    format.  bulk indicates the operation works on a large pool as a whole; its time is
+    divided by the size of the pool.  size, if not None, is a function of the operands
+    returning the size in bytes per value of their encoding, reported alongside the time.
+    '''
+
+    def __init__(self, name, make_operands, make_func, rounds, interchange=False,
+                 bulk=False, size=None):
+        self.name = name
+        self.make_operands = make_operands
+        self.make_func = make_func
+        self.rounds = rounds
+        self.interchange = interchange
+        self.bulk = bulk
+        self.size = size
+
+
+def _operand_tuples(arity):
+    def make_operands(fmt, pool, rng):
+        return [tuple(rng.choice(pool) for _ in range(arity)) for _ in range(len(pool))]
+    return make_operands
+
+
+def _positive_operands(fmt, pool, rng):
+    return [(value.set_sign(False), ) for value in pool]
+
+
+def _quad_operands(fmt, pool, rng):
+    # The operands of a conversion, in a different format
+    src_fmt = IEEEsingle if fmt is IEEEquad else IEEEquad
+    context = Context()
+    return [(src_fmt.convert(value, context), ) for value in pool]
+
+
+def _int_operands(fmt, pool, rng):
+    return [(rng.getrandbits(rng.randrange(1, fmt.precision * 2)), ) for _ in pool]
+
+
+def _round_operands(fmt, pool, rng):
+    return [(value, rng.randrange(-3, 12)) for value in pool]
+
+
+def _whole_pool(fmt, pool, rng):
+    return [(pool, )]
+
+
+def _bulk_pairs(fmt, pool, rng):
+    return [([(rng.choice(pool), rng.choice(pool)) for _ in pool], )]
+
+
+def _no_operands(fmt, pool, rng):
+    return [() for _ in pool]
+
+
+def _enter_local_context(context):
+    def func():
+        with local_context(context):
+            pass
+    return func
+
+
+async def _add_task(fmt, rounding, pairs):
+    with local_context() as context:
+        context.rounding = rounding
+        for x, y in pairs:
+            fmt.add(x, y)
+            # Yield so that the tasks interleave, switching context on each resumption
+            await asyncio.sleep(0)
+
+
+def _make_concurrent_add(fmt, context):
+    # TASKS concurrent tasks each add their share of the pairs under their own rounding
+    # mode, picking up their context implicitly
+    async def add_all(pairs):
+        await asyncio.gather(*(_add_task(fmt, ROUNDINGS[n % len(ROUNDINGS)], pairs[n::TASKS])
+                               for n in range(TASKS)))
+    return lambda pairs: asyncio.run(add_all(pairs))
+
+
+def _hashable_operands(fmt, pool, rng):
+    # Signalling NaNs cannot be hashed; use their quiet counterparts
+    context = Context()
+    return [(fmt.convert(value, context) if value.is_snan() else value, ) for value in pool]
+
+
+def _pickled_operands(fmt, pool, rng):
+    return [(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ) for value in pool]
+
+
+def _pickle_round_trip(values):
+    return pickle.loads(pickle.dumps(values, pickle.HIGHEST_PROTOCOL))
+
+
+def _pickled_size(operands):
+    values, = operands[0]
+    return len(pickle.dumps(values, pickle.HIGHEST_PROTOCOL)) / len(values)
+
+
+def _hashable_pool(fmt, pool, rng):
+    return [([value for value, in _hashable_operands(fmt, pool, rng)], )]
+
+
+def _string_operands(fmt, pool, rng):
+    context = Context()
+    return [(value.to_decimal_string(context=context), ) for value in pool]
+
+
+def _packed_operands(fmt, pool, rng):
+    return [(value.pack(), ) for value in pool]
+
+
+OPERATIONS = [
+    Operation('add', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: fmt.add(x, y, context), True),
+    Operation('subtract', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: fmt.subtract(x, y, context), True),
+    Operation('multiply', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: fmt.multiply(x, y, context), True),
+    Operation('divide', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: fmt.divide(x, y, context), True),
+    Operation('fma', _operand_tuples(3),
+              lambda fmt, context: lambda x, y, z: fmt.fma(x, y, z, context), True),
+    Operation('sqrt', _positive_operands,
+              lambda fmt, context: lambda x: fmt.sqrt(x, context), True),
+    Operation('remainder', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: x.remainder(y, context), False),
+    Operation('fmod', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: x.fmod(y, context), False),
+    Operation('convert', _quad_operands,
+              lambda fmt, context: lambda x: fmt.convert(x, context), True),
+    Operation('round_to_integral', _operand_tuples(1),
+              lambda fmt, context: lambda x: x.round_to_integral(context.rounding, context),
+              True),
+    Operation('round', _round_operands,
+              lambda fmt, context: lambda x, n: x.round(n, context.rounding, context), True),
+    Operation('from_int', _int_operands,
+              lambda fmt, context: lambda n: fmt.from_int(n, context), True),
+    Operation('from_string', _string_operands,
+              lambda fmt, context: lambda s: fmt.from_string(s, context), True),
+    Operation('to_string', _operand_tuples(1),
+              lambda fmt, context: lambda x: x.to_string(None, context), False),
+    Operation('to_decimal_string', _operand_tuples(1),
+              lambda fmt, context: lambda x: x.to_decimal_string(0, None, context), True),
+    Operation('pack', _operand_tuples(1),
+              lambda fmt, context: lambda x: x.pack(), False, True),
+    Operation('unpack_value', _packed_operands,
+              lambda fmt, context: lambda raw: fmt.unpack_value(raw, None, context), False,
+              True),
+    Operation('compare', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: x.compare(y, context), False),
+    Operation('compare_total', _operand_tuples(2),
+              lambda fmt, context: lambda x, y: x.compare_total(y), False),
+    Operation('next_up', _operand_tuples(1),
+              lambda fmt, context: lambda x: x.next_up(context), False),
+    Operation('hash', _hashable_operands, lambda fmt, context: hash, False),
+    Operation('hash_set', _hashable_pool, lambda fmt, context: set, False, bulk=True),
+    Operation('pickle', _operand_tuples(1),
+              lambda fmt, context: lambda x: pickle.dumps(x, pickle.HIGHEST_PROTOCOL), False),
+    Operation('unpickle', _pickled_operands, lambda fmt, context: pickle.loads, False),
+    # A round trip of a whole list, as when shipping values to another process
+    Operation('pickle_list', _whole_pool, lambda fmt, context: _pickle_round_trip, False,
+              bulk=True, size=_pickled_size),
+    Operation('get_context', _no_operands, lambda fmt, context: get_context, False),
+    Operation('local_context', _no_operands,
+              lambda fmt, context: _enter_local_context(context), False),
+    # Addition under the current context, picked up implicitly
+    Operation('add_implicit', _operand_tuples(2), lambda fmt, context: fmt.add, False),
+    Operation('concurrent_add', _bulk_pairs, _make_concurrent_add, False, bulk=True),
+]
+
+
+def random_pool(fmt, count, rng):
+    '''Return count random finite values of fmt of moderate magnitude, so that operations on
+    them do real work rather than overflow or underflow.'''
+    pool = []
+    span = min(fmt.precision * 2, fmt.e_max)
+    for _ in range(count):
+        exponent = rng.randrange(max(-span, fmt.e_min), span + 1)
+        significand = rng.getrandbits(fmt.precision - 1) | fmt.int_bit
+        pool.append(Binary(fmt, rng.random() < 0.5, exponent + fmt.e_bias, significand))
+    return pool
+
+
+def read_data_strings(data_dir):
+    '''Return a sorted list of the distinct value strings found in the test vectors in
+    data_dir, or an empty list if there are none.'''
+    strings = set()
+    if not os.path.isdir(data_dir):
+        return []
+    context = Context()
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith('.txt'):
+            continue
+        with open(os.path.join(data_dir, filename)) as f:
+            for line in f:
+                tokens = line.split('#')[0].split()
+                for code, token in zip(tokens, tokens[1:]):
+                    if code in DATA_FORMAT_CODES and token not in strings:
+                        context.flags = 0
+                        IEEEdouble.from_string(token, context)
+                        if not context.flags & Flags.INVALID:
+                            strings.add(token)
+    return sorted(strings)
+
+
+def data_pool(fmt, strings, count, rng):
+    '''Return count values of fmt converted from a random choice of strings, which are
+    drawn from the test vectors.'''
+    context = Context()
+    return [fmt.from_string(string, context) for string in rng.choices(strings, k=count)]
+
+
+def operand_pool(fmt, distribution, strings, count, rng):
+    '''Return count values of fmt with the named distribution, "random" or "data".'''
+    if distribution == 'random':
+        return random_pool(fmt, count, rng)
+    return data_pool(fmt, strings, count, rng)
+
+
+def time_case(func, operands, repeat):
+    '''Return the best time in nanoseconds per call of func over operands.'''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for args in operands:
+            func(*args)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(operands)
+
+
+def run(pattern=None, count=100, repeat=3, seed=754, data_dir=None, roundings=ROUNDINGS,
+        progress=None, bulk_count=100_000, sizes=None):
+    '''Run the benchmarks whose names match the regular expression pattern, and return a
+    dictionary mapping benchmark names to nanoseconds per operation.
+
+    Names have the form op/format/distribution/rounding, where distribution is "random"
+    or "data" for operands drawn from the test vectors in data_dir.  Operations unaffected
+    by rounding are only run with ROUND_HALF_EVEN.  Bulk operations work on a pool of
+    bulk_count values.  progress, if not None, is called with each name and its result.
+    If sizes is not None, it is a dictionary updated with the names of the operations
+    reporting a size mapped to their size in bytes per value.
+    '''
+    regex = re.compile(pattern) if pattern else None
+    strings = read_data_strings(data_dir) if data_dir else []
+    distributions = ('random', 'data') if strings else ('random', )
+    results = {}
+    for fmt_name, fmt in FORMATS.items():
+        for distribution in distributions:
+            # Operands are a function of the seed, format and distribution only
+            rng = random.Random(f'{seed}/{fmt_name}/{distribution}')
+            pool = operand_pool(fmt, distribution, strings, count, rng)
+            bulk_pool = None
+            for op in OPERATIONS:
+                if op.interchange and not fmt.fmt_width:
+                    continue
+                operands = None
+                for rounding in (roundings if op.rounds else (ROUND_HALF_EVEN, )):
+                    name = f'{op.name}/{fmt_name}/{distribution}/{rounding}'
+                    if regex and not regex.search(name):
+                        continue
+                    if operands is None:
+                        if op.bulk and bulk_pool is None:
+                            rng = random.Random(f'{seed}/{fmt_name}/{distribution}/bulk')
+                            bulk_pool = operand_pool(fmt, distribution, strings, bulk_count,
+                                                     rng)
+                        operands = op.make_operands(fmt, bulk_pool if op.bulk else pool,
+                                                    random.Random(name))
+                    func = op.make_func(fmt, Context(rounding=rounding))
+                    results[name] = time_case(func, operands, repeat)
+                    if op.bulk:
+                        results[name] /= len(bulk_pool)
+                    if op.size and sizes is not None:
+                        sizes[name] = op.size(operands)
+                    if progress:
+                        progress(name, results[name])
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''Compare results with baseline, both maps from benchmark name to nanoseconds per
+    operation.  Return a list of (name, baseline_ns, result_ns, ratio) for the benchmarks
+    present in both, and a list of those whose ratio exceeds 1 + threshold.'''
+    rows = []
+    for name, result in results.items():
+        if name in baseline:
+            rows.append((name, baseline[name], result, result / baseline[name]))
+    regressions = [row for row in rows if row[3] > 1 + threshold]
+    return rows, regressions
+
+
+def main(args=None):
+    default_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                    'tests', 'data')
+    parser = argparse.ArgumentParser(
+        prog='python -m ieee754.bench',
+        description='Time the public operations across formats and rounding modes.')
+    parser.add_argument('pattern', nargs='?', help='only run benchmarks whose names '
+                        'op/format/distribution/rounding match this regular expression')
+    parser.add_argument('--count', type=int, default=100,
+                        help='operations per benchmark (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timing repeats; the best is taken (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=754, help='random seed')
+    parser.add_argument('--data-dir', default=default_data_dir,
+                        help='directory of test vectors to draw operands from')
+    parser.add_argument('--bulk-count', type=int, default=100_000,
+                        help='values in the pool of the bulk benchmarks '
+                        '(default: %(default)s)')
+    parser.add_argument('--quick', action='store_true',
+                        help='only time ROUND_HALF_EVEN')
+    parser.add_argument('--output', '-o', help='write the results as JSON to this file')
+    parser.add_argument('--compare', '-c', metavar='BASELINE',
+                        help='compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='flag slowdowns by more than this fraction against the '
+                        'baseline (default: %(default)s)')
+    args = parser.parse_args(args)
+
+    def progress(name, ns):
+        print(f'{name:60s} {ns:14,.0f} ns')
+
+    roundings = (ROUND_HALF_EVEN, ) if args.quick else ROUNDINGS
+    sizes = {}
+    results = run(args.pattern, args.count, args.repeat, args.seed, args.data_dir,
+                  roundings, progress, args.bulk_count, sizes)
+    if sizes:
+        print()
+        for name, size in sizes.items():
+            print(f'{name:60s} {size:14,.1f} bytes per value')
+
+    if args.output:
+        document = {
+            'meta': {
+                'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'implementation': platform.python_implementation(),
+                'machine': platform.machine(),
+                'count': args.count,
+                'bulk_count': args.bulk_count,
+                'repeat': args.repeat,
+                'seed': args.seed,
+            },
+            'results': results,
+            'sizes': sizes,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        rows, regressions = compare(results, baseline, args.threshold)
+        print()
+        print(f'{len(rows):,d} benchmarks compared with {args.compare}')
+        for name, base, result, ratio in regressions:
+            print(f'REGRESSION {name:60s} {base:12,.0f} -> {result:12,.0f} ns ({ratio:.2f}x)')
+        if regressions:
+            print(f'{len(regressions):,d} regressions over {args.threshold:.0%}')
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,27 +5,37 @@
 #
 
 import copy
+import inspect
+import os
 import re
-import threading
-from collections import namedtuple
+import sys
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from contextvars import ContextVar
 from decimal import Decimal
 from enum import IntFlag, IntEnum
 from fractions import Fraction
-from math import ceil, floor, log2, sqrt
+from functools import lru_cache, partial
+from math import ceil, floor, isqrt, ldexp, log2
 from typing import NamedTuple
 from struct import Struct
+from time import perf_counter_ns
 from unicodedata import normalize
+from weakref import ref
 
 import attr
 
-__all__ = ('Context', 'DefaultContext', 'get_context', 'set_context', 'local_context',
+__all__ = ('Context', 'OpCounters', 'TraceRecord', 'ExceptionSampler', 'ExceptionSink',
+           'MemoCache', 'MemoInfo',
+           'DefaultContext', 'get_context', 'set_context', 'local_context', 'set_global_memo',
            'DefaultDecFormat', 'DefaultHexFormat', 'Dec_g_Format', 'DecimalToBinary',
-           'Flags', 'Compare', 'HandlerKind',
-           'BinaryFormat', 'Binary', 'TextFormat',
+           'Flags', 'Compare', 'HandlerKind', 'MinMaxFlags',
+           'BinaryFormat', 'Binary', 'TextFormat', 'CompiledTextFormat',
            'IEEEError', 'Invalid', 'DivisionByZero', 'Inexact', 'Overflow', 'Underflow',
            'SignallingNaNOperand', 'InvalidAdd', 'InvalidMultiply', 'InvalidDivide',
            'InvalidSqrt', 'InvalidFMA', 'InvalidRemainder', 'InvalidLogBIntegral',
            'InvalidConvertToInteger', 'InvalidComparison', 'InvalidFromString', 'InvalidToString',
+           'ResourceLimit',
            'DivideByZero', 'LogBZero', 'UnderflowExact', 'UnderflowInexact',
            'ROUND_CEILING', 'ROUND_FLOOR', 'ROUND_DOWN', 'ROUND_UP',
            'ROUND_HALF_EVEN', 'ROUND_HALF_UP', 'ROUND_HALF_DOWN',
@@ -97,6 +107,8 @@ OP_MIN_MAG = 'min_mag'
 OP_MINUS = '__neg__'
 OP_PLUS = '__pos__'
 
+_all_ops = tuple(globals()[name] for name in __all__ if name.startswith('OP_'))
+
 
 class MinMaxFlags(IntFlag):
     MIN = 0x00
@@ -130,6 +142,9 @@ class Flags(IntFlag):
 
 pack_double = Struct('=d').pack
 unpack_double = Struct('=d').unpack
+# The encoding of a float as a 64-bit integer is the bridge to and from IEEEdouble
+pack_bits = Struct('=Q').pack
+unpack_bits = Struct('=Q').unpack
 
 
 @attr.s(slots=True, kw_only=True, cmp=False)
@@ -293,6 +308,93 @@ class TextFormat:
             result = result.upper()
         return result
 
+    def compile(self):
+        '''Return a CompiledTextFormat whose methods are equivalent to ours but specialized to
+        our current settings, which they do not re-examine.  Compile again if this text
+        format is changed.'''
+        return CompiledTextFormat(self._make_decimal_formatter(), self._make_hex_formatter(),
+                                  self.format_non_finite)
+
+    def _make_decimal_formatter(self):
+        '''Return a function equivalent to format_decimal() specialized to our settings.'''
+        signs = ('+' if self.force_leading_sign else '', '-')
+        exp_char = 'E' if self.upper_case else 'e'
+        positive_exp_sign = '+' if self.force_exp_sign else ''
+        exp_width = abs(self.exp_digits)
+        g_rule = self.exp_digits < 0
+        always_exponent = self.exp_digits > 0
+        point_zero = '.0' if self.force_point else ''
+        rstrip_zeroes = self.rstrip_zeroes
+
+        def format_decimal(sign, exponent, digits, precision=None):
+            precision = precision or len(digits)
+            if rstrip_zeroes:
+                digits = digits.rstrip('0') or '0'
+            sign = signs[sign]
+            if always_exponent or (g_rule and not precision > exponent >= -4):
+                if len(digits) > 1:
+                    digits = f'{digits[0]}.{digits[1:]}'
+                else:
+                    digits += point_zero
+                if exponent < 0:
+                    return f'{sign}{digits}{exp_char}-{-exponent:0{exp_width}d}'
+                return f'{sign}{digits}{exp_char}{positive_exp_sign}{exponent:0{exp_width}d}'
+            point = exponent + 1
+            if point <= 0:
+                return f'{sign}0.{"0" * -point}{digits}'
+            if point > len(digits):
+                digits += (point - len(digits)) * '0'
+            if point < len(digits):
+                return f'{sign}{digits[:point]}.{digits[point:]}'
+            return f'{sign}{digits}{point_zero}'
+
+        return format_decimal
+
+    def _make_hex_formatter(self):
+        '''Return a function equivalent to format_hex() specialized to our settings.'''
+        signs = ('+' if self.force_leading_sign else '', '-')
+        prefix, hex_code, exp_char = ('0X', 'X', 'P') if self.upper_case else ('0x', 'x', 'p')
+        positive_exp_sign = '+' if self.force_exp_sign else ''
+        exp_width = abs(self.exp_digits)
+        point_zero = '.0' if self.force_point else ''
+        rstrip_zeroes = self.rstrip_zeroes
+        # A map from format to (shift, sig_digits)
+        format_constants = {}
+
+        def format_hex(value):
+            significand = value.significand
+            sign = signs[value.sign]
+            if significand == 0:
+                hex_sig = '0'
+                exponent = 0
+            else:
+                constants = format_constants.get(value.fmt)
+                if constants is None:
+                    precision = value.fmt.precision
+                    constants = format_constants[value.fmt] = ((precision & 3) ^ 1,
+                                                               (precision + 6) // 4)
+                shift, sig_digits = constants
+                hex_sig = f'{significand << shift:0{sig_digits}{hex_code}}'
+                exponent = value.exponent()
+                if rstrip_zeroes:
+                    hex_sig = hex_sig.rstrip('0') or '0'
+            if len(hex_sig) > 1:
+                hex_sig = f'{hex_sig[0]}.{hex_sig[1:]}'
+            else:
+                hex_sig += point_zero
+            if exponent < 0:
+                return f'{sign}{prefix}{hex_sig}{exp_char}-{-exponent:0{exp_width}d}'
+            return f'{sign}{prefix}{hex_sig}{exp_char}{positive_exp_sign}{exponent:0{exp_width}d}'
+
+        return format_hex
+
+
+class CompiledTextFormat(NamedTuple):
+    '''The specialized formatting functions of a TextFormat.  See TextFormat.compile().'''
+    format_decimal: object
+    format_hex: object
+    format_non_finite: object
+
 
 # Default format for decimal output
 DefaultDecFormat = TextFormat(exp_digits=-2, force_point=True,
@@ -331,6 +433,9 @@ class IEEEError(ArithmeticError):
     '''
 
     flag_to_raise = 'Nope! Fix your bug.'
+    # The index of the operand in its batch of a signal raised by a batch operation such as
+    # parse_many(), otherwise None
+    index = None
 
     @property
     def op_tuple(self):
@@ -440,6 +545,12 @@ class InvalidLogBIntegral(Invalid):
     '''Singalled when the operand of logb_integral is a zero, infinity or NaN.'''
 
 
+class ResourceLimit(Invalid):
+    '''Signalled when an operation would exceed one of the resource limits of its context.  The
+    operation is abandoned; the default result is a quiet NaN, or its text for conversions
+    to strings.'''
+
+
 #
 # DivisionByZero - sub-exceptions are DivisionByZero, LogBZero
 #
@@ -564,27 +675,110 @@ class Context:
     '''The execution context for operations.  Carries the rounding mode, status flags,
     whether tininess is detected before or after rounding, and traps.'''
 
-    __slots__ = ('rounding', 'flags', 'tininess_after', 'handlers', 'exceptions')
+    __slots__ = ('rounding', 'flags', 'tininess_after', 'handlers', 'exceptions', 'counters',
+                 'tracer', 'memo', 'escalations', 'max_input_digits', 'max_output_digits',
+                 'max_bit_length', 'max_escalations', '__weakref__')
 
-    def __init__(self, *, rounding=ROUND_HALF_EVEN, flags=0, tininess_after=True):
+    def __init__(self, *, rounding=ROUND_HALF_EVEN, flags=0, tininess_after=True,
+                 max_input_digits=None, max_output_digits=None, max_bit_length=None,
+                 max_escalations=None):
         '''rounding is one of the ROUND_ constants and (mostly) controls the rounding of inexact
         results.  flags represents the initially raised flags.  tininess_after indicates
         if tininess is detected before or after rounding.
+
+        The remaining arguments are resource limits, None meaning unlimited, that bound the
+        work done on untrusted input.  Exceeding one signals ResourceLimit.
+        max_input_digits is the number of digits of a literal converted from a string,
+        max_output_digits the number of digits of a conversion to a decimal string,
+        max_bit_length the size of the integers a conversion or decimal rounding works with,
+        and max_escalations the number of times a conversion may raise its working
+        precision.
         '''
         self.rounding = rounding
         self.flags = flags
         self.tininess_after = tininess_after
+        self.max_input_digits = max_input_digits
+        self.max_output_digits = max_output_digits
+        self.max_bit_length = max_bit_length
+        self.max_escalations = max_escalations
         self.handlers = {}
         self.exceptions = []
+        self.counters = None
+        self.tracer = None
+        self.memo = None
+        # The number of times operations under this context have had to raise their
+        # working precision and retry.  Always counted, traced or not; escalations are
+        # rare and each costs far more than the count.
+        self.escalations = 0
 
     def copy(self):
-        '''Return a copy of the context with each attribute shallow-copied.'''
+        '''Return a copy of the context with each attribute shallow-copied, except that the
+        copy records exceptions afresh with the same policy.  The copy shares our counters,
+        tracer and memo cache, if any, but does not keep instrumentation switched in; it
+        is instrumented only while a context they were given to directly is.'''
         result = Context(rounding=self.rounding, flags=self.flags,
-                         tininess_after=self.tininess_after)
+                         tininess_after=self.tininess_after,
+                         max_input_digits=self.max_input_digits,
+                         max_output_digits=self.max_output_digits,
+                         max_bit_length=self.max_bit_length,
+                         max_escalations=self.max_escalations)
         result.handlers = self.handlers.copy()
-        result.exceptions = self.exceptions.copy()
+        exceptions = self.exceptions
+        if isinstance(exceptions, list):
+            result.exceptions = []
+        elif isinstance(exceptions, deque):
+            result.exceptions = deque(maxlen=exceptions.maxlen)
+        else:
+            result.exceptions = exceptions.empty_copy()
+        result.counters = self.counters
+        result.tracer = self.tracer
+        result.memo = self.memo
         return result
 
+    def _update_instrumentation(self):
+        key = id(self)
+        if self.counters is None and self.tracer is None and self.memo is None:
+            _instrumented_contexts.pop(key, None)
+        elif key not in _instrumented_contexts:
+            # Switch instrumentation out if we are freed without disabling it
+            _instrumented_contexts[key] = ref(self, partial(_forget_instrumented, key))
+        _update_instrumentation()
+
+    def enable_counters(self, counters=None):
+        '''Count the operations performed and signals raised under this context in counters,
+        an OpCounters instance, or in a new one if None.  Return the counters.
+
+        Instrumentation is switched in when first enabled on any context and switched out
+        again when disable_counters() is called on the last such context, or it is freed,
+        so that it costs nothing while unused.  Switching replaces methods of the classes
+        of this module so is not thread-safe: do it while no other thread performs
+        operations.'''
+        self.counters = counters or OpCounters()
+        self._update_instrumentation()
+        return self.counters
+
+    def disable_counters(self):
+        '''Stop counting under this context.  Return the counters, or None if counting was not
+        enabled.'''
+        counters, self.counters = self.counters, None
+        self._update_instrumentation()
+        return counters
+
+    def set_tracer(self, tracer):
+        '''After each operation performed under this context, call tracer with a TraceRecord
+        describing it.  If tracer is None stop tracing.  Tracing is switched in and out
+        like counting; see enable_counters().'''
+        self.tracer = tracer
+        self._update_instrumentation()
+
+    def set_memo(self, memo):
+        '''Memoize the results of operations performed under this context in memo, a MemoCache,
+        taking precedence over the global memo cache.  If memo is None the global memo cache,
+        if any, is used; see set_global_memo().  Memoizing is switched in and out like
+        counting; see enable_counters().'''
+        self.memo = memo
+        self._update_instrumentation()
+
     def set_handler(self, exc_classes, kind, handler=None):
         classes = (exc_classes, ) if not isinstance(exc_classes, (tuple, list)) else exc_classes
         base = Underflow if kind == HandlerKind.ABRUPT_UNDERFLOW else IEEEError
@@ -622,6 +816,208 @@ class Context:
                 f'tininess_after={self.tininess_after}>')
 
 
+class ExceptionSampler:
+    '''An exception recorder for Context.exceptions that counts the exceptions recorded of
+    each class but keeps only the first samples of each, so memory use is bounded.'''
+
+    def __init__(self, samples=10):
+        self.samples = samples
+        # Maps from exception class to count and to a list of the first samples
+        self.counts = {}
+        self.first = {}
+
+    def append(self, exception):
+        cls = exception.__class__
+        count = self.counts.get(cls, 0)
+        self.counts[cls] = count + 1
+        if count < self.samples:
+            self.first.setdefault(cls, []).append(exception)
+
+    def extend(self, exceptions):
+        for exception in exceptions:
+            self.append(exception)
+
+    def empty_copy(self):
+        '''Return a new sampler with the same number of samples.'''
+        return ExceptionSampler(self.samples)
+
+    def clear(self):
+        self.counts.clear()
+        self.first.clear()
+
+    def __len__(self):
+        '''The number of exceptions recorded, including those not kept.'''
+        return sum(self.counts.values())
+
+    def __iter__(self):
+        '''Iterate over the kept exceptions.'''
+        for samples in self.first.values():
+            yield from samples
+
+    def __repr__(self):
+        return f'<ExceptionSampler samples={self.samples} recorded={len(self)}>'
+
+
+class ExceptionSink:
+    '''An exception recorder for Context.exceptions that passes each exception recorded to
+    callback rather than keeping it.  Copies of a context share the sink.'''
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def append(self, exception):
+        self.callback(exception)
+
+    def extend(self, exceptions):
+        for exception in exceptions:
+            self.callback(exception)
+
+    def empty_copy(self):
+        return self
+
+
+class TraceRecord(NamedTuple):
+    '''Describes an operation traced by a context's tracer.  See Context.set_tracer().'''
+
+    # The operation name, an OP_ constant
+    op: str
+    # The destination format
+    fmt: object
+    # The operands, excluding the context
+    operands: tuple
+    # The elapsed time of the operation in nanoseconds
+    elapsed_ns: int
+    # The number of times the operation raised its working precision and retried
+    escalations: int
+
+    @property
+    def operand_formats(self):
+        '''A tuple of the formats of the Binary operands.'''
+        return tuple(operand.fmt for operand in self.operands if isinstance(operand, Binary))
+
+    @property
+    def precisions(self):
+        '''A tuple of the precisions of the Binary operands.'''
+        return tuple(fmt.precision for fmt in self.operand_formats)
+
+
+class OpCounters:
+    '''Counts of the operations performed under one or more contexts, by operation name (an
+    OP_ constant), by destination format and by rounding mode, and counts of the signals
+    raised by signal class name.  See Context.enable_counters().'''
+
+    __slots__ = ('ops', 'formats', 'roundings', 'signals')
+
+    def __init__(self):
+        self.ops = {}
+        self.formats = {}
+        self.roundings = {}
+        self.signals = {}
+
+    def count_op(self, op, fmt, rounding):
+        ops, formats, roundings = self.ops, self.formats, self.roundings
+        ops[op] = ops.get(op, 0) + 1
+        formats[fmt] = formats.get(fmt, 0) + 1
+        roundings[rounding] = roundings.get(rounding, 0) + 1
+
+    def count_signal(self, exc_class):
+        name = exc_class.__name__
+        self.signals[name] = self.signals.get(name, 0) + 1
+
+    def snapshot(self):
+        '''Return a picklable snapshot of the counts, a dictionary with keys 'ops', 'formats',
+        'roundings' and 'signals' each mapping to a dictionary of counts.'''
+        return {name: getattr(self, name).copy() for name in self.__slots__}
+
+    def reset(self):
+        '''Zero all counts.'''
+        for name in self.__slots__:
+            getattr(self, name).clear()
+
+    def merge(self, snapshot):
+        '''Add the counts of snapshot, for example one taken in a worker process.'''
+        for name in self.__slots__:
+            counts = getattr(self, name)
+            for key, count in snapshot[name].items():
+                counts[key] = counts.get(key, 0) + count
+
+    def __repr__(self):
+        return f'<OpCounters ops={sum(self.ops.values())} signals={sum(self.signals.values())}>'
+
+
+class MemoInfo(NamedTuple):
+    '''Statistics of a MemoCache.'''
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class MemoCache:
+    '''A bounded cache of operation results, least-recently used entries being evicted first.
+    See Context.set_memo() and set_global_memo().
+
+    An entry is keyed by the operation, the destination format, the encodings of the
+    operands, and the rounding mode, tininess mode and resource limits of the context.  It
+    holds the result and the signals the operation raised, which are signalled afresh on
+    each hit so that flags and handlers behave exactly as when the operation is performed.
+    Operations whose operands are not Binary values, strings, bytes, integers, floats,
+    Decimals or Fractions are not cached, nor are those whose result was changed by a
+    handler in a way a replay cannot reproduce.
+    '''
+
+    def __init__(self, maxsize=4096):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError('maxsize must be a positive integer')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Maps a key to a (result, default_result, signals) triple; see _memoized_call()
+        self.entries = OrderedDict()
+
+    def lookup(self, key):
+        '''Return the entry for key, or None on a miss.'''
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                # Evicted by another thread
+                pass
+        return entry
+
+    def store(self, key, entry):
+        entries = self.entries
+        entries[key] = entry
+        while len(entries) > self.maxsize:
+            try:
+                entries.popitem(last=False)
+            except KeyError:
+                break
+            self.evictions += 1
+
+    def info(self):
+        '''Return a MemoInfo of the statistics of the cache.'''
+        return MemoInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.entries))
+
+    def clear(self):
+        '''Remove all entries and zero the statistics.'''
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return (f'<MemoCache hits={self.hits:,d} misses={self.misses:,d} '
+                f'size={len(self.entries):,d}/{self.maxsize:,d}>')
+
+
 # When precision is lost during a calculation these indicate what fraction of the LSB the
 # lost bits represented.  It essentially combines the roles of 'guard' and 'sticky' bits.
 LF_EXACTLY_ZERO = 0           # 000000
@@ -756,6 +1152,39 @@ class BinaryFormat(NamedTuple):
                 (self.precision, self.e_max, self.e_min)
                 == (other.precision, other.e_max, other.e_min))
 
+    def __reduce__(self):
+        '''Pickle as a short reference: the width of a standard IEEE format, otherwise our
+        (precision, e_max, e_min) triple.  Unpickling returns the equal interned format if
+        there is one.'''
+        return (_unpickle_format, (self._kernel('reference', self._make_reference), ))
+
+    def _make_reference(self):
+        if self.fmt_width % 8 == 1:
+            width = self.fmt_width - 1
+            try:
+                if BinaryFormat.from_IEEE(width) == self:
+                    return width
+            except ValueError:
+                pass
+        return tuple(self[:3])
+
+    def intern(self):
+        '''Return the interned format equal to this one, interning this one if there is none.
+        The predefined formats are interned.  Interned formats are never freed; they enjoy
+        identity-based fast paths and cached specialized kernels.'''
+        triple = self[:3]
+        fmt = _interned_formats.get(triple)
+        if fmt is None:
+            fmt = _interned_formats[triple] = self
+            _interned_ids.add(id(self))
+        return fmt
+
+    def is_superset(self, other):
+        '''Return True if every value of format other is exactly representable in this
+        format.'''
+        return (self.precision >= other.precision and self.e_max >= other.e_max
+                and self.e_min <= other.e_min)
+
     def make_zero(self, sign):
         '''Return a zero of the given sign.'''
         return Binary(self, sign, 1, 0)
@@ -848,46 +1277,112 @@ class BinaryFormat(NamedTuple):
             return self.make_zero(sign)
 
         context = context or get_context()
-        size = significand.bit_length()
-
-        # Shifting the significand so the MSB is one gives us the natural shift.  There t
-        # is followed by a decimal point, so the exponent must be adjusted to compensate.
-        # However we cannot fully shift if the exponent would fall below e_min.
-        exponent += self.precision - 1
-        rshift = max(size - self.precision, self.e_min - exponent)
-
-        # Shift the significand and update the exponent
-        significand, lost_fraction = shift_right(significand, rshift)
-        exponent += rshift
-
-        is_tiny = significand < self.int_bit
-
-        # Round
-        if round_up(context.rounding, lost_fraction, sign, bool(significand & 1)):
-            # Increment the significand
-            significand += 1
-            # If the significand now overflows, halve it and increment the exponent
-            if significand > self.max_significand:
-                significand >>= 1
-                exponent += 1
-
-        # If the new exponent would be too big, then signal overflow.
-        if exponent > self.e_max:
-            value = self.make_overflow_value(context.rounding, sign)
-            return Overflow(op_tuple, value).signal(context)
+        return self._normalizer(context.rounding)(sign, exponent, significand, op_tuple,
+                                                  context)
+
+    def _kernel(self, kind, maker, *args):
+        '''Return the specialized kernel of the given kind for this format, calling maker(*args)
+        to build it.  Kernels of interned formats, which include the predefined formats,
+        are built on first use and cached for good.  Those of other formats are kept in a
+        bounded cache of the most recently used, whose entries keep their format alive.'''
+        key = (id(self), kind)
+        kernel = _kernels.get(key)
+        if kernel is not None:
+            return kernel
+        if id(self) in _interned_ids:
+            kernel = _kernels[key] = maker(*args)
+            return kernel
+        entry = _transient_kernels.get(key)
+        if entry is not None:
+            try:
+                _transient_kernels.move_to_end(key)
+            except KeyError:
+                # Evicted by another thread
+                pass
+            return entry[1]
+        kernel = maker(*args)
+        _transient_kernels[key] = (self, kernel)
+        while len(_transient_kernels) > TRANSIENT_KERNELS_MAX:
+            try:
+                _transient_kernels.popitem(last=False)
+            except KeyError:
+                break
+        return kernel
+
+    def _from_decimal_exact(self, sign, significand, exponent, op_tuple, context):
+        '''Return the correctly-rounded (by the context) value of
+
+           ± significand * 10^exponent
+
+        computed exactly with integer arithmetic.'''
+        if exponent >= 0:
+            return self._normalize(sign, 0, significand * 10 ** exponent, op_tuple, context)
+        return self._from_ratio(sign, significand, 10 ** -exponent, op_tuple, context)
+
+    def _normalizer(self, rounding):
+        '''Return the normalization kernel of this format for the given rounding mode.'''
+        return self._kernel(rounding, self._make_normalizer, rounding)
+
+    def _make_normalizer(self, rounding):
+        '''Return a function specialized to this format and rounding mode that does the work of
+        _normalize() for a non-zero significand.  The format's constants are bound as
+        locals, and rounding decisions are a table lookup.'''
+        fmt = self
+        precision = self.precision
+        e_max = self.e_max
+        e_min = self.e_min
+        e_bias = self.e_bias
+        int_bit = self.int_bit
+        max_significand = self.max_significand
+        round_up_row = round_up_table[rounding]
+        overflow_values = (self.make_overflow_value(rounding, False),
+                           self.make_overflow_value(rounding, True))
+        make = Binary._make
+
+        def normalize_kernel(sign, exponent, significand, op_tuple, context):
+            # Shifting the significand so the MSB is one gives us the natural shift.  There
+            # it is followed by a decimal point, so the exponent must be adjusted to
+            # compensate.  However we cannot fully shift if the exponent would fall below
+            # e_min.
+            exponent += precision - 1
+            rshift = max(significand.bit_length() - precision, e_min - exponent)
+
+            # Shift the significand and update the exponent
+            if rshift > 0:
+                lost_fraction = lost_bits_from_rshift(significand, rshift)
+                significand >>= rshift
+            else:
+                lost_fraction = LF_EXACTLY_ZERO
+                significand <<= -rshift
+            exponent += rshift
 
-        if context.tininess_after:
-            is_tiny = significand < self.int_bit
+            is_tiny = significand < int_bit
+
+            # Round
+            if round_up_row[lost_fraction * 4 + sign * 2 + (significand & 1)]:
+                # Increment the significand
+                significand += 1
+                # If the significand now overflows, halve it and increment the exponent
+                if significand > max_significand:
+                    significand >>= 1
+                    exponent += 1
 
-        is_inexact = lost_fraction != LF_EXACTLY_ZERO
+            # If the new exponent would be too big, then signal overflow.
+            if exponent > e_max:
+                return Overflow(op_tuple, overflow_values[sign]).signal(context)
 
-        result = Binary(self, sign, exponent + self.e_bias, significand)
-        if is_tiny:
-            cls = UnderflowInexact if is_inexact else UnderflowExact
-            result = cls(op_tuple, result).signal(context)
-        elif is_inexact:
-            result = Inexact(op_tuple, result).signal(context)
-        return result
+            if context.tininess_after:
+                is_tiny = significand < int_bit
+
+            result = make((fmt, sign, exponent + e_bias, significand))
+            if is_tiny:
+                cls = UnderflowInexact if lost_fraction else UnderflowExact
+                result = cls(op_tuple, result).signal(context)
+            elif lost_fraction:
+                result = Inexact(op_tuple, result).signal(context)
+            return result
+
+        return normalize_kernel
 
     def _next_up(self, value, context, flip_sign):
         '''Return the smallest floating point value (unless operating on a positive infinity or
@@ -897,44 +1392,61 @@ class BinaryFormat(NamedTuple):
         False, next_down() as True.
         '''
         assert value.fmt is self
-        sign = value.sign ^ flip_sign
-        e_biased = value.e_biased
-        significand = value.significand
-        op_tuple = (OP_NEXT_DOWN if flip_sign else OP_NEXT_UP, value)
-
-        if e_biased:
-            # Increment the significand of positive numbers, decrement the significand of
-            # negative numbers.  Negative zero is the only number whose sign flips.
-            if sign and significand:
-                if significand == self.int_bit and e_biased > 1:
-                    significand = self.max_significand
-                    e_biased -= 1
+        return self._kernel('next_up', self._make_next_up)(value, context, flip_sign)
+
+    def _make_next_up(self):
+        '''Return a function specialized to this format that does the work of _next_up().
+        The format's constants are bound as locals.'''
+        fmt = self
+        int_bit = self.int_bit
+        max_significand = self.max_significand
+        quiet_bit = self.quiet_bit
+        max_e_biased = self.e_max + self.e_bias
+        make = Binary._make
+
+        def next_up_kernel(value, context, flip_sign):
+            sign = value.sign ^ flip_sign
+            e_biased = value.e_biased
+            significand = value.significand
+
+            if e_biased:
+                # Increment the significand of positive numbers, decrement the significand
+                # of negative numbers.  Negative zero is the only number whose sign flips.
+                if sign and significand:
+                    if significand == int_bit and e_biased > 1:
+                        significand = max_significand
+                        e_biased -= 1
+                    else:
+                        significand -= 1
                 else:
-                    significand -= 1
+                    sign = False
+                    significand += 1
+                    if significand > max_significand:
+                        significand >>= 1
+                        e_biased += 1
+                        # Overflow to infinity?
+                        if e_biased > max_e_biased:
+                            e_biased = 0
+                            significand = 0
             else:
-                sign = False
-                significand += 1
-                if significand > self.max_significand:
-                    significand >>= 1
-                    e_biased += 1
-                    # Overflow to infinity?
-                    if e_biased - self.e_bias > self.e_max:
-                        e_biased = 0
-                        significand = 0
-        else:
-            # Negative infinity becomes largest negative number; positive infinity unchanged
-            if significand == 0:
-                if sign:
-                    significand = self.max_significand
-                    e_biased = self.e_max + self.e_bias
-            # Signalling NaNs are converted to quiet.
-            elif significand < self.quiet_bit:
-                return self._propagate_nan(op_tuple, context)
+                # Negative infinity becomes largest negative number; positive infinity
+                # unchanged
+                if significand == 0:
+                    if sign:
+                        significand = max_significand
+                        e_biased = max_e_biased
+                # Signalling NaNs are converted to quiet.
+                elif significand < quiet_bit:
+                    op_tuple = (OP_NEXT_DOWN if flip_sign else OP_NEXT_UP, value)
+                    return fmt._propagate_nan(op_tuple, context)
+
+            result = make((fmt, sign ^ flip_sign, e_biased, significand))
+            if e_biased == 1 and 0 < significand < int_bit:
+                op_tuple = (OP_NEXT_DOWN if flip_sign else OP_NEXT_UP, value)
+                result = UnderflowExact(op_tuple, result).signal(context)
+            return result
 
-        result = Binary(self, sign ^ flip_sign, e_biased, significand)
-        if result.is_subnormal():
-            result = UnderflowExact(op_tuple, result).signal(context)
-        return result
+        return next_up_kernel
 
     def convert(self, value, context=None):
         '''Return the value converted to this format, rounding if necessary.
@@ -956,6 +1468,12 @@ class BinaryFormat(NamedTuple):
                 return value
 
             if value.significand:
+                widen = self._widener(value.fmt)
+                if widen:
+                    result = widen(value)
+                    if result.significand < self.int_bit:
+                        result = UnderflowExact(op_tuple, result).signal(context)
+                    return result
                 return self._normalize(value.sign, value.exponent_int(), value.significand,
                                        op_tuple, context)
 
@@ -982,6 +1500,9 @@ class BinaryFormat(NamedTuple):
 
         if value.e_biased:
             if value.significand:
+                widen = self._widener(value.fmt)
+                if widen:
+                    return widen(value)
                 return self._normalize(value.sign, value.exponent_int(), value.significand,
                                        None, Context())
             return self.make_zero(value.sign)
@@ -990,6 +1511,246 @@ class BinaryFormat(NamedTuple):
             return self.make_nan(value.sign, value.is_snan(), value.nan_payload())
         return self.make_infinity(value.sign)
 
+    def convert_many(self, values, context=None):
+        '''Return a list of the values converted to this format, rounding if necessary.  The
+        values may be of any mix of formats; the conversion plan for each source format is
+        determined once.  Signals are raised per value as for convert().'''
+        context = context or get_context()
+        result = []
+        append = result.append
+        plans = {}
+        for value in values:
+            fmt = value.fmt
+            if value.e_biased and value.significand and fmt is not self:
+                widen = plans.get(id(fmt))
+                if widen is None:
+                    widen = plans[id(fmt)] = self._widener(fmt)
+                if widen:
+                    converted = widen(value)
+                    if converted.significand < self.int_bit:
+                        converted = UnderflowExact((OP_CONVERT, value), converted).signal(context)
+                    append(converted)
+                    continue
+            append(self._convert(value, (OP_CONVERT, value), context, False))
+        return result
+
+    def _widener(self, src_fmt):
+        '''Return the widening kernel converting finite non-zero values of src_fmt exactly to
+        this format, or False if this format is not a superset of src_fmt.'''
+        # The kernel depends only on the parameters of src_fmt.  The ids of interned
+        # formats are never reused.
+        kind = id(src_fmt) if id(src_fmt) in _interned_ids else ('widen', ) + src_fmt[:3]
+        return self._kernel(kind, self._make_widener, src_fmt)
+
+    def _make_widener(self, src_fmt):
+        '''Return a function converting finite non-zero values of src_fmt exactly to this
+        format, or False if this format is not a superset of src_fmt.  Normal values need
+        only have their significand shifted and exponent re-biased.  Subnormal values are
+        normalized as far as this format's exponent range permits.'''
+        if not self.is_superset(src_fmt):
+            return False
+        fmt = self
+        shift = self.precision - src_fmt.precision
+        bias_delta = self.e_bias - src_fmt.e_bias
+        src_int_bit = src_fmt.int_bit
+        src_precision = src_fmt.precision
+        # How far a subnormal can be normalized before reaching this format's e_min
+        max_subnormal_shift = src_fmt.e_min - self.e_min
+        make = Binary._make
+
+        def widen(value):
+            significand = value.significand
+            if significand >= src_int_bit:
+                return make((fmt, value.sign, value.e_biased + bias_delta,
+                             significand << shift))
+            # Subnormal.  The result is subnormal too if it cannot be fully normalized.
+            lshift = min(src_precision - significand.bit_length(), max_subnormal_shift)
+            return make((fmt, value.sign, 1 + bias_delta - lshift,
+                         significand << (shift + lshift)))
+
+        return widen
+
+    def total_order_keys(self, values, mag=False):
+        '''Return a list of the total order keys of values, which must be of this format.  If
+        mag is True the keys order the absolute values.  See Binary.total_order_key().'''
+        int_bit = self.int_bit
+        non_finite_key = (self.e_max + self.e_bias + 1) * int_bit
+        keys = []
+        append = keys.append
+        for value in values:
+            if value.fmt is not self and value.fmt != self:
+                raise ValueError('total_order_keys requires values of the same format')
+            e_biased = value.e_biased
+            if e_biased:
+                key = (e_biased - 1) * int_bit + value.significand
+            else:
+                key = non_finite_key + value.significand
+            if value.sign and not mag:
+                key = -key - 1
+            append(key)
+        return keys
+
+    def reduce_max_min(self, values, flags, context=None):
+        '''Return the maximum or minimum of an iterable of values of this format, according to
+        flags which is a combination of MinMaxFlags.  The result is that of applying the
+        corresponding Binary operation, for example Binary.max_mag_num() for MinMaxFlags.MAX
+        | MinMaxFlags.MAG | MinMaxFlags.NUM, pairwise from left to right; except that
+        SignallingNaNOperand is signalled at most once for the whole reduction.
+
+        The values are scanned once and compared by their total order keys.
+        '''
+        int_bit = self.int_bit
+        is_max = bool(flags & MinMaxFlags.MAX)
+        is_mag = bool(flags & MinMaxFlags.MAG)
+        best = first_nan = first_snan = None
+        best_key = 0
+        count = 0
+
+        for value in values:
+            if value.fmt is not self and value.fmt != self:
+                raise ValueError(f'{flags.op_name()} requires values of the same format')
+            count += 1
+            e_biased = value.e_biased
+            significand = value.significand
+            if e_biased == 0 and significand:
+                if first_nan is None:
+                    first_nan = value
+                if first_snan is None and not significand & self.quiet_bit:
+                    first_snan = value
+                continue
+            # Order by magnitude key.  For MAG operations equal magnitudes are ordered by
+            # sign, otherwise apply the sign to the key.
+            if e_biased:
+                key = (e_biased - 1) * int_bit + significand
+            else:
+                key = (self.e_max + self.e_bias + 1) * int_bit
+            if is_mag:
+                key = key * 2 + (not value.sign)
+            elif value.sign:
+                key = -key - 1
+            if best is None or (key > best_key if is_max else key < best_key):
+                best, best_key = value, key
+
+        if count == 0:
+            raise ValueError(f'{flags.op_name()} of an empty sequence')
+        # With a single value no operation is performed
+        if count == 1:
+            return best if first_nan is None else first_nan
+
+        if first_nan is None or (best is not None and flags & MinMaxFlags.NUM):
+            result = best
+        else:
+            result = first_nan
+        if result.is_snan():
+            result = self.make_nan(result.sign, False, result.nan_payload())
+        if first_snan is not None:
+            op_tuple = (flags.op_name(), first_snan)
+            result = SignallingNaNOperand(op_tuple, result).signal(context)
+        return result
+
+    def from_total_order_key(self, key):
+        '''Return the value of this format with the given total order key.  The inverse of
+        Binary.total_order_key().  This operation is quiet.'''
+        sign = key < 0
+        if sign:
+            key = -key - 1
+        int_bit = self.int_bit
+        e_biased, significand = divmod(key, int_bit)
+        if e_biased > self.e_max + self.e_bias + 1:
+            raise ValueError(f'total order key {key:,d} out of range')
+        # The parts are valid by construction so skip validation
+        if e_biased == self.e_max + self.e_bias + 1:
+            return Binary._make((self, sign, 0, significand))
+        if e_biased:
+            significand += int_bit
+        return Binary._make((self, sign, max(e_biased, 1), significand))
+
+    def _range_keys(self, lo, hi):
+        if lo.fmt != self or hi.fmt != self:
+            raise ValueError('range ends must be of this format')
+        return lo.total_order_key(), hi.total_order_key()
+
+    def count_between(self, lo, hi):
+        '''Return the number of values of this format from lo to hi inclusive in the total
+        order, i.e. the number of values iter_range(lo, hi) yields.  Both zeroes are
+        counted.  This operation is quiet.'''
+        lo_key, hi_key = self._range_keys(lo, hi)
+        return max(hi_key - lo_key + 1, 0)
+
+    def iter_range(self, lo, hi, step_ulps=1, packed=False, endianness=None):
+        '''Iterate lazily over the values of this format from lo to hi inclusive in the total
+        order, taking every step_ulps-th value.  Adjacent finite values are a ulp apart,
+        except that both zeroes are included.  If packed is True yield the encodings as
+        bytes of the given endianness rather than Binary values.  This operation is quiet.
+
+        The values are walked as integers; see Binary.total_order_key().
+        '''
+        if not isinstance(step_ulps, int) or step_ulps < 1:
+            raise ValueError('step_ulps must be a positive integer')
+        lo_key, hi_key = self._range_keys(lo, hi)
+        if not packed:
+            return self._iter_keys(lo_key, hi_key, step_ulps)
+        keys = range(lo_key, hi_key + 1, step_ulps)
+        if not self.fmt_width:
+            raise RuntimeError('not an interchange format')
+        if self.fmt_width % 8 == 0:
+            # An explicit integer bit; pack each value
+            pack = self._packer()
+            endianness = endianness or host_endianness
+            return (pack(self.from_total_order_key(key), endianness) for key in keys)
+        # With an implicit integer bit the encoding of a non-negative key is the key itself,
+        # and a negative key's encoding is the sign bit added to its magnitude key
+        size = self.fmt_width // 8
+        sign_bit = 1 << (self.fmt_width - 2)
+        endianness = endianness or host_endianness
+        return ((key if key >= 0 else sign_bit - 1 - key).to_bytes(size, endianness)
+                for key in keys)
+
+    def _iter_keys(self, key, hi_key, step):
+        '''Yield the values with total order keys from key to hi_key inclusive in steps of
+        step.  Within a binade only the significand changes so walk it directly.'''
+        make = Binary._make
+        int_bit = self.int_bit
+        non_finite = self.e_max + self.e_bias + 1
+        while key <= hi_key:
+            sign = key < 0
+            e_biased, significand = divmod(-key - 1 if sign else key, int_bit)
+            if sign:
+                # Magnitudes decrease to the bottom of the binade
+                count = min(hi_key - key, significand) // step + 1
+                significands = range(significand, significand - count * step, -step)
+            else:
+                count = min(hi_key - key, int_bit - 1 - significand) // step + 1
+                significands = range(significand, significand + count * step, step)
+            key += count * step
+            if e_biased == non_finite:
+                e_biased = 0
+            elif e_biased:
+                significands = range(significands.start + int_bit, significands.stop + int_bit,
+                                     significands.step)
+            else:
+                e_biased = 1
+            for significand in significands:
+                yield make((self, sign, e_biased, significand))
+
+    def split_range(self, lo, hi, parts):
+        '''Split the range of values from lo to hi inclusive into at most parts contiguous
+        sub-ranges whose sizes differ by at most one, for example to walk it in parallel.
+        Return a list of (lo, hi) pairs in total order; there are fewer than parts if the
+        range has fewer values.  This operation is quiet.'''
+        if not isinstance(parts, int) or parts < 1:
+            raise ValueError('parts must be a positive integer')
+        lo_key, hi_key = self._range_keys(lo, hi)
+        count = max(hi_key - lo_key + 1, 0)
+        parts = min(parts, count)
+        result = []
+        start = lo_key
+        for n in range(parts):
+            end = lo_key + count * (n + 1) // parts
+            result.append((self.from_total_order_key(start), self.from_total_order_key(end - 1)))
+            start = end
+        return result
+
     def pack(self, sign, exponent, significand, endianness=None):
         '''Packs the IEEE parts of a floating point number as bytes of the given endianness.
 
@@ -1023,6 +1784,40 @@ class BinaryFormat(NamedTuple):
         value = (value << lshift) + significand
         return value.to_bytes(self.fmt_width // 8, endianness or host_endianness)
 
+    def _packer(self):
+        '''Return the packing kernel of this format.'''
+        return self._kernel('pack', self._make_packer)
+
+    def _make_packer(self):
+        '''Return a function specialized to this format that does the work of Binary.pack()
+        without validating the parts of the value.'''
+        if not self.fmt_width:
+            raise RuntimeError('not an interchange format')
+        int_bit = self.int_bit
+        size = self.fmt_width // 8
+        explicit_integer_bit = self.fmt_width % 8 == 0
+        lshift = self.precision - 1 + explicit_integer_bit
+        # The encoding of an infinity; NaNs add their significand.  With an explicit integer
+        # bit it is set for NaNs and infinities.
+        non_finite = ((self.e_max * 2 + 1) << lshift) + int_bit * explicit_integer_bit
+        # Subtracted from normal numbers with an implicit integer bit
+        implicit_int_bit = int_bit * (not explicit_integer_bit)
+        sign_bit = (self.e_max + 1) * 2 << lshift
+
+        def pack(value, endianness):
+            significand = value.significand
+            if value.e_biased == 0:
+                encoding = non_finite + significand
+            elif significand < int_bit:
+                encoding = significand
+            else:
+                encoding = (value.e_biased << lshift) + significand - implicit_int_bit
+            if value.sign:
+                encoding += sign_bit
+            return encoding.to_bytes(size, endianness or host_endianness)
+
+        return pack
+
     def unpack(self, raw, endianness=None):
         '''Decode a binary encoding and return a (sign, exponent, significand) tuple.
 
@@ -1096,24 +1891,82 @@ class BinaryFormat(NamedTuple):
         if not isinstance(value, Decimal):
             raise TypeError('from_decimal requires a Decimal instance')
         op_tuple = (OP_FROM_DECIMAL, value)
-        return decimal_to_binary.convert(op_tuple, self, str(value), context)
+        return self._from_decimal_tuple(value.as_tuple(), op_tuple, context or get_context(),
+                                        exact_decimal_to_binary)
+
+    def from_decimals(self, values, context=None):
+        '''Return a list of the Decimals of the iterable values each converted to this format
+        as from_decimal() does.  The conversions share a table of powers.'''
+        context = context or get_context()
+        converter = DecimalToBinary()
+        converter.pow5_cache = {}
+        converter.exact_digits = exact_decimal_to_binary.exact_digits
+        results = []
+        for value in values:
+            if not isinstance(value, Decimal):
+                raise TypeError('from_decimals requires Decimal instances')
+            results.append(self._from_decimal_tuple(value.as_tuple(), (OP_FROM_DECIMAL, value),
+                                                    context, converter))
+        return results
+
+    def _from_decimal_tuple(self, parts, op_tuple, context, converter):
+        '''Convert a Decimal from its as_tuple() parts, skipping its string form.'''
+        sign, digits, exponent = parts
+        sign = bool(sign)
+        if exponent == 'F':
+            return self.make_infinity(sign)
+        if _over_limit(context.max_input_digits, len(digits)):
+            return ResourceLimit(op_tuple, self).signal(context)
+        sig_str = ''.join(map(str, digits))
+        if exponent in ('n', 'N'):
+            # NaNs as for from_string()
+            return self.make_nan(sign, exponent == 'N', int(sig_str or exponent == 'N'))
+        # Remove insignificant zeroes as DecimalToBinary.convert() does
+        length = len(sig_str)
+        sig_str = sig_str.rstrip('0')
+        exponent += length - len(sig_str)
+        result, exc = converter.try_many(sign, exponent, sig_str or '0', self, context)
+        if exc:
+            return exc(op_tuple, result).signal(context)
+        return result
 
     def from_fraction(self, value, context=None):
-        '''Return the decimal converted to this format, rounding if necessary.'''
+        '''Return the fraction converted to this format, rounding if necessary.'''
         if not isinstance(value, Fraction):
             raise TypeError('from_fraction requires a Fraction instance')
         op_tuple = (OP_FROM_FRACTION, value)
-        numerator = self._from_int_exact(value.numerator)
-        denominator = self._from_int_exact(value.denominator)
-        return self._divide_finite(numerator, denominator, op_tuple, context)
+        return self._from_ratio(value < 0, abs(value.numerator), value.denominator, op_tuple,
+                                context)
 
-    @classmethod
-    def _from_int_exact(cls, value):
-        '''Returns an integer as a floating point value.  A wide format is used if necessary
-        so that this is exact.  If an IEEEdouble suffices, that format is used.'''
-        size = value.bit_length()
-        fmt = IEEEdouble if size <= IEEEdouble.precision else cls.from_precision(size)
-        return fmt.from_int(value)
+    def from_fractions(self, values, context=None):
+        '''Return a list of the Fractions of the iterable values each converted to this format
+        as from_fraction() does.'''
+        context = context or get_context()
+        from_ratio = self._from_ratio
+        results = []
+        for value in values:
+            if not isinstance(value, Fraction):
+                raise TypeError('from_fractions requires Fraction instances')
+            results.append(from_ratio(value < 0, abs(value.numerator), value.denominator,
+                                      (OP_FROM_FRACTION, value), context))
+        return results
+
+    def _from_ratio(self, sign, numerator, denominator, op_tuple, context):
+        '''Return the correctly-rounded (by the context) value of
+
+           ± numerator / denominator
+
+        for non-negative numerator and positive denominator.  The quotient is computed with
+        a rounding bit beyond the precision and a sticky bit for the remainder.'''
+        context = context or get_context()
+        # The shifted numerator is about this many bits
+        if _over_limit(context.max_bit_length, max(numerator.bit_length(),
+                                                   denominator.bit_length() + self.precision)):
+            return ResourceLimit(op_tuple, self).signal(context)
+        shift = max(self.precision + 2 + denominator.bit_length() - numerator.bit_length(), 0)
+        quotient, remainder = divmod(numerator << shift, denominator)
+        return self._normalize(sign, -shift - 1, (quotient << 1) | bool(remainder), op_tuple,
+                               context)
 
     def from_int(self, value, context=None):
         '''Return the integer value converted to this format, rounding if necessary.'''
@@ -1130,17 +1983,128 @@ class BinaryFormat(NamedTuple):
         op_tuple = (OP_FROM_FLOAT, value)
         return self._convert(result, op_tuple, context, True)
 
+    def from_floats(self, values, context=None):
+        '''Return a list of the floats of the iterable values, for example an array('d'),
+        each converted to this format as from_float() does.'''
+        context = context or get_context()
+        if isinstance(values, array) and values.typecode == 'd':
+            # Decode the whole buffer at once
+            encodings = Struct(f'={len(values)}Q').unpack(values.tobytes())
+        else:
+            values = list(values)
+            if not all(isinstance(value, float) for value in values):
+                raise TypeError('from_floats requires floats')
+            raw = Struct(f'={len(values)}d').pack(*values)
+            encodings = Struct(f'={len(values)}Q').unpack(raw)
+
+        results = []
+        append = results.append
+        convert = None if self is IEEEdouble else self._convert
+        for float_value, bits in zip(values, encodings):
+            e_biased = (bits >> 52) & 0x7ff
+            significand = bits & 0xfffffffffffff
+            if e_biased == 0:
+                e_biased = 1
+            elif e_biased == 0x7ff:
+                e_biased = 0
+            else:
+                significand |= 0x10000000000000
+            value = make_binary((IEEEdouble, bits > 0x7fffffffffffffff, e_biased, significand))
+            if convert:
+                value = convert(value, (OP_FROM_FLOAT, float_value), context, True)
+            elif e_biased == 1 and 0 < significand < 0x10000000000000:
+                # A subnormal; see _convert()
+                value = UnderflowExact((OP_FROM_FLOAT, float_value), value).signal(context)
+            append(value)
+        return results
+
+    def to_floats(self, values, context=None):
+        '''Return an array('d') of the values of this format in the iterable values, each
+        converted to a Python float as float() does but signalling in context.'''
+        context = context or get_context()
+        results = array('d')
+        append = results.append
+        for value in values:
+            if value.fmt is not self and value.fmt != self:
+                raise ValueError(f'value {value} is not of format {self}')
+            append(value._to_float(context))
+        return results
+
     def from_string(self, string, context=None):
         '''Convert a string to a rounded floating number of this format.'''
         if not isinstance(string, str):
             raise TypeError('from_string requires a string')
+        return self._from_string(string, decimal_to_binary, context)
+
+    def _from_string(self, string, converter, context):
+        return self._from_literal((OP_FROM_STRING, string), _canonical_literal(string),
+                                  converter, context)
+
+    def _from_literal(self, op_tuple, literal, converter, context):
+        '''Convert a literal canonicalized by _canonical_literal().'''
+        if HEX_SIGNIFICAND_PREFIX.match(literal):
+            return self._from_hex_significand_string(op_tuple, literal, context)
+        return converter.convert(op_tuple, self, literal, context)
+
+    def parse_many(self, strings, context=None, packed=False, endianness=None):
+        '''Convert each string or bytes object of the iterable strings as from_string() does,
+        and return a pair (results, first_invalid).
+
+        results is a list of the values, or if packed is True a bytearray of their
+        encodings with the given endianness.  first_invalid is the index of the first
+        syntactically invalid literal, or None, however InvalidFromString is handled.
+        strings is consumed lazily.  Flags accumulate in context.  The conversions share
+        tables of powers, and literals of moderate size are converted exactly with integer
+        arithmetic.
+
+        A signal whose handler raises propagates with the index of the literal as its
+        index attribute.
+        '''
+        context = context or get_context()
+        converter = DecimalToBinary()
+        converter.pow5_cache = {}
+        converter.exact_digits = 800
+        if packed:
+            pack = self._packer()
+            endianness = endianness or host_endianness
+            results = bytearray()
+        else:
+            results = []
+        first_invalid = None
+        for index, string in enumerate(strings):
+            if isinstance(string, (bytes, bytearray)):
+                string = string.decode()
+            elif not isinstance(string, str):
+                raise TypeError('parse_many requires strings or bytes')
+            literal = _canonical_literal(string)
+            if first_invalid is None and not _is_literal(literal):
+                first_invalid = index
+            try:
+                value = self._from_literal((OP_FROM_STRING, string), literal, converter,
+                                           context)
+            except IEEEError as e:
+                e.index = index
+                raise
+            if packed:
+                results += pack(value, endianness)
+            else:
+                results.append(value)
+        return results, first_invalid
 
-        op_tuple = (OP_FROM_STRING, string)
-        # Canonicalize, remove leading and trailing whitespace, then underscores, lower-case
-        string = normalize('NFKC', string).strip().replace('_', '')
-        if HEX_SIGNIFICAND_PREFIX.match(string):
-            return self._from_hex_significand_string(op_tuple, string, context)
-        return decimal_to_binary.convert(op_tuple, self, string, context)
+    def parse_file(self, file, delimiter=None, context=None, packed=False, endianness=None,
+                   chunk_size=1 << 20):
+        '''Convert the literals of a text or binary file, or the file with the given path, as
+        parse_many() does and return its (results, first_invalid) pair.
+
+        Literals are separated by line breaks and delimiter, or by whitespace if delimiter
+        is None; empty literals are skipped.  The file is read in chunks of chunk_size
+        characters or bytes.
+        '''
+        if isinstance(file, (str, bytes, os.PathLike)):
+            with open(file, 'rb') as f:
+                return self.parse_file(f, delimiter, context, packed, endianness, chunk_size)
+        return self.parse_many(_iter_literals(file, delimiter, chunk_size), context, packed,
+                               endianness)
 
     def _from_hex_significand_string(self, op_tuple, string, context):
         '''Convert a string with hexadecimal significand to a rounded floating number of this
@@ -1152,6 +2116,10 @@ class BinaryFormat(NamedTuple):
 
         sign = string[0] == '-'
         groups = match.groups()
+        context = context or get_context()
+        if _over_limit(context.max_input_digits,
+                       len(groups[0]) - ('.' in groups[0]) + len(groups[4].lstrip('+-'))):
+            return ResourceLimit(op_tuple, self).signal(context)
         exponent = int(groups[4])
 
         # If a fraction was specified, the integer and fraction parts are in groups[1],
@@ -1184,6 +2152,71 @@ class BinaryFormat(NamedTuple):
             return text_format.format_non_finite(value, op_tuple, context)
         return text_format.format_hex(value)
 
+    def format_many(self, values, text_format=None, precision=0, out=None, context=None,
+                    hexadecimal=False, separator='\n', chunk_size=4096):
+        '''Format an iterable of values of this format as to_decimal_string() does, or as
+        to_string() does if hexadecimal is True, with text_format compiled once for the batch.
+
+        If out is None return a list of the strings.  Otherwise write each string followed by
+        separator to out, a text file or io.StringIO, chunk_size strings at a time, and
+        return the number written.
+
+        With default handling of Inexact the flag is raised once for the batch rather than
+        per value; other handlers are invoked per value as usual.
+        '''
+        context = context or get_context()
+        text_format = text_format or (DefaultHexFormat if hexadecimal else DefaultDecFormat)
+        compiled = text_format.compile()
+        format_decimal = compiled.format_decimal
+        format_hex = compiled.format_hex
+        format_non_finite = compiled.format_non_finite
+        rounding = context.rounding
+        # Whether Inexact can be accumulated rather than signalled per value
+        batch_inexact = context.handler(Inexact) == (HandlerKind.DEFAULT, None)
+        limited = context.max_output_digits is not None or context.max_bit_length is not None
+        decimal_precision = self.decimal_precision - 1
+        any_inexact = False
+        count = 0
+        results = []
+
+        for value in values:
+            if value.fmt is not self and value.fmt != self:
+                raise ValueError(f'value {value} is not of format {self}')
+            if not value.is_finite():
+                op_tuple = (OP_TO_STRING, value) if hexadecimal else (
+                    OP_TO_DECIMAL_STRING, value, precision)
+                text = format_non_finite(value, op_tuple, context)
+            elif hexadecimal:
+                text = format_hex(value)
+            elif limited and value._over_decimal_limits(precision, context):
+                op_tuple = (OP_TO_DECIMAL_STRING, value, precision)
+                text = ResourceLimit(op_tuple, format_non_finite(
+                    self.make_nan(False, False, 0), op_tuple, context)).signal(context)
+            else:
+                exponent, digits, is_inexact = value._to_decimal_parts(0, precision, rounding)
+                text = format_decimal(value.sign, exponent, digits,
+                                      precision and len(digits) or decimal_precision)
+                if is_inexact:
+                    if batch_inexact:
+                        any_inexact = True
+                    else:
+                        text = Inexact((OP_TO_DECIMAL_STRING, value, precision),
+                                       text).signal(context)
+            results.append(text)
+            if out is not None and len(results) >= chunk_size:
+                out.write(separator.join(results) + separator)
+                count += len(results)
+                results.clear()
+
+        if any_inexact:
+            context.flags |= Flags.INEXACT
+        if out is None:
+            return results
+        if results:
+            out.write(separator.join(results) + separator)
+            count += len(results)
+        return count
+
     def add(self, lhs, rhs, context=None):
         '''Return the sum LHS + RHS in this format.'''
         return self._add_sub((OP_ADD, lhs, rhs), lhs, rhs, False, context)
@@ -1218,19 +2251,21 @@ class BinaryFormat(NamedTuple):
         # is effectively an addition or subtraction of shifted significands.
         is_sub = is_subtract ^ lhs.sign ^ rhs.sign
         sign = lhs.sign
+        lhs_exponent = lhs.exponent_int()
+        rhs_exponent = rhs.exponent_int()
 
         # How much the LHS significand needs to be shifted left for exponents to match
-        lshift = lhs.exponent_int() - rhs.exponent_int()
+        lshift = lhs_exponent - rhs_exponent
 
         if is_sub:
             # Shift the significand with the greater exponent left until its effective
             # exponent is equal to the smaller exponent.  Then subtract them.
             if lshift >= 0:
                 significand = (lhs.significand << lshift) - rhs.significand
-                exponent = rhs.exponent_int()
+                exponent = rhs_exponent
             else:
                 significand = (rhs.significand << -lshift) - lhs.significand
-                exponent = lhs.exponent_int()
+                exponent = lhs_exponent
                 sign = not sign
             # If the result is negative then we must flip the sign and significand
             if significand < 0:
@@ -1242,10 +2277,10 @@ class BinaryFormat(NamedTuple):
             # sign of the lhs.
             if lshift >= 0:
                 significand = (lhs.significand << lshift) + rhs.significand
-                exponent = rhs.exponent_int()
+                exponent = rhs_exponent
             else:
                 significand = (rhs.significand << -lshift) + lhs.significand
-                exponent = lhs.exponent_int()
+                exponent = lhs_exponent
 
         # If two numbers add exactly to zero, IEEE 754 decrees it is a positive zero
         # unless rounding to minus infinity.  However, regardless of rounding mode, adding
@@ -1259,6 +2294,9 @@ class BinaryFormat(NamedTuple):
 
     def multiply(self, lhs, rhs, context=None):
         '''Returns the product of LHS and RHS in this format.'''
+        return self._multiply(lhs, rhs, context)
+
+    def _multiply(self, lhs, rhs, context):
         op_tuple = (OP_MULTIPLY, lhs, rhs)
 
         if lhs.e_biased == 0 or rhs.e_biased == 0:
@@ -1419,15 +2457,13 @@ class BinaryFormat(NamedTuple):
         sig <<= precision_bump
 
         # Newton-Raphson loop
-        est = self._normalize(False, exponent // 2, floor(sqrt(sig)), op_tuple, nearest_context)
+        est = self._normalize(False, exponent // 2, isqrt(sig), op_tuple, nearest_context)
         n = 1
         while True:
-            print(n, "EST", est.as_tuple(), est)
             assert est.significand     # FIXME: needn't hold
 
             nearest_context.flags = 0
             div = self.divide(value, est, nearest_context)
-            print(n, "DIV", div.as_tuple(), nearest_context)
 
             if est.e_biased == div.e_biased:
                 if abs(div.significand - est.significand) <= 1:
@@ -1456,8 +2492,6 @@ class BinaryFormat(NamedTuple):
         elif est.compare_ge(div, down_context):
             est = div
 
-        print("EST", est.as_tuple(), est)
-
         # EST and EST.next_up() now bound the precise result.  Decide if we need to round
         # it up.  This is only difficult with non-directed roundings.
         if context.round_to_nearest():
@@ -1518,7 +2552,7 @@ class BinaryFormat(NamedTuple):
                                                lhs.fmt.e_max + rhs.fmt.e_max + 1,
                                                lhs.fmt.e_min - (lhs.fmt.precision - 1)
                                                + rhs.fmt.e_min - (rhs.fmt.precision - 1))
-        product = product_fmt.multiply(lhs, rhs, context)
+        product = product_fmt._multiply(lhs, rhs, context)
         return self._add_sub(op_tuple, product, addend, False, context)
 
 
@@ -1638,15 +2672,7 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
         '''Packs this value to bytes of the given endianness.
 
         Endianness can be 'big' or 'little'.  If None, host-native endianness is used.'''
-        significand = self.significand
-        if self.e_biased == 0:
-            ieee_exponent = self.fmt.e_max * 2 + 1
-        elif significand < self.fmt.int_bit:
-            ieee_exponent = 0
-        else:
-            ieee_exponent = self.e_biased
-            significand -= self.fmt.int_bit
-        return self.fmt.pack(self.sign, ieee_exponent, significand, endianness)
+        return self.fmt._packer()(self, endianness)
 
     def nan_payload(self):
         '''Returns the NaN payload.  Raises RuntimeError if the value is not a NaN.'''
@@ -1747,9 +2773,11 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
             return (0, 1)
         exp = self.exponent_int()
         significand = self.significand
-        while exp < 0 and not (significand & 1):
-            significand >>= 1
-            exp += 1
+        if exp < 0:
+            # Strip trailing zero bits; significand & -significand is its lowest set bit
+            shift = min((significand & -significand).bit_length() - 1, -exp)
+            significand >>= shift
+            exp += shift
 
         if exp >= 0:
             n, d = significand << exp, 1
@@ -2189,12 +3217,50 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
         if self.e_biased == 0:
             return self._round_to_integral(OP_ROUND, rounding, context)
 
-        # This is the exponent of the leading digit
-        exponent, digits, _ = self._to_decimal_parts(1, ndigits, rounding)
-        exponent += 1 - len(digits)
-        sign = '-' if self.sign else ''
-        string = f'{sign}{digits}e{exponent}'
-        return decimal_to_binary.convert(op_tuple, self.fmt, string, context)
+        # Round the exact value scaled by 10^ndigits to an integer, then divide back with a
+        # single correct rounding in the context.  This is as though the rounded decimal
+        # were read back with from_string().
+        fmt = self.fmt
+        significand = self.significand
+        if significand == 0:
+            return self
+        context = context or get_context()
+        exponent = self.exponent_int()
+        if ndigits >= 0:
+            if exponent + ndigits >= 0:
+                # The scaled value is an integer so we are already rounded
+                if self.is_subnormal():
+                    return UnderflowExact(op_tuple, self).signal(context)
+                return self
+            if _over_limit(context.max_bit_length, fmt.precision + ndigits * log2_10):
+                return ResourceLimit(op_tuple, fmt).signal(context)
+            value, lost_fraction = shift_right(significand * 10 ** ndigits, -exponent)
+        elif (exponent + significand.bit_length()) < -ndigits * log2_10 - 1:
+            # Less than half of 10^-ndigits, so the scaled value rounds to 0 or 1
+            value, lost_fraction = 0, LF_LESS_THAN_HALF
+        else:
+            if _over_limit(context.max_bit_length,
+                           fmt.precision + max(abs(exponent), -ndigits * log2_10)):
+                return ResourceLimit(op_tuple, fmt).signal(context)
+            divisor = 10 ** -ndigits
+            if exponent >= 0:
+                significand <<= exponent
+            else:
+                divisor <<= -exponent
+            value, remainder = divmod(significand, divisor)
+            lost_fraction = _lost_fraction(remainder, divisor)
+        if lost_fraction != LF_EXACTLY_ZERO and round_up(rounding, lost_fraction, self.sign,
+                                                         bool(value & 1)):
+            value += 1
+        if value == 0:
+            return fmt.make_zero(self.sign)
+        if ndigits < 0:
+            if -ndigits * log2_10 > fmt.e_max + 1:
+                # Avoid a huge power of ten that certainly overflows
+                return fmt._normalize(self.sign, fmt.e_max + 1, 1, op_tuple, context)
+            if _over_limit(context.max_bit_length, value.bit_length() - ndigits * log2_10):
+                return ResourceLimit(op_tuple, fmt).signal(context)
+        return fmt._from_decimal_exact(self.sign, value, -ndigits, op_tuple, context)
 
 
     ##
@@ -2243,9 +3309,12 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
             if not self.significand:
                 return Compare.GREATER_THAN if other.sign else Compare.LESS_THAN
 
-            # Finally, two non-zero finite numbers with equal signs.  Compare the unbiased
-            # exponents of their explicit integer-bit significands.
-            exponent_diff = self.exponent() - other.exponent()
+            # Finally, two non-zero finite numbers with equal signs.  Compare the exponents
+            # of their leading bits; subnormals have fewer significant bits than normals of
+            # the same biased exponent.
+            lhs_sig, other_sig = self.significand, other.significand
+            exponent_diff = ((self.exponent_int() + lhs_sig.bit_length())
+                             - (other.exponent_int() + other_sig.bit_length()))
             if exponent_diff:
                 if (exponent_diff > 0) ^ (self.sign):
                     return Compare.GREATER_THAN
@@ -2253,7 +3322,6 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
                     return Compare.LESS_THAN
 
             # Exponents are the same.  We need to make their significands comparable.
-            lhs_sig, other_sig = self.significand, other.significand
             length_diff = lhs_sig.bit_length() - other_sig.bit_length()
             if length_diff > 0:
                 other_sig <<= length_diff
@@ -2361,8 +3429,29 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
     def compare_gu_signal(self, other, context=None):
         return self._compare(other, context, True) not in (Compare.EQUAL, Compare.LESS_THAN)
 
+    def total_order_key(self):
+        '''Return an integer key for this value whose natural ordering is the IEEE-754 total
+        order of values of our format.  Keys of values of different formats are not
+        comparable.'''
+        key = self.total_order_mag_key()
+        return -key - 1 if self.sign else key
+
+    def total_order_mag_key(self):
+        '''Return a non-negative integer key for this value whose natural ordering is the
+        IEEE-754 total order of the absolute values of our format.
+
+        Finite values count upwards from zero through the subnormals and then each binade.
+        Infinity follows the largest finite value, then signalling and quiet NaNs in
+        payload order.'''
+        fmt = self.fmt
+        if self.e_biased:
+            return (self.e_biased - 1) * fmt.int_bit + self.significand
+        return (fmt.e_max + fmt.e_bias + 1) * fmt.int_bit + self.significand
+
     def compare_total(self, other):
         '''The total order relation on a format.  A loose equivalent of <=.'''
+        if self.fmt is other.fmt:
+            return self.total_order_key() <= other.total_order_key()
         comp = self._compare_quiet(other, True)
         if comp == Compare.UNORDERED:
             # At least one is a NaN
@@ -2383,6 +3472,8 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
 
     def compare_total_mag(self, other):
         '''Per IEEE-754, totalOrderMag(x, y) is totalOrder(abs(x), abs(y)).'''
+        if self.fmt is other.fmt:
+            return self.total_order_mag_key() <= other.total_order_mag_key()
         return self.abs_quiet().compare_total(other.abs_quiet())
 
     def _max_min(self, flags, rhs, context):
@@ -2481,6 +3572,9 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
         op_tuple = (OP_TO_DECIMAL_STRING, self, precision)
 
         if self.is_finite():
+            if self._over_decimal_limits(precision, context):
+                return ResourceLimit(op_tuple, text_format.format_non_finite(
+                    self.fmt.make_nan(False, False, 0), op_tuple, context)).signal(context)
             exponent, digits, is_inexact = self._to_decimal_parts(0, precision, context.rounding)
             if precision == 0:
                 precision = self.fmt.decimal_precision - 1
@@ -2493,6 +3587,63 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
         else:
             return text_format.format_non_finite(self, op_tuple, context)
 
+    def _over_decimal_limits(self, precision, context):
+        '''Return True if converting this finite value to a decimal string with the given
+        precision would exceed the output digit or bit length limits of context.'''
+        if (context.max_output_digits is None and context.max_bit_length is None) \
+           or self.is_zero():
+            return False
+        e_p = self.exponent_int()
+        if precision > 0:
+            digits = precision
+        elif precision == 0:
+            digits = self.fmt.decimal_precision
+        else:
+            # The exact value is m * 2^e_p with m odd, which has the digits of m * 5^-e_p
+            # when e_p is negative
+            zeroes = (self.significand & -self.significand).bit_length() - 1
+            e_p += zeroes
+            bits = self.significand.bit_length() - zeroes
+            bits += e_p if e_p >= 0 else -e_p * (log2_10 - 1)
+            digits = int(bits / log2_10) + 1
+        return (_over_limit(context.max_output_digits, digits) or _over_limit(
+            context.max_bit_length, abs(e_p) + self.fmt.precision + digits * log2_10))
+
+    def iter_decimal_digits(self, chunk_size=1000):
+        '''Return a pair (exponent, chunks) for the exact decimal expansion of a finite value,
+        ignoring its sign.  exponent is the exponent of the leading digit, and chunks is an
+        iterator of strings of at most chunk_size digits, most significant first.  Digits
+        are generated lazily with memory bounded by the chunk size and the remainder.'''
+        if not self.is_finite():
+            raise ValueError('iter_decimal_digits of a non-finite value')
+        if self.is_zero():
+            return 0, iter(('0', ))
+
+        e_p = self.exponent_int()
+        R = self.significand << max(0, e_p)
+        S = 1 << max(0, -e_p)
+        # Estimate the exponent from the bit lengths, scale R / S into [1/10, 1) and correct
+        exponent = int((R.bit_length() - S.bit_length()) * 0.30102999566398120)
+        if exponent >= 0:
+            S *= 10 ** (exponent + 1)
+        else:
+            R *= 10 ** (-exponent - 1)
+        while R >= S:
+            S *= 10
+            exponent += 1
+        while R * 10 < S:
+            R *= 10
+            exponent -= 1
+
+        def chunks(R):
+            power = 10 ** chunk_size
+            while R:
+                U, R = divmod(R * power, S)
+                chunk = f'{U:0{chunk_size}d}'
+                yield chunk.rstrip('0') if R == 0 else chunk
+
+        return exponent, chunks(R)
+
     def _to_decimal_parts(self, mode, precision, rounding):
         '''Returns a tuple (exponent, digits, is_inexact) for finite numbers.
 
@@ -2504,14 +3655,33 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
 
         assert self.is_finite()
 
+        if mode == 0 and precision < 0:
+            exponent, chunks = self.iter_decimal_digits()
+            return exponent, ''.join(chunks), False
+
         e_p = self.exponent_int()
         R = self.significand << max(0, e_p)
         M = 1 << max(0, e_p)
         S = 1 << max(0, -e_p)
 
+        # Scale by a power of 10 in one step, leaving the loops below at most a couple of
+        # iterations.  The estimate from bit lengths is an underestimate of the number of
+        # iterations either loop would make.
+        exponent = -1
+        scale = int((S.bit_length() - R.bit_length() - 1) * 0.30102999) - 1
+        if scale > 0:
+            power = 10 ** scale
+            R *= power
+            M *= power
+            exponent -= scale
+        else:
+            scale = int((R.bit_length() - S.bit_length() - 1) * 0.30102999) - 1
+            if scale > 0:
+                S *= 10 ** scale
+                exponent += scale
+
         # This loop is for negative exponents H. It scales R until divmod() delivers the
         # first significant digit.
-        exponent = -1
         while R * 10 < S:
             exponent -= 1
             R *= 10
@@ -2690,9 +3860,26 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
 
     def __float__(self):
         # This coversion raises all signals
-        value = IEEEdouble.convert(self)
-        result, = unpack_double(value.pack())
-        return result
+        return self._to_float(None)
+
+    def _to_float(self, context):
+        '''Return the value converted to a Python float, signalling in context as converting
+        to IEEEdouble does.'''
+        significand = self.significand
+        if self.e_biased:
+            if not significand:
+                return -0.0 if self.sign else 0.0
+            fmt = self.fmt
+            if fmt.precision <= 53:
+                # Exact and signal-free if the result is a normal double
+                exponent = self.e_biased - fmt.e_bias - (fmt.precision - 1)
+                top = exponent + significand.bit_length() - 1
+                if -1022 <= top <= 1023:
+                    return ldexp(-significand if self.sign else significand, exponent)
+        elif not significand:
+            return -_float_inf if self.sign else _float_inf
+        return float_from_IEEEdouble(IEEEdouble._convert(self, (OP_CONVERT, self), context,
+                                                         False))
 
     def __trunc__(self):
         return self._to_integer(OP_CONVERT_TO_INTEGER, 0, 0, ROUND_DOWN)
@@ -2773,6 +3960,13 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
             return NotImplemented
         return other.floordiv(self)
 
+    def __reduce__(self):
+        '''Pickle as a reference to our format, see BinaryFormat.__reduce__(), and our total
+        order key, an integer encoding of our value.'''
+        fmt = self.fmt
+        return (_unpickle_binary, (fmt._kernel('reference', fmt._make_reference),
+                                   self.total_order_key()))
+
     def __hash__(self):
         '''Python hash.  Must hash equally to other types with the same value.'''
         if self.e_biased == 0:
@@ -2783,7 +3977,16 @@ class Binary(namedtuple('Binary', 'fmt sign e_biased significand')):
                 return 0
             raise TypeError('cannot hash a signalling NaN')
 
-        return hash(Fraction(*self.as_integer_ratio()))
+        # Python's numeric hash of significand * 2^exponent; see "Hashing of numeric
+        # types" in the Python documentation.  The modulus is the prime 2^hash_bits - 1, so
+        # 2^exponent is congruent to 2^(exponent % hash_bits) and negative exponents need
+        # no modular inverse.
+        fmt = self.fmt
+        exponent = self.e_biased - fmt.e_bias - (fmt.precision - 1)
+        result = (self.significand << (exponent % hash_bits)) % hash_modulus
+        if self.sign:
+            result = -result
+        return -2 if result == -1 else result
 
 #
 # Core decimal-to-binary conversion logic
@@ -2801,6 +4004,12 @@ class DecimalToBinary:
         self.scaling_err_neg = scaling_err_neg
         self.pow5_err = pow5_err
         self.pow5_recip_err = pow5_recip_err
+        # If not None, a map from (calc_fmt, n) to (5^n in calc_fmt, is_inexact) shared by
+        # the conversions of a batch
+        self.pow5_cache = None
+        # Literals whose significant digits and exponent together number at most this are
+        # converted exactly with integer arithmetic by try_exact()
+        self.exact_digits = 0
 
     def convert(self, op_tuple, fmt, string, context=None):
         '''Converts a string with a hexadecimal significand to a floating number of the
@@ -2814,11 +4023,13 @@ class DecimalToBinary:
         '''
         match = DEC_FLOAT_REGEX.match(string)
         if match is None:
-            return InvalidFromString(op_tuple, self).signal(context)
+            return InvalidFromString(op_tuple, fmt).signal(context)
 
         sign = string[0] == '-'
         groups = match.groups()
         context = context or get_context()
+        if _over_limit(context.max_input_digits, _literal_digits(groups)):
+            return ResourceLimit(op_tuple, fmt).signal(context)
 
         # Decimal float?
         if groups[1] is not None:
@@ -2884,6 +4095,13 @@ class DecimalToBinary:
         if frac_exp * log2_10 <= fmt.e_min - fmt.precision:
             return fmt.make_underflow_value(context.rounding, sign, False), UnderflowInexact
 
+        # The exact powers of 5 and the significand are about this many bits
+        if _over_limit(context.max_bit_length, max(len(sig_str), abs(exponent)) * log2_10):
+            return fmt.make_nan(False, False, 0), ResourceLimit
+
+        if len(sig_str) + abs(exponent) <= self.exact_digits:
+            return self.try_exact(sign, exponent, sig_str, fmt, context)
+
         # Figure out what exponent range we must have for our intermediate calculations
         # Each is sig_conversion, final_result, pow5_conversion
         e_max = ceil(max(max(len(sig_str), frac_exp) * log2_10,
@@ -2898,21 +4116,64 @@ class DecimalToBinary:
         # obviously out-of-range exponents above.  Intermediate calculations must not
         # overflow nor use subnormal numbers.
         precision = fmt.precision
+        escalations = 0
         while True:
             if not self.debug:
                 precision = (precision + 63) & ~63
 
-            calc_fmt = BinaryFormat.from_triple(precision, e_max, e_min)
+            if self.debug:
+                calc_fmt = BinaryFormat.from_triple(precision, e_max, e_min)
+            else:
+                # Widen the exponent range to a power of two.  There are then few
+                # calculation formats, and the kernels of those in recent use stay cached.
+                # They are not interned; interned formats are never freed.
+                calc_fmt = _calculation_format(precision, (1 << e_max.bit_length()) - 1,
+                                               -(1 << (-e_min).bit_length()))
 
             result, exc = self.try_once(sign, exponent, sig_str, fmt, calc_fmt, context)
             if result is None:
                 # The result and/or the signal to raise cannot be determined.  Increase
                 # precision and retry.
                 precision += 1 if self.debug else precision // 2
+                context.escalations += 1
+                escalations += 1
+                if _over_limit(context.max_escalations, escalations):
+                    return fmt.make_nan(False, False, 0), ResourceLimit
                 continue
 
             return result, exc
 
+    def try_exact(self, sign, exponent, sig_str, fmt, context):
+        '''As for try_many(), but round the exact value once.  For literals of moderate size
+        computing the exact value with integer arithmetic is cheaper than the iterations of
+        try_many().'''
+        convert_context = Context(rounding=context.rounding,
+                                  tininess_after=context.tininess_after)
+        result = fmt._from_decimal_exact(sign, int(sig_str), exponent, None, convert_context)
+        flags = convert_context.flags
+        if flags & Flags.OVERFLOW:
+            return result, Overflow
+        if flags & Flags.INEXACT:
+            return result, UnderflowInexact if flags & Flags.UNDERFLOW else Inexact
+        if result.is_subnormal():
+            return result, UnderflowExact
+        return result, None
+
+    def pow5(self, calc_fmt, n):
+        '''Return a pair (pow5, is_inexact) where pow5 is 5^n correctly rounded to calc_fmt.'''
+        key = (calc_fmt, n)
+        cache = self.pow5_cache
+        if cache is not None:
+            result = cache.get(key)
+            if result is not None:
+                return result
+        calc_context = Context(rounding=ROUND_HALF_EVEN)
+        pow5 = calc_fmt._normalize(False, 0, pow(5, n), None, calc_context)
+        result = pow5, bool(calc_context.flags & Flags.INEXACT)
+        if cache is not None:
+            cache[key] = result
+        return result
+
     def try_once(self, sign, exponent, sig_str, fmt, calc_fmt, context):
         # We have done a calculation in whose lowest bits will be rounded.  We want to
         # know how far away the value of theese rounded bits is, in ULPs, from the
@@ -2957,13 +4218,8 @@ class DecimalToBinary:
             sig_err += 1
         calc_context.flags &= ~Flags.INEXACT
 
-        pow5_int = pow(5, abs(sig_exponent))
-        pow5 = calc_fmt._normalize(False, 0, pow5_int, None, calc_context)
-        if calc_context.flags & Flags.INEXACT:
-            pow5_err = self.pow5_err
-        else:
-            pow5_err = 0
-        calc_context.flags &= ~Flags.INEXACT
+        pow5, pow5_inexact = self.pow5(calc_fmt, abs(sig_exponent))
+        pow5_err = self.pow5_err if pow5_inexact else 0
 
         # Call scaleb() since we scaled by 5^n and actually want 10^n
         if sig_exponent >= 0:
@@ -3049,6 +4305,82 @@ class DecimalToBinary:
 # Useful internal helper routines
 #
 
+def _iter_literals(file, delimiter, chunk_size):
+    '''Yield the literals of a text or binary file separated by line breaks and delimiter, or
+    by whitespace if delimiter is None, reading it in chunks.  Empty literals are skipped.'''
+    tail = None
+    while True:
+        chunk = file.read(chunk_size)
+        if tail is None:
+            # The first chunk tells if the file is text or binary
+            tail = chunk[:0]
+            if isinstance(chunk, bytes) and isinstance(delimiter, str):
+                delimiter = delimiter.encode()
+        if not chunk:
+            break
+        text = tail + chunk
+        if delimiter is None:
+            pieces = text.split()
+            # The last literal may continue in the next chunk
+            tail = pieces.pop() if pieces and not text[-1:].isspace() else text[:0]
+        else:
+            pieces = delimiter.join(text.splitlines()).split(delimiter)
+            if text[-1:] in ('\n', '\r', b'\n', b'\r'):
+                tail = text[:0]
+            else:
+                tail = pieces.pop()
+        yield from (piece for piece in pieces if piece.strip())
+    if tail.strip():
+        yield tail
+
+
+def _canonical_literal(string):
+    '''Canonicalize a literal, then remove leading and trailing whitespace and underscores.'''
+    # ASCII is already canonical
+    if not string.isascii():
+        string = normalize('NFKC', string)
+    return string.strip().replace('_', '')
+
+
+def _is_literal(literal):
+    '''Return True if a literal canonicalized by _canonical_literal() is syntactically
+    valid.'''
+    if HEX_SIGNIFICAND_PREFIX.match(literal):
+        return HEX_SIGNIFICAND_REGEX.match(literal) is not None
+    return DEC_FLOAT_REGEX.match(literal) is not None
+
+
+@lru_cache(maxsize=64)
+def _calculation_format(precision, e_max, e_min):
+    '''Return a working format of DecimalToBinary.  The same object is returned while it is in
+    recent use, so its kernels stay cached.'''
+    triple = (precision, e_max, e_min)
+    return _interned_formats.get(triple) or BinaryFormat.from_triple(*triple)
+
+
+def _over_limit(limit, amount):
+    # True if amount exceeds a resource limit of a context; None is unlimited
+    return limit is not None and amount > limit
+
+
+def _literal_digits(groups):
+    # The number of digits, including those of the exponent or NaN payload, of a literal
+    # matched by DEC_FLOAT_REGEX
+    if groups[1] is not None:
+        return len(groups[1]) - ('.' in groups[1]) + len((groups[6] or '').lstrip('+-'))
+    return len(groups[11] or '')
+
+
+def _lost_fraction(remainder, divisor):
+    # The lost fraction of a division with the given non-negative remainder
+    if remainder == 0:
+        return LF_EXACTLY_ZERO
+    remainder *= 2
+    if remainder < divisor:
+        return LF_LESS_THAN_HALF
+    return LF_EXACTLY_HALF if remainder == divisor else LF_MORE_THAN_HALF
+
+
 def lost_bits_from_rshift(significand, bits):
     '''Return what the lost bits would be were the significand shifted right the given number
     of bits (negative is a left shift).
@@ -3082,6 +4414,12 @@ def round_up(rounding, lost_fraction, sign, is_odd):
     sign is the sign of the number, and is_odd indicates if the LSB of the new
     significand is set, which is needed for ties-to-even rounding.
     '''
+    return round_up_table[rounding][lost_fraction * 4 + sign * 2 + is_odd]
+
+
+def _round_up_slow(rounding, lost_fraction, sign, is_odd):
+    '''The rounding decision round_up() makes, from first principles.  Used to build
+    round_up_table.'''
     if lost_fraction == LF_EXACTLY_ZERO:
         return False
 
@@ -3104,9 +4442,74 @@ def round_up(rounding, lost_fraction, sign, is_odd):
         return lost_fraction != LF_LESS_THAN_HALF
 
 
+# For each rounding mode, a tuple of round_up() decisions indexed by
+#
+#    lost_fraction * 4 + sign * 2 + is_odd
+#
+round_up_table = {
+    rounding: tuple(_round_up_slow(rounding, lost_fraction, bool(sign), bool(is_odd))
+                    for lost_fraction in range(4) for sign in range(2) for is_odd in range(2))
+    for rounding in (ROUND_CEILING, ROUND_FLOOR, ROUND_DOWN, ROUND_UP,
+                     ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_HALF_DOWN)
+}
+
+
 def IEEEdouble_from_float_quiet(value):
     '''Return an IEEEdouble converted from a Python float value.'''
-    return IEEEdouble._unpack_value_quiet(pack_double(value))
+    bits, = unpack_bits(pack_double(value))
+    e_biased = (bits >> 52) & 0x7ff
+    significand = bits & 0xfffffffffffff
+    if e_biased == 0:
+        e_biased = 1
+    elif e_biased == 0x7ff:
+        e_biased = 0
+    else:
+        significand |= 0x10000000000000
+    return make_binary((IEEEdouble, bits > 0x7fffffffffffffff, e_biased, significand))
+
+
+def float_from_IEEEdouble(value):
+    '''Return the Python float with the encoding of an IEEEdouble value.'''
+    e_biased = value.e_biased
+    significand = value.significand
+    if e_biased == 0:
+        e_biased = 0x7ff
+    elif significand < 0x10000000000000:
+        e_biased = 0
+    else:
+        significand &= 0xfffffffffffff
+    result, = unpack_double(pack_bits((value.sign << 63) | (e_biased << 52) | significand))
+    return result
+
+
+def _unpickle_format(reference):
+    '''Return the format from its pickled reference: the equal interned format if there is
+    one, otherwise an uninterned format.'''
+    fmt = _referenced_formats.get(reference)
+    if fmt is None:
+        fmt = _referenced_format(reference)
+        interned = _interned_formats.get(fmt[:3])
+        if interned is None:
+            return fmt
+        fmt = _referenced_formats[reference] = interned
+    return fmt
+
+
+@lru_cache(maxsize=64)
+def _referenced_format(reference):
+    '''Return a new format from its pickled reference.  Cached so that values of a format
+    that is not interned unpickle to the same format, without interning it.'''
+    if isinstance(reference, int):
+        return BinaryFormat.from_IEEE(reference)
+    return BinaryFormat.from_triple(*reference)
+
+
+def _unpickle_binary(reference, key):
+    '''Return a value from its pickled format reference and total order key.'''
+    fmt = _referenced_formats.get(reference)
+    if fmt is None:
+        fmt = _unpickle_format(reference)
+    return fmt.from_total_order_key(key)
 
 
 def compare_any_eq(value, other):
@@ -3153,6 +4556,8 @@ def convert_for_arith(value, other):
 
     if isinstance(other, float):
         other = IEEEdouble_from_float_quiet(other)
+        if value.fmt is IEEEdouble:
+            return value, other
 
     if not isinstance(other, Binary):
         return value, None
@@ -3203,40 +4608,255 @@ def compare_any(value, other):
 
 DefaultContext = Context()
 DefaultContext.set_handler((Invalid, DivisionByZero, Overflow), HandlerKind.RAISE)
-tls = threading.local()
+# The current context.  Being a context variable, each thread and each asyncio task has its
+# own.  Unset until first use in a thread, when it becomes a copy of DefaultContext.
+current_context = ContextVar('ieee754_context')
 
 
 def get_context():
-    try:
-        return tls.context
-    except AttributeError:
-        tls.context = DefaultContext.copy()
-        return tls.context
+    '''Return the current context.'''
+    context = current_context.get(None)
+    if context is None:
+        context = DefaultContext.copy()
+        current_context.set(context)
+    return context
 
 
 def set_context(context):
-    '''Sets the current thread's context to context (not a copy of it).'''
-    tls.context = context
+    '''Sets the current context to context (not a copy of it).'''
+    current_context.set(context)
+
+
+# Weak references to the contexts given counters, a tracer or a memo cache, keyed by id
+_instrumented_contexts = {}
+# Pairs (cls, name, original) of the methods replaced while instrumentation is switched in
+_instrumented_methods = []
+# The memo cache of contexts without one of their own
+_global_memo = None
+# The signals raised by the operations being memoized in this thread or task.  A stack of
+# (context, signals) pairs, one per operation, with None pushed while a signal is being
+# handled.
+_memo_frames = ContextVar('ieee754_memo_frames')
+
+
+def set_global_memo(memo):
+    '''Memoize the results of operations performed under contexts without a memo cache of their
+    own in memo, a MemoCache.  If memo is None stop.'''
+    global _global_memo
+    _global_memo = memo
+    _update_instrumentation()
+
+
+def _update_instrumentation():
+    _switch_instrumentation(bool(_instrumented_contexts) or _global_memo is not None)
+
+
+def _forget_instrumented(key, _ref):
+    '''Called when an instrumented context is freed.'''
+    _instrumented_contexts.pop(key, None)
+    _update_instrumentation()
+
+
+def _instrumented_method(op, method, is_fmt):
+    '''Return a wrapper of method, a method of BinaryFormat if is_fmt is True otherwise of
+    Binary, that counts, traces and memoizes op under the context it is performed under.'''
+    parameters = list(inspect.signature(method).parameters)
+    # The positional index of the context argument after self, if any
+    index = parameters.index('context') - 1 if 'context' in parameters else None
+
+    def instrumented_method(self, *args, **kwargs):
+        context = kwargs.get('context')
+        if context is None and index is not None and len(args) > index:
+            context = args[index]
+        context = context or get_context()
+        fmt = self if is_fmt else self.fmt
+        if context.counters is not None:
+            context.counters.count_op(op, fmt, context.rounding)
+        memo = context.memo if context.memo is not None else _global_memo
+        tracer = context.tracer
+        if tracer is None:
+            if memo is None:
+                return method(self, *args, **kwargs)
+            return _memoized_call(memo, op, fmt, method, index, context, self, args, kwargs)
+
+        operands = args if is_fmt else (self, ) + args
+        if index is not None:
+            operands = operands[:index + (not is_fmt)]
+        escalations = context.escalations
+        start = perf_counter_ns()
+        try:
+            if memo is None:
+                return method(self, *args, **kwargs)
+            return _memoized_call(memo, op, fmt, method, index, context, self, args, kwargs)
+        finally:
+            tracer(TraceRecord(op, fmt, operands, perf_counter_ns() - start,
+                               context.escalations - escalations))
+
+    instrumented_method.__name__ = method.__name__
+    instrumented_method.__qualname__ = method.__qualname__
+    instrumented_method.__doc__ = method.__doc__
+    instrumented_method.__wrapped__ = method
+    return instrumented_method
+
+
+def _memo_operand(operand):
+    '''Return a hashable key distinguishing operand from all other operands, including values
+    that compare equal such as the two zeroes, or None if it cannot be memoized.'''
+    kind = type(operand)
+    if kind is Binary:
+        return tuple(operand)
+    if kind in (str, bytes, int, bool) or operand is None:
+        return (kind, operand)
+    if kind is float:
+        return (kind, pack_double(operand))
+    if kind is Decimal:
+        return (kind, operand.as_tuple())
+    if kind is Fraction:
+        return (kind, operand.numerator, operand.denominator)
+    return None
+
+
+def _operand_positions(op_tuple, operands):
+    '''Return a tuple of (position, n) pairs for the elements of op_tuple that are operands[n].'''
+    return tuple((position, n) for position, item in enumerate(op_tuple)
+                 for n, operand in enumerate(operands) if item is operand)
+
+
+def _memoized_call(memo, op, fmt, method, index, context, self, args, kwargs):
+    '''Perform method, which performs op, looking up and storing its result in memo.'''
+    key = [op, fmt, context.rounding, context.tininess_after, context.max_input_digits,
+           context.max_output_digits, context.max_bit_length, context.max_escalations]
+    operands = [self] if isinstance(self, Binary) else []
+    operands.extend(arg for n, arg in enumerate(args) if n != index)
+    for name in sorted(kwargs):
+        if name != 'context':
+            key.append(name)
+            operands.append(kwargs[name])
+    for operand in operands:
+        operand_key = _memo_operand(operand)
+        if operand_key is None:
+            return method(self, *args, **kwargs)
+        key.append(operand_key)
+    key = tuple(key)
+
+    entry = memo.lookup(key)
+    if entry is not None:
+        result, value, signals = entry
+        if not signals:
+            return result
+        # Replay the signals through the base class method; signals that a subclass
+        # method raises in turn, like Inexact after Overflow, were recorded separately
+        signal = IEEEError.signal
+        for exc_class, op_tuple, positions in signals:
+            if positions:
+                # The exception refers to our operands, not those it was recorded with
+                op_tuple = list(op_tuple)
+                for position, n in positions:
+                    op_tuple[position] = operands[n]
+                op_tuple = tuple(op_tuple)
+            value = signal(exc_class(op_tuple, value), context)
+        return value
+
+    frames = _memo_frames.get(None)
+    if frames is None:
+        frames = []
+        _memo_frames.set(frames)
+    # Filled with each signal raised in context followed by the result of handling it.
+    # Signals raised in other contexts, for example those of internal calculations, do not
+    # affect the result.
+    frame = []
+    frames.append((context, frame))
+    try:
+        result = method(self, *args, **kwargs)
+    finally:
+        frames.pop()
+    # Only store the result if a replay reproduces it: each signal's default result must
+    # be the result of handling the previous one, and the result that of handling the last
+    if not isinstance(result, (Binary, int, str)) or len(frame) % 2:
+        return result
+    if frame:
+        if frame[-1] is not result or any(frame[n].default_result is not frame[n - 1]
+                                          for n in range(2, len(frame), 2)):
+            return result
+        signals = tuple((exc.__class__, exc.op_tuple, _operand_positions(exc.op_tuple, operands))
+                        for exc in frame[::2])
+        memo.store(key, (result, frame[0].default_result, signals))
+    else:
+        memo.store(key, (result, None, ()))
+    return result
+
+
+def _instrumented_signal(signal):
+    def instrumented_signal(self, context=None):
+        context = context or get_context()
+        if context.counters is not None:
+            context.counters.count_signal(self.__class__)
+        frames = _memo_frames.get(None)
+        if not frames:
+            return signal(self, context)
+        # Record the signal for the operations being memoized since the innermost signal
+        # being handled.  Signals raised while handling this one are not recorded; replaying
+        # this one raises them again.
+        recording = []
+        for frame in reversed(frames):
+            if frame is None:
+                break
+            if frame[0] is context:
+                frame[1].append(self)
+                recording.append(frame[1])
+        frames.append(None)
+        try:
+            result = signal(self, context)
+        finally:
+            frames.pop()
+        for frame in recording:
+            frame.append(result)
+        return result
+
+    instrumented_signal.__doc__ = signal.__doc__
+    instrumented_signal.__wrapped__ = signal
+    return instrumented_signal
+
+
+def _switch_instrumentation(on):
+    '''Switch instrumentation in or out by replacing or restoring the methods performing the
+    OP_ operations and IEEEError.signal().'''
+    if bool(_instrumented_methods) == on:
+        return
+    if on:
+        for op in _all_ops:
+            # Binary.to_string() is performed by BinaryFormat.to_string()
+            for cls in (BinaryFormat, Binary):
+                method = cls.__dict__.get(op)
+                if method is not None:
+                    _instrumented_methods.append((cls, op, method))
+                    setattr(cls, op, _instrumented_method(op, method, cls is BinaryFormat))
+                    break
+        _instrumented_methods.append((IEEEError, 'signal', IEEEError.signal))
+        IEEEError.signal = _instrumented_signal(IEEEError.signal)
+    else:
+        for cls, name, method in _instrumented_methods:
+            setattr(cls, name, method)
+        _instrumented_methods.clear()
 
 
 class LocalContext:
-    '''A context manager that will set the current context for the active thread to a copy of
-    context on entry to the with-statement and restore the previous context on exit.  If
-    no context is specified a copy of the current context is taken instead.
+    '''A context manager that will set the current context to a copy of context on entry to the
+    with-statement and restore the previous context on exit.  If no context is specified a
+    copy of the current context is taken instead.
     '''
 
     def __init__(self, context=None):
-        self.saved_context = None
+        self.token = None
         self.context_to_set = context
 
     def __enter__(self):
-        self.saved_context = get_context()
-        context = (self.context_to_set or self.saved_context).copy()
-        set_context(context)
+        context = (self.context_to_set or get_context()).copy()
+        self.token = current_context.set(context)
         return context
 
     def __exit__(self, etype, value, traceback):
-        set_context(self.saved_context)
+        current_context.reset(self.token)
 
 
 local_context = LocalContext
@@ -3246,7 +4866,11 @@ local_context = LocalContext
 #
 
 log2_10 = log2(10)
+hash_modulus = sys.hash_info.modulus
+hash_bits = hash_modulus.bit_length()
 host_endianness = 'little' if Struct('<d').pack(-0.0)[0] == 0 else 'big'
+_float_inf = float('inf')
+make_binary = Binary._make
 
 IEEEhalf = BinaryFormat.from_IEEE(16)
 IEEEsingle = BinaryFormat.from_IEEE(32)
@@ -3259,7 +4883,25 @@ x87extended = BinaryFormat.from_pair(64, 15)
 x87double = BinaryFormat.from_pair(53, 15)
 x87single = BinaryFormat.from_pair(24, 15)
 
+# Interned formats keyed by (precision, e_max, e_min), and the set of their ids.  See
+# BinaryFormat.intern().
+_interned_formats = {}
+_interned_ids = set()
+# Interned formats keyed by their pickled reference.  See BinaryFormat.__reduce__().
+_referenced_formats = {}
+# Specialized kernels of interned formats, keyed by (id(fmt), kind), and (fmt, kernel)
+# pairs of the kernels of other formats most recently used.  See BinaryFormat._kernel().
+_kernels = {}
+_transient_kernels = OrderedDict()
+TRANSIENT_KERNELS_MAX = 256
+
+for _fmt in (IEEEhalf, IEEEsingle, IEEEdouble, IEEEquad, x87extended, x87double, x87single):
+    _fmt.intern()
+
 decimal_to_binary = DecimalToBinary()
+# Converts moderately-sized literals exactly; for conversions not from strings
+exact_decimal_to_binary = DecimalToBinary()
+exact_decimal_to_binary.exact_digits = 800
 _positive_zero = IEEEdouble.make_zero(False)
 
 HEX_SIGNIFICAND_PREFIX = re.compile('[-+]?0x', re.IGNORECASE)
@@ -0,0 +1,192 @@
+#
+# Seeded generation of random values with distributions of interest to IEEE-754 testing
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from .ieee754 import Binary, BinaryFormat
+
+
+__all__ = ()
+
+
+# The distributions Generator offers, by method name
+DISTRIBUTIONS = ('uniform', 'log_uniform', 'subnormal', 'subnormal_heavy', 'near_overflow',
+                 'short_significand', 'nans')
+
+
+class Generator:
+    '''Generates batches of random values of a format.
+
+    The values generated are a function of the format, seed and stream only, so
+    independent generators with the same seed and different formats or streams, in this or
+    other processes, produce independent reproducible sequences.  Values are built with the
+    parts already known to be valid so construction skips validation.
+    '''
+
+    def __init__(self, fmt, seed=None, stream=0):
+        if not isinstance(fmt, BinaryFormat):
+            raise TypeError('fmt must be a BinaryFormat')
+        if seed is None:
+            seed = int.from_bytes(os.urandom(16), 'big')
+        self.fmt = fmt
+        self.seed = seed
+        self.stream = stream
+        # String seeds are hashed, so nearby streams and similar formats are uncorrelated
+        self.rng = random.Random(f'{seed}/{fmt.precision},{fmt.e_max},{fmt.e_min}/{stream}')
+
+    def values(self, distribution, count):
+        '''Return a list of count values with the named distribution, one of
+        DISTRIBUTIONS.'''
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f'unknown distribution {distribution!r}')
+        return getattr(self, distribution)(count)
+
+    def packed(self, distribution, count, endianness='little'):
+        '''Return count values with the named distribution packed into a bytes object with
+        the given endianness.  The format must be an interchange format.'''
+        if not self.fmt.fmt_width:
+            raise RuntimeError('not an interchange format')
+        return b''.join(value.pack(endianness) for value in self.values(distribution, count))
+
+    def _finite(self, e_biaseds, signed_significands):
+        # e_biaseds are of normal numbers, or 1 for subnormals and zeroes.  The sign is the
+        # low bit of each signed significand.
+        fmt = self.fmt
+        make = Binary._make
+        return [make((fmt, bool(signed & 1), e_biased, signed >> 1))
+                for e_biased, signed in zip(e_biaseds, signed_significands)]
+
+    def _signed_significands(self, count):
+        # Random normal significands shifted left one bit with a random sign in the low bit
+        getrandbits = self.rng.getrandbits
+        fmt = self.fmt
+        bits = fmt.precision
+        int_bit = fmt.int_bit << 1
+        return [getrandbits(bits) | int_bit for _ in range(count)]
+
+    def uniform(self, count):
+        '''Values uniformly distributed over the encodings of the format: zeroes,
+        subnormals, normals, infinities and NaNs each in proportion to their number.'''
+        fmt = self.fmt
+        # The range of total order keys; see Binary.total_order_key()
+        max_key = (fmt.e_max + fmt.e_bias + 1) * fmt.int_bit + fmt.quiet_bit * 2 - 1
+        randrange = self.rng.randrange
+        from_key = fmt.from_total_order_key
+        return [from_key(randrange(-max_key - 1, max_key + 1)) for _ in range(count)]
+
+    def log_uniform(self, count):
+        '''Normal values with exponents uniformly distributed over the format's exponent
+        range, and random significands.'''
+        fmt = self.fmt
+        randrange = self.rng.randrange
+        e_biaseds = [randrange(fmt.e_min, fmt.e_max + 1) + fmt.e_bias for _ in range(count)]
+        return self._finite(e_biaseds, self._signed_significands(count))
+
+    def subnormal(self, count):
+        '''Subnormal values only, with random numbers of leading zero bits.'''
+        fmt = self.fmt
+        randrange = self.rng.randrange
+        precision = fmt.precision
+        # Shift out at least one bit but never all of them, so the value is not zero
+        return self._finite([1] * count, [
+            ((signed >> (randrange(1, precision) + 1)) << 1) | (signed & 1)
+            for signed in self._signed_significands(count)])
+
+    def subnormal_heavy(self, count):
+        '''Mostly subnormals, with random numbers of leading zero bits, and otherwise normal
+        numbers within the bottom few binades.'''
+        fmt = self.fmt
+        rng = self.rng
+        e_biaseds = []
+        significands = []
+        for signed in self._signed_significands(count):
+            if rng.random() < 0.75:
+                e_biaseds.append(1)
+                shift = rng.randrange(1, fmt.precision + 1)
+                signed = ((signed >> (shift + 1)) << 1) | (signed & 1)
+            else:
+                e_biaseds.append(fmt.e_min + fmt.e_bias + rng.randrange(0, 4))
+            significands.append(signed)
+        return self._finite(e_biaseds, significands)
+
+    def near_overflow(self, count):
+        '''Normal values within a few binades of overflow; a quarter have all-ones
+        significands so are at the top of their binade.'''
+        fmt = self.fmt
+        rng = self.rng
+        top = fmt.e_max + fmt.e_bias
+        e_biaseds = [top - rng.randrange(0, 4) for _ in range(count)]
+        all_ones = (fmt.max_significand << 1)
+        significands = [(signed | all_ones) if rng.random() < 0.25 else signed
+                        for signed in self._signed_significands(count)]
+        return self._finite(e_biaseds, significands)
+
+    def short_significand(self, count, bits=11):
+        '''Normal values with exponents uniform over the exponent range and significands of
+        at most bits significant bits, so that operations on them are often exact.'''
+        fmt = self.fmt
+        rng = self.rng
+        bits = min(bits, fmt.precision)
+        # Keep the top bits and the sign bit
+        mask = ((1 << bits) - 1) << (fmt.precision - bits + 1) | 1
+        e_biaseds = [rng.randrange(fmt.e_min, fmt.e_max + 1) + fmt.e_bias
+                     for _ in range(count)]
+        return self._finite(e_biaseds, [signed & mask
+                                        for signed in self._signed_significands(count)])
+
+    def nans(self, count):
+        '''NaNs, quiet and signalling, of either sign, with a mix of payloads: zero, one,
+        small, the largest, and random.'''
+        fmt = self.fmt
+        rng = self.rng
+        make = Binary._make
+        quiet_bit = fmt.quiet_bit
+        max_payload = quiet_bit - 1
+        payloads = (0, 1, 2, max_payload, max_payload >> 1)
+        result = []
+        for _ in range(count):
+            sign = rng.random() < 0.5
+            if rng.random() < 0.5:
+                payload = rng.choice(payloads)
+            else:
+                payload = rng.getrandbits(max_payload.bit_length())
+            if rng.random() < 0.5:
+                significand = quiet_bit | payload
+            else:
+                # A signalling NaN's payload must not be zero
+                significand = payload or 1
+            result.append(make((fmt, sign, 0, significand)))
+        return result
+
+
+def _generate_chunk(args):
+    fmt, distribution, count, seed, stream, packed = args
+    generator = Generator(fmt, seed, stream)
+    if packed:
+        return generator.packed(distribution, count)
+    return generator.values(distribution, count)
+
+
+def generate(fmt, distribution, count, seed, workers=None, chunksize=100_000, packed=False):
+    '''Return count values of fmt with the named distribution, generated in chunks of
+    chunksize values across workers processes.  Chunk n is generated by the stream n
+    generator for seed, so the result depends only on the arguments other than workers.
+    If workers is None os.cpu_count() is used; if it is 1 the values are generated in
+    this process.  If packed is True return the values packed into a single little-endian
+    bytes object.'''
+    chunks = [(fmt, distribution, min(chunksize, count - start), seed, stream, packed)
+              for stream, start in enumerate(range(0, count, chunksize))]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [_generate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_generate_chunk, chunks))
+    if packed:
+        return b''.join(results)
+    return [value for result in results for value in result]
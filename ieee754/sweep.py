@@ -0,0 +1,281 @@
+#
+# Exhaustive sweeps of an operation over every encoding of a small format
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+# Usage: python -m ieee754.sweep --help
+#
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from .ieee754 import (
+    Binary, BinaryFormat, Context, IEEEhalf,
+    ROUND_CEILING, ROUND_FLOOR, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN, ROUND_HALF_UP,
+    ROUND_HALF_DOWN,
+)
+
+
+__all__ = ()
+
+
+# Formats small enough to sweep.  bfloat16 and the 8-bit formats follow the IEEE-754
+# encoding rules, so have infinities and NaNs.
+FORMATS = {
+    'IEEEhalf': IEEEhalf,
+    'bfloat16': BinaryFormat.from_pair(8, 8),
+    'E5M2': BinaryFormat.from_pair(3, 5),
+    'E4M3': BinaryFormat.from_pair(4, 4),
+}
+
+ROUNDINGS = (ROUND_CEILING, ROUND_FLOOR, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN,
+             ROUND_HALF_UP, ROUND_HALF_DOWN)
+
+TININESS = (False, True)
+
+# A map from operation name to (arity, func).  func(fmt, operands, context) returns the
+# result, a value of fmt.
+OPERATIONS = {
+    'add': (2, lambda fmt, ops, context: fmt.add(*ops, context)),
+    'subtract': (2, lambda fmt, ops, context: fmt.subtract(*ops, context)),
+    'multiply': (2, lambda fmt, ops, context: fmt.multiply(*ops, context)),
+    'divide': (2, lambda fmt, ops, context: fmt.divide(*ops, context)),
+    'remainder': (2, lambda fmt, ops, context: ops[0].remainder(ops[1], context)),
+    'fmod': (2, lambda fmt, ops, context: ops[0].fmod(ops[1], context)),
+    'max_num': (2, lambda fmt, ops, context: ops[0].max_num(ops[1], context)),
+    'min_num': (2, lambda fmt, ops, context: ops[0].min_num(ops[1], context)),
+    'sqrt': (1, lambda fmt, ops, context: fmt.sqrt(ops[0], context)),
+    'convert': (1, lambda fmt, ops, context: fmt.convert(ops[0], context)),
+    'next_up': (1, lambda fmt, ops, context: ops[0].next_up(context)),
+    'next_down': (1, lambda fmt, ops, context: ops[0].next_down(context)),
+    'round_to_integral_exact':
+        (1, lambda fmt, ops, context: ops[0].round_to_integral_exact(context)),
+}
+
+# Operations delivering a result in the format of their operands, which must therefore be
+# the result format
+OPERAND_FORMAT_OPERATIONS = frozenset(('remainder', 'fmod', 'max_num', 'min_num', 'next_up',
+                                       'next_down', 'round_to_integral_exact'))
+
+# The first line of a sweep output file
+MAGIC = b'ieee754-sweep 1\n'
+
+
+class Mismatch(NamedTuple):
+    '''A case whose result differed from the reference.'''
+    rounding: str
+    tininess_after: bool
+    operands: tuple
+    result: Binary
+    flags: int
+    expected: Binary
+    expected_flags: int
+
+
+class SweepResult:
+    '''The outcome of a sweep: the number of cases run, and the first max_mismatches
+    mismatches against the reference, if there was one.'''
+
+    def __init__(self, cases, mismatches):
+        self.cases = cases
+        self.mismatches = mismatches
+
+    def __repr__(self):
+        return f'<SweepResult cases={self.cases:,d} mismatches={len(self.mismatches):,d}>'
+
+
+class Sweep:
+    '''An exhaustive sweep of an operation over every encoding of fmt, or for a binary
+    operation every pair of encodings, under each of the given rounding modes and tininess
+    modes.  Results are of result_fmt, which defaults to fmt.
+
+    Cases are numbered by rounding mode, then tininess mode, then the operand encodings read
+    as a big-endian number; this is the order of the records of the output file.
+    '''
+
+    def __init__(self, op, fmt, result_fmt=None, roundings=ROUNDINGS, tininess=TININESS):
+        if op not in OPERATIONS:
+            raise ValueError(f'unknown operation {op!r}')
+        result_fmt = result_fmt or fmt
+        if op in OPERAND_FORMAT_OPERATIONS and result_fmt != fmt:
+            raise ValueError(f'{op} delivers results in the operand format')
+        for check_fmt in (fmt, result_fmt):
+            if not check_fmt.fmt_width:
+                raise RuntimeError('not an interchange format')
+        self.op = op
+        self.fmt = fmt
+        self.result_fmt = result_fmt
+        self.roundings = tuple(roundings)
+        self.tininess = tuple(tininess)
+        self.arity = OPERATIONS[op][0]
+        self.encodings = 1 << (fmt.fmt_width // 8 * 8)
+        self.inputs = self.encodings ** self.arity
+        self.record_size = result_fmt.fmt_width // 8 + 1
+
+    @property
+    def cases(self):
+        return len(self.roundings) * len(self.tininess) * self.inputs
+
+    def header(self):
+        '''Return a dictionary describing the sweep, written as the second line of the
+        output file.'''
+        return {
+            'op': self.op,
+            'format': list(self.fmt[:3]),
+            'result_format': list(self.result_fmt[:3]),
+            'roundings': list(self.roundings),
+            'tininess': list(self.tininess),
+            'record_size': self.record_size,
+        }
+
+    def tasks(self, chunksize):
+        '''Return a list of (rounding, tininess_after, start, stop) tasks covering the sweep
+        with at most chunksize inputs each.'''
+        return [(rounding, tininess_after, start, min(start + chunksize, self.inputs))
+                for rounding in self.roundings for tininess_after in self.tininess
+                for start in range(0, self.inputs, chunksize)]
+
+    def run(self, output=None, reference=None, workers=None, chunksize=1 << 16,
+            max_mismatches=100):
+        '''Run the sweep across workers processes, and return a SweepResult.
+
+        If output is not None it is a binary file to which the results are streamed.  If
+        reference is not None it is compared with each result on the fly; it is called as
+        reference(operands, rounding, tininess_after) and returns an (expected, flags) pair.
+        It must be picklable, e.g. a module-level function, to run in worker processes.
+        workers defaults to os.cpu_count(); if it is 1 the sweep runs in this process.
+        '''
+        if output is not None:
+            output.write(MAGIC)
+            output.write(json.dumps(self.header()).encode() + b'\n')
+        tasks = [(self.op, self.fmt, self.result_fmt, reference, output is not None,
+                  max_mismatches, task) for task in self.tasks(chunksize)]
+        mismatches = []
+        workers = workers or os.cpu_count() or 1
+
+        def consume(results):
+            for records, task_mismatches in results:
+                if output is not None:
+                    output.write(records)
+                mismatches.extend(task_mismatches[:max_mismatches - len(mismatches)])
+
+        if workers == 1:
+            consume(map(_run_task, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map() yields in task order so the output is in case order
+                consume(executor.map(_run_task, tasks))
+        return SweepResult(self.cases, mismatches)
+
+
+# Operand tables by format, built once per process rather than once per task
+_operand_tables = {}
+
+
+def _operand_table(fmt):
+    table = _operand_tables.get(fmt)
+    if table is None:
+        size = fmt.fmt_width // 8
+        unpack = fmt._unpack_value_quiet
+        table = [unpack(encoding.to_bytes(size, 'big'), 'big')
+                 for encoding in range(1 << size * 8)]
+        _operand_tables[fmt] = table
+    return table
+
+
+def _run_task(args):
+    op, fmt, result_fmt, reference, want_records, max_mismatches, task = args
+    rounding, tininess_after, start, stop = task
+    arity, func = OPERATIONS[op]
+    table = _operand_table(fmt)
+    shift = fmt.fmt_width // 8 * 8
+    mask = (1 << shift) - 1
+    pack = result_fmt._packer()
+    context = Context(rounding=rounding, tininess_after=tininess_after)
+    records = []
+    mismatches = []
+
+    for index in range(start, stop):
+        if arity == 1:
+            operands = (table[index], )
+        else:
+            operands = (table[index >> shift], table[index & mask])
+        context.flags = 0
+        result = func(result_fmt, operands, context)
+        if want_records:
+            records.append(pack(result, 'big') + bytes((context.flags, )))
+        if reference is not None and len(mismatches) < max_mismatches:
+            expected, expected_flags = reference(operands, rounding, tininess_after)
+            if tuple(expected) != tuple(result) or expected_flags != context.flags:
+                mismatches.append(Mismatch(rounding, tininess_after, operands, result,
+                                           context.flags, expected, expected_flags))
+
+    return b''.join(records), mismatches
+
+
+def read_sweep(file):
+    '''Read a sweep output file opened in binary mode.  Return a (header, records) pair
+    where header is the dictionary written by Sweep.header() and records is an iterator of
+    (rounding, tininess_after, operand_encodings, result_encoding, flags) tuples.
+    Encodings are integers.'''
+    if file.readline() != MAGIC:
+        raise ValueError('not a sweep output file')
+    header = json.loads(file.readline())
+    fmt = BinaryFormat.from_triple(*header['format'])
+    arity = OPERATIONS[header['op']][0]
+    shift = fmt.fmt_width // 8 * 8
+    mask = (1 << shift) - 1
+    inputs = 1 << (shift * arity)
+    size = header['record_size']
+
+    def records():
+        for rounding in header['roundings']:
+            for tininess_after in header['tininess']:
+                for index in range(inputs):
+                    record = file.read(size)
+                    if len(record) != size:
+                        raise ValueError('truncated sweep output file')
+                    operands = (index, ) if arity == 1 else (index >> shift, index & mask)
+                    yield (rounding, tininess_after, operands,
+                           int.from_bytes(record[:-1], 'big'), record[-1])
+
+    return header, records()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ieee754.sweep',
+        description='Run an operation over every encoding of a small format.')
+    parser.add_argument('op', choices=sorted(OPERATIONS), help='the operation')
+    parser.add_argument('format', choices=sorted(FORMATS), help='the operand format')
+    parser.add_argument('--result-format', choices=sorted(FORMATS),
+                        help='the result format (default: the operand format)')
+    parser.add_argument('--rounding', action='append', choices=ROUNDINGS,
+                        help='a rounding mode to sweep; may be repeated (default: all)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: all CPUs)')
+    parser.add_argument('--chunksize', type=int, default=1 << 16,
+                        help='cases per task (default: %(default)s)')
+    parser.add_argument('--output', '-o', help='write the results to this file')
+    args = parser.parse_args(args)
+
+    fmt = FORMATS[args.format]
+    result_fmt = FORMATS[args.result_format] if args.result_format else None
+    try:
+        sweep = Sweep(args.op, fmt, result_fmt, args.rounding or ROUNDINGS)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        with open(args.output, 'wb') as output:
+            result = sweep.run(output, workers=args.workers, chunksize=args.chunksize)
+    else:
+        result = sweep.run(workers=args.workers, chunksize=args.chunksize)
+    print(f'{result.cases:,d} cases of {args.op} on {args.format}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#
+# Sinks for tracing operations.  See Context.set_tracer().
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+
+import heapq
+import json
+from itertools import count
+
+from .ieee754 import Binary, BinaryFormat
+
+
+__all__ = ('LatencyHistogram', 'JSONLinesWriter')
+
+
+class LatencyHistogram:
+    '''A tracer that keeps an in-memory histogram of elapsed times per operation, and the
+    slowest operations seen.
+
+    Elapsed times are bucketed by powers of 2: bucket n counts operations that took at
+    least 2^(n-1) and less than 2^n nanoseconds.
+    '''
+
+    def __init__(self, keep_slowest=10):
+        self.keep_slowest = keep_slowest
+        # A map from operation name to a map from bucket to count
+        self.buckets = {}
+        # A heap of (elapsed_ns, sequence, record) of the slowest operations
+        self._slowest = []
+        self._sequence = count()
+
+    def __call__(self, record):
+        buckets = self.buckets.get(record.op)
+        if buckets is None:
+            buckets = self.buckets[record.op] = {}
+        bucket = record.elapsed_ns.bit_length()
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+        if self.keep_slowest:
+            item = (record.elapsed_ns, next(self._sequence), record)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, item)
+            elif item[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def count(self, op=None):
+        '''Return the number of operations traced, or if op is not None the number of that
+        operation.'''
+        if op is None:
+            return sum(self.count(op) for op in self.buckets)
+        return sum(self.buckets.get(op, {}).values())
+
+    def percentile(self, op, percent):
+        '''Return an upper bound in nanoseconds on the given percentile of the elapsed times
+        of op.  Return None if op has not been traced.'''
+        buckets = self.buckets.get(op)
+        if not buckets:
+            return None
+        target = sum(buckets.values()) * percent / 100
+        seen = 0
+        for bucket in sorted(buckets):
+            seen += buckets[bucket]
+            if seen >= target:
+                break
+        return 1 << bucket
+
+    def slowest(self):
+        '''Return a list of the TraceRecords of the slowest operations, slowest first.'''
+        return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def reset(self):
+        self.buckets.clear()
+        self._slowest.clear()
+
+    def __repr__(self):
+        return f'<LatencyHistogram ops={self.count()}>'
+
+
+class JSONLinesWriter:
+    '''A tracer that writes each traced operation taking at least min_elapsed_ns as a line of
+    JSON to a text file.
+
+    Each line is an object with keys "op", "fmt", "operand_formats", "precisions",
+    "operands", "elapsed_ns" and "escalations".  Formats are written as [precision, e_max,
+    e_min] triples and Binary operands as hexadecimal strings.
+    '''
+
+    def __init__(self, file, min_elapsed_ns=0):
+        self.file = file
+        self.min_elapsed_ns = min_elapsed_ns
+
+    def __call__(self, record):
+        if record.elapsed_ns < self.min_elapsed_ns:
+            return
+        line = json.dumps({
+            'op': record.op,
+            'fmt': _format_json(record.fmt),
+            'operand_formats': [_format_json(fmt) for fmt in record.operand_formats],
+            'precisions': list(record.precisions),
+            'operands': [_operand_json(operand) for operand in record.operands],
+            'elapsed_ns': record.elapsed_ns,
+            'escalations': record.escalations,
+        })
+        self.file.write(line + '\n')
+
+
+def _format_json(fmt):
+    return [fmt.precision, fmt.e_max, fmt.e_min]
+
+
+def _operand_json(operand):
+    # str() of a Binary converts under a fresh context so is not itself traced
+    if isinstance(operand, (Binary, str)):
+        return str(operand)
+    if isinstance(operand, (int, float, bool)) or operand is None:
+        return operand
+    if isinstance(operand, BinaryFormat):
+        return _format_json(operand)
+    return repr(operand)
@@ -0,0 +1,157 @@
+#
+# Compilation of the text test vectors in tests/data to a cache of pre-parsed values
+#
+# (c) Neil Booth 2007-2021.  All rights reserved.
+#
+# Each vector file is compiled to its lines plus the pre-parsed value and flags of each
+# operand token, and pickled to a __vectors__ directory beside the file.  The cache key
+# is a hash of the file, the library source, this module and a compiler version, so a
+# change to any of them rebuilds the cache.
+#
+# Set IEEE754_SHARD to "index/count", for example "0/4", to run only that deterministic
+# share of the vector file tests.  Running the shards 0/4 to 3/4 in four processes runs
+# every test case exactly once.
+#
+
+import hashlib
+import os
+import pickle
+
+from ieee754 import (
+    Context, Flags, IEEEhalf, IEEEsingle, IEEEdouble, IEEEquad, x87extended, x87double,
+)
+
+
+# Bump this when the compiled form changes
+COMPILER_VERSION = 1
+
+# The format codes used in the vector files
+FORMAT_CODES = {
+    'H': IEEEhalf,
+    'S': IEEEsingle,
+    'D': IEEEdouble,
+    'Q': IEEEquad,
+    'x': x87extended,
+    'xd': x87double,
+}
+
+# Compiled values depend on the library source and on this module as well as on the
+# vector file.
+_library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                             'ieee754', 'ieee754.py')
+_source_paths = (_library_path, os.path.abspath(__file__))
+
+
+class VectorFile:
+    '''The compiled form of a test vector file.
+
+    lines is a list of its lines with comments and blank lines removed.  values maps
+    (fmt, string) pairs to (value, flags) pairs, where value is the result of converting
+    string to fmt under a fresh Context and flags are the flags raised.  There is an entry
+    for each token of each line that converts validly to a format whose code appears on
+    that line.
+    '''
+
+    def __init__(self, lines, values):
+        self.lines = lines
+        self.values = values
+
+    def shard(self, index, count):
+        '''Return every count-th line starting with the index-th, a deterministic share of
+        the lines for one of count processes.'''
+        if not 0 <= index < count:
+            raise ValueError(f'shard index {index} out of range for {count} shards')
+        return self.lines[index::count]
+
+
+def read_lines(path):
+    '''Return the lines of a vector file with comments and blank lines removed.'''
+    result = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                result.append(line)
+    return result
+
+
+def compile_file(path):
+    '''Compile a vector file and return a VectorFile.'''
+    lines = read_lines(path)
+    values = {}
+    for line in lines:
+        tokens = line.split()
+        fmts = {FORMAT_CODES[token] for token in tokens if token in FORMAT_CODES}
+        for token in tokens:
+            for fmt in fmts:
+                key = (fmt, token)
+                if key in values:
+                    continue
+                context = Context()
+                value = fmt.from_string(token, context)
+                if not context.flags & Flags.INVALID:
+                    values[key] = (value, context.flags)
+    return VectorFile(lines, values)
+
+
+def cache_key(path):
+    '''Return the key identifying the compiled form of a vector file: a hash of the file,
+    the library source, this module and the compiler version.'''
+    digest = hashlib.sha256(f'{COMPILER_VERSION}\n'.encode())
+    for filename in (path, ) + _source_paths:
+        with open(filename, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_path(path):
+    '''Return the path of the cached compiled form of a vector file.'''
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, '__vectors__', os.path.splitext(filename)[0] + '.pickle')
+
+
+def load(path):
+    '''Return the compiled VectorFile of a vector file, from the cache if it is current,
+    otherwise compiling it and updating the cache.'''
+    key = cache_key(path)
+    cached = cache_path(path)
+    try:
+        with open(cached, 'rb') as f:
+            cached_key, vector_file = pickle.load(f)
+        if cached_key == key:
+            return vector_file
+    except Exception:
+        # Unpickling can raise almost anything; treat any failure as a cache miss
+        pass
+
+    vector_file = compile_file(path)
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        # Write atomically so that concurrent processes never read a partial cache
+        temp = f'{cached}.{os.getpid()}'
+        with open(temp, 'wb') as f:
+            pickle.dump((key, vector_file), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, cached)
+    except OSError:
+        pass
+    return vector_file
+
+
+def load_all(directory):
+    '''Return a map from filename to compiled VectorFile of the vector files in directory.'''
+    return {filename: load(os.path.join(directory, filename))
+            for filename in sorted(os.listdir(directory)) if filename.endswith('.txt')}
+
+
+def parse_shard(spec):
+    '''Parse a shard specification "index/count", for example "0/4", and return the pair
+    (index, count).  Return (0, 1) if spec is empty or None.'''
+    if not spec:
+        return 0, 1
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f'invalid shard specification {spec!r}') from None
+    if not 0 <= index < count:
+        raise ValueError(f'invalid shard specification {spec!r}')
+    return index, count
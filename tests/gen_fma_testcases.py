@@ -1,37 +1,23 @@
-import os
 import random
+import sys
 
 from ieee754 import *
+from ieee754.random import Generator
 
 
-def random_significand(bits):
-    size = (bits + 7) // 8
-    value = int.from_bytes(os.urandom(size), 'big')
-    value >>= size * 8 - bits
-    return value | (1 << (bits - 1))
+# Usage: python gen_fma_testcases.py [seed]
+#
+# The same seed generates the same test cases.
+seed = int(sys.argv[1]) if len(sys.argv) > 1 else random.randrange(1 << 32)
+rng = random.Random(seed)
+generators = {}
 
 
-def large_significand(fmt):
-    significand = random_significand(fmt.precision)
-    exponent = random.randrange(fmt.e_min, fmt.e_max + 1)
-    sign = random.choice((False, True))
-    return Binary(fmt, sign, exponent + fmt.e_bias, significand)
-
-
-def small_significand(fmt):
-    significand = random_significand(min(11, fmt.precision))
-    significand <<= fmt.precision - significand.bit_length()
-    exponent = random.randrange(fmt.e_min, fmt.e_max + 1)
-    sign = random.choice((False, True))
-    return Binary(fmt, sign, exponent + fmt.e_bias, significand)
-
-
-def subnormal(fmt):
-    shift = random.randrange(1, fmt.precision)
-    significand = random_significand(fmt.precision) >> shift
-    exponent = fmt.e_min
-    sign = random.choice((False, True))
-    return Binary(fmt, sign, exponent + fmt.e_bias, significand)
+def random_value(fmt, distribution):
+    generator = generators.get(fmt)
+    if generator is None:
+        generator = generators[fmt] = Generator(fmt, seed)
+    return generator.values(distribution, 1)[0]
 
 
 fmts = {
@@ -40,7 +26,7 @@ fmts = {
     IEEEdouble: 'D',
     IEEEquad: 'Q',
 }
-values = [large_significand, small_significand, subnormal]
+distributions = ['log_uniform', 'short_significand', 'subnormal']
 roundings = {
     ROUND_CEILING: 'C',
     ROUND_FLOOR: 'F',
@@ -61,16 +47,16 @@ big_fmt = BinaryFormat.from_triple(50000, 50000, -50000)
 roundings_lst = list(roundings)
 
 for lhs_fmt in fmts:
-    for lhs_value in values:
-        lhs = lhs_value(lhs_fmt)
+    for lhs_distribution in distributions:
+        lhs = random_value(lhs_fmt, lhs_distribution)
         for rhs_fmt in fmts:
-            for rhs_value in values:
-                rhs = rhs_value(rhs_fmt)
+            for rhs_distribution in distributions:
+                rhs = random_value(rhs_fmt, rhs_distribution)
                 for addend_fmt in fmts:
-                    for addend_value in values:
-                        addend = addend_value(addend_fmt)
+                    for addend_distribution in distributions:
+                        addend = random_value(addend_fmt, addend_distribution)
                         for result_fmt in fmts:
-                            rounding = random.choice(roundings_lst)
+                            rounding = rng.choice(roundings_lst)
                             context = Context(rounding=rounding)
                             result = big_fmt.fma(lhs, rhs, addend, context)
                             assert context.flags == 0
@@ -0,0 +1,127 @@
+from fractions import Fraction
+
+import pytest
+
+from ieee754 import *
+from ieee754.analysis import ulp_distance, ulp_error, ulp_distances, ulp_errors
+from ieee754.random import Generator
+
+
+def pack_all(values, endianness='little'):
+    return b''.join(value.pack(endianness) for value in values)
+
+
+@pytest.mark.parametrize('fmt', (IEEEhalf, IEEEsingle, IEEEdouble, x87extended))
+def test_ulp_distance(fmt):
+    context = Context()
+    value = fmt.make_smallest_subnormal(True).next_down(context)
+    start = value
+    for distance in range(6):
+        assert ulp_distance(start, value) == ulp_distance(value, start) == distance
+        value = value.next_up(context)
+    assert ulp_distance(fmt.make_zero(True), fmt.make_zero(False)) == 0
+    assert ulp_distance(fmt.make_largest_finite(False), fmt.make_infinity(False)) == 1
+    with pytest.raises(ValueError):
+        ulp_distance(fmt.make_nan(False, False, 0), fmt.make_zero(False))
+    with pytest.raises(ValueError):
+        ulp_distance(IEEEquad.make_zero(False), fmt.make_zero(False))
+
+
+def test_ulp_error():
+    context = Context()
+    third = IEEEdouble.divide(IEEEdouble.make_one(False), IEEEdouble.from_int(3), context)
+    single_third = IEEEsingle.convert(third, context)
+    # Correctly rounded so within half an ulp
+    assert ulp_error(single_third, Fraction(1, 3)) == Fraction(1, 3)
+    # The double is below 1/3 and the single above
+    assert Fraction(1, 3) < ulp_error(single_third, third) < Fraction(1, 2)
+    one = IEEEsingle.make_one(False)
+    assert ulp_error(one, 1) == 0
+    assert ulp_error(one.next_up(context), 1) == 1
+    # The ulp is that of the exact value; below 1 ulps are half the size
+    assert ulp_error(one.next_down(context), 1) == Fraction(1, 2)
+    assert ulp_error(one, Fraction(2 ** 24 - 1, 2 ** 24)) == 1
+    assert ulp_error(one, -1) == 2 ** 24
+    assert ulp_error(IEEEsingle.make_smallest_subnormal(False), 0) == 1
+    assert ulp_error(IEEEsingle.make_zero(True), IEEEdouble.make_zero(False)) == 0
+    assert ulp_error(IEEEsingle.make_infinity(True), IEEEdouble.make_infinity(True)) == 0
+    assert ulp_error(IEEEsingle.make_nan(False, True, 1),
+                     IEEEdouble.make_nan(True, False, 0)) == 0
+    with pytest.raises(ValueError):
+        ulp_error(IEEEsingle.make_infinity(True), IEEEdouble.make_infinity(False))
+    with pytest.raises(ValueError):
+        ulp_error(IEEEsingle.make_nan(False, True, 1), 1)
+    with pytest.raises(ValueError):
+        ulp_error(one, IEEEdouble.make_nan(False, False, 0))
+
+
+@pytest.mark.parametrize('fmt', (IEEEsingle, x87extended))
+def test_ulp_distances(fmt):
+    generator = Generator(fmt, 1)
+    approx = generator.values('log_uniform', 200) + generator.values('subnormal_heavy', 50)
+    context = Context()
+    reference = []
+    for n, value in enumerate(approx):
+        for _ in range(n % 4):
+            value = value.next_up(context)
+        reference.append(value)
+    nan = fmt.make_nan(False, False, 1)
+    approx += [nan, nan, fmt.make_one(False), fmt.make_zero(True)]
+    reference += [nan.set_sign(True), fmt.make_one(False), nan, fmt.make_zero(False)]
+
+    report = ulp_distances(fmt, pack_all(approx, 'big'), pack_all(reference, 'big'), 'big')
+    assert report.count == len(approx)
+    assert report.invalid == [251, 252]
+    assert sum(report.histogram.values()) == report.count - 2
+    assert report.max_error == 3 and report.max_index == 3
+    expected = {}
+    for a, x in zip(approx, reference):
+        if not a.is_nan() and not x.is_nan():
+            distance = ulp_distance(a, x)
+            expected[distance] = expected.get(distance, 0) + 1
+    expected[0] += 1
+    assert report.histogram == expected
+
+
+@pytest.mark.parametrize('fmt, reference_fmt', ((IEEEhalf, IEEEsingle),
+                                                (IEEEsingle, IEEEdouble),
+                                                (IEEEdouble, x87extended),
+                                                (x87extended, IEEEquad)))
+def test_ulp_errors(fmt, reference_fmt):
+    generator = Generator(reference_fmt, 2)
+    context = Context(rounding=ROUND_DOWN)
+    reference = generator.values('log_uniform', 200) + generator.values('subnormal_heavy', 50)
+    approx = [fmt.convert(value, context) for value in reference]
+    approx += [fmt.make_infinity(True), fmt.make_nan(False, False, 0), fmt.make_zero(True)]
+    reference += [reference_fmt.make_infinity(True), reference_fmt.make_one(False),
+                  reference_fmt.make_zero(False)]
+
+    report = ulp_errors(fmt, pack_all(approx), reference_fmt, pack_all(reference))
+    assert report.count == len(approx)
+    assert report.invalid == [251]
+    errors = []
+    for a, x in zip(approx, reference):
+        try:
+            errors.append(ulp_error(a, x))
+        except ValueError:
+            pass
+    assert report.max_error == max(errors)
+    assert report.max_index == errors.index(max(errors))
+    expected = {}
+    for error in errors:
+        bucket = Fraction(int(error * 4), 4)
+        expected[bucket] = expected.get(bucket, 0) + 1
+    assert report.histogram == expected
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        ulp_distances(IEEEsingle, bytes(4), bytes(8))
+    with pytest.raises(ValueError):
+        ulp_distances(IEEEsingle, bytes(5), bytes(5))
+    with pytest.raises(ValueError):
+        ulp_errors(IEEEsingle, bytes(4), IEEEdouble, bytes(16))
+    with pytest.raises(RuntimeError):
+        ulp_distances(BinaryFormat.from_triple(5, 15, -14), bytes(2), bytes(2))
+    report = ulp_distances(IEEEsingle, b'', b'')
+    assert report.count == 0 and report.max_error is None and report.max_index is None
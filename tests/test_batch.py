@@ -0,0 +1,132 @@
+import random
+
+import pytest
+
+from ieee754 import *
+from ieee754 import batch
+from ieee754.ieee754 import _interned_formats
+
+
+def floats_equal(lhs, rhs):
+    return lhs.fmt == rhs.fmt and lhs.as_tuple() == rhs.as_tuple()
+
+
+def random_value(fmt):
+    e_biased = random.randrange(0, fmt.e_max + fmt.e_bias + 1)
+    significand = random.randrange(0, fmt.int_bit)
+    if e_biased > 1:
+        significand |= fmt.int_bit
+    return Binary(fmt, random.choice((False, True)), e_biased, significand)
+
+
+def random_values(fmt, count):
+    return [random_value(fmt) for _ in range(count)]
+
+
+def substitute_one(exception, context):
+    return exception.default_result.fmt.make_one(False)
+
+
+@pytest.mark.parametrize('op, workers', [
+    (OP_ADD, 1), (OP_SUBTRACT, 2), (OP_MULTIPLY, 1), (OP_DIVIDE, 2), (OP_FMA, 2),
+    (OP_CONVERT, 1),
+])
+def test_binary_operations(op, workers):
+    fmt = IEEEsingle
+    count = 3 if op == OP_FMA else 2 if op != OP_CONVERT else 1
+    columns = [random_values(IEEEdouble, 50) for _ in range(count)]
+    context = Context(rounding=ROUND_UP)
+    context.set_handler(Inexact, HandlerKind.RECORD_EXCEPTION)
+    counters = context.enable_counters()
+    results = batch.map(op, fmt, columns, context, workers=workers, chunksize=7)
+    context.disable_counters()
+
+    answer_context = Context(rounding=ROUND_UP)
+    answer_context.set_handler(Inexact, HandlerKind.RECORD_EXCEPTION)
+    answer_counters = answer_context.enable_counters()
+    method = getattr(fmt, op)
+    answers = [method(*operands, answer_context) for operands in zip(*columns)]
+    answer_context.disable_counters()
+    assert counters.snapshot() == answer_counters.snapshot()
+    assert counters.ops == {op: 50}
+    assert len(results) == len(answers)
+    assert all(floats_equal(result, answer) for result, answer in zip(results, answers))
+    assert context.flags == answer_context.flags
+    assert [exc.op_tuple for exc in context.exceptions] == [
+        exc.op_tuple for exc in answer_context.exceptions]
+
+
+def test_mixed_and_wide_formats():
+    wide = BinaryFormat.from_triple(100, 20000, -20000)
+    lhs = random_values(IEEEhalf, 10) + random_values(wide, 10)
+    rhs = random_values(IEEEquad, 20)
+    context = Context()
+    results = batch.map(OP_MULTIPLY, wide, [lhs, rhs], context, workers=2)
+    answer_context = Context()
+    answers = [wide.multiply(x, y, answer_context) for x, y in zip(lhs, rhs)]
+    assert all(floats_equal(result, answer) for result, answer in zip(results, answers))
+    assert context.flags == answer_context.flags
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_custom_format_not_interned(workers):
+    fmt = BinaryFormat.from_triple(30, 500, -499)
+    interned = dict(_interned_formats)
+    lhs = random_values(fmt, 10)
+    rhs = random_values(IEEEdouble, 10)
+    results = batch.map(OP_ADD, fmt, [lhs, rhs], Context(), workers=workers)
+    assert all(result.fmt is fmt for result in results)
+    assert _interned_formats == interned
+
+
+def test_strings():
+    strings = ['1.5', '0.1', '-2e-310', 'nan', 'snan', 'junk']
+    context = Context()
+    context.set_handler(Invalid, HandlerKind.SUBSTITUTE_VALUE, substitute_one)
+    results = batch.map(OP_FROM_STRING, IEEEdouble, [strings], context, workers=2,
+                        chunksize=2)
+    answer_context = context.copy()
+    answers = [IEEEdouble.from_string(string, answer_context) for string in strings]
+    assert all(floats_equal(result, answer) for result, answer in zip(results, answers))
+    assert results[0].fmt is IEEEdouble
+    assert context.flags == answer_context.flags
+
+    context = Context()
+    strings = batch.map(OP_TO_DECIMAL_STRING, IEEEdouble, [results], context, workers=1)
+    assert strings == [value.to_decimal_string(context=Context()) for value in results]
+    assert context.flags == Flags.INEXACT
+
+
+def test_resource_limits():
+    strings = ['1.5', '1.234567891', '0.1']
+    context = Context(max_input_digits=5)
+    results = batch.map(OP_FROM_STRING, IEEEdouble, [strings], context, workers=2,
+                        chunksize=1)
+    assert [bool(result.is_nan()) for result in results] == [False, True, False]
+    assert context.flags == Flags.INVALID | Flags.INEXACT
+
+    values = [IEEEdouble.from_string('0.1', Context())]
+    context = Context(max_output_digits=10)
+    assert batch.map(OP_TO_DECIMAL_STRING, IEEEdouble, [values], context,
+                     workers=1) == ['nan']
+    assert context.flags == Flags.INVALID
+
+
+def test_raise():
+    context = Context()
+    context.set_handler(DivisionByZero, HandlerKind.RAISE)
+    one = IEEEdouble.make_one(False)
+    zero = IEEEdouble.make_zero(False)
+    with pytest.raises(DivideByZero):
+        batch.map(OP_DIVIDE, IEEEdouble, [[one, one], [one, zero]], context, workers=2)
+
+
+def test_bad_arguments():
+    one = IEEEdouble.make_one(False)
+    with pytest.raises(ValueError):
+        batch.map('sqrt', IEEEdouble, [[one]])
+    with pytest.raises(ValueError):
+        batch.map(OP_ADD, IEEEdouble, [[one]])
+    with pytest.raises(ValueError):
+        batch.map(OP_ADD, IEEEdouble, [[one], [one, one]])
+    assert batch.map(OP_ADD, IEEEdouble, [[], []]) == []
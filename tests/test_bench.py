@@ -0,0 +1,89 @@
+import json
+
+from ieee754 import *
+from ieee754 import bench
+
+
+def test_read_data_strings():
+    strings = bench.read_data_strings('tests/data')
+    assert '1' in strings and 'NaN1' in strings and '-0' in strings
+    assert 'K' not in strings and 'E' not in strings
+    assert bench.read_data_strings('no such directory') == []
+
+
+def test_run():
+    names = []
+    results = bench.run('^(add|sqrt|pack|compare)/', count=5, repeat=1,
+                        data_dir='tests/data', roundings=(ROUND_UP, ROUND_DOWN),
+                        progress=lambda name, ns: names.append(name))
+    assert list(results) == names
+    assert all(ns > 0 for ns in results.values())
+    assert 'add/IEEEdouble/random/ROUND_UP' in results
+    assert 'sqrt/wide1024/data/ROUND_DOWN' in results
+    # Operations unaffected by rounding are run once
+    assert 'compare/IEEEhalf/random/ROUND_HALF_EVEN' in results
+    assert 'compare/IEEEhalf/random/ROUND_UP' not in results
+    # pack requires an interchange format
+    assert 'pack/x87extended/random/ROUND_HALF_EVEN' in results
+    assert not any(name.startswith('pack/wide1024') for name in results)
+
+
+def test_run_hash():
+    # The data operands include signalling NaNs, which cannot be hashed
+    results = bench.run('^hash/IEEEsingle/', count=200, repeat=1, data_dir='tests/data')
+    assert list(results) == ['hash/IEEEsingle/random/ROUND_HALF_EVEN',
+                             'hash/IEEEsingle/data/ROUND_HALF_EVEN']
+    results = bench.run('^hash_set/IEEEsingle/', count=5, repeat=1, data_dir='tests/data',
+                        bulk_count=1000)
+    assert list(results) == ['hash_set/IEEEsingle/random/ROUND_HALF_EVEN',
+                             'hash_set/IEEEsingle/data/ROUND_HALF_EVEN']
+
+
+def test_run_pickle():
+    results = bench.run('^(un)?pickle/wide1024/', count=5, repeat=1)
+    assert list(results) == ['pickle/wide1024/random/ROUND_HALF_EVEN',
+                             'unpickle/wide1024/random/ROUND_HALF_EVEN']
+    sizes = {}
+    results = bench.run('^pickle_list/IEEEdouble/', count=5, repeat=1, bulk_count=1000,
+                        sizes=sizes)
+    assert list(results) == list(sizes) == ['pickle_list/IEEEdouble/random/ROUND_HALF_EVEN']
+    # The format is pickled once, so each value is a few bytes more than its encoding
+    assert 8 < sizes['pickle_list/IEEEdouble/random/ROUND_HALF_EVEN'] < 24
+
+
+def test_run_context():
+    pattern = '^(get_context|local_context|add_implicit|concurrent_add)/IEEEdouble/'
+    results = bench.run(pattern, count=5, repeat=1, bulk_count=300)
+    assert list(results) == ['get_context/IEEEdouble/random/ROUND_HALF_EVEN',
+                             'local_context/IEEEdouble/random/ROUND_HALF_EVEN',
+                             'add_implicit/IEEEdouble/random/ROUND_HALF_EVEN',
+                             'concurrent_add/IEEEdouble/random/ROUND_HALF_EVEN']
+    # Timed per addition
+    assert results['concurrent_add/IEEEdouble/random/ROUND_HALF_EVEN'] < 1_000_000
+
+
+def test_compare():
+    baseline = {'a': 100, 'b': 100, 'c': 100}
+    results = {'a': 105, 'b': 150, 'd': 10}
+    rows, regressions = bench.compare(results, baseline, 0.1)
+    assert rows == [('a', 100, 105, 1.05), ('b', 100, 150, 1.5)]
+    assert regressions == [('b', 100, 150, 1.5)]
+
+
+def test_main(tmp_path, capsys):
+    output = str(tmp_path / 'bench.json')
+    args = ['^next_up/IEEEsingle/random', '--count', '5', '--repeat', '1', '--quick']
+    assert bench.main(args + ['-o', output]) == 0
+    with open(output) as f:
+        document = json.load(f)
+    assert list(document['results']) == ['next_up/IEEEsingle/random/ROUND_HALF_EVEN']
+    assert document['meta']['count'] == 5
+
+    # Compare against a baseline that is much faster
+    document['results'] = {name: ns / 100 for name, ns in document['results'].items()}
+    baseline = str(tmp_path / 'baseline.json')
+    with open(baseline, 'w') as f:
+        json.dump(document, f)
+    assert bench.main(args + ['-c', baseline]) == 1
+    assert 'REGRESSION next_up/IEEEsingle/random/ROUND_HALF_EVEN' in capsys.readouterr().out
+    assert bench.main(args + ['-c', output, '--threshold', '1000']) == 0
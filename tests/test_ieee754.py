@@ -1,17 +1,27 @@
+import asyncio
+import gc
+import io
 import os
+import pickle
 import random
 import re
 import threading
+from array import array
+from collections import deque
 from decimal import Decimal
 from math import isfinite, trunc, ceil, floor, isnan
 from fractions import Fraction
-from functools import partial
+from functools import partial, reduce
 from itertools import product
-from struct import pack
+from operator import or_
+from struct import pack, unpack
 
 import pytest
 
 from ieee754 import *
+from ieee754.ieee754 import round_up, _round_up_slow, shift_right, _interned_formats
+
+import conftest as vectors
 
 
 HEX_SIGNIFICAND_PREFIX = re.compile('[-+]?0x', re.ASCII | re.IGNORECASE)
@@ -85,17 +95,17 @@ nan_payload_codes = {
 }
 
 
+# Set IEEE754_SHARD to "index/count", e.g. "0/4", to run only that share of the vector
+# file tests.  The vector files are compiled and cached by conftest.py.
+shard = vectors.parse_shard(os.environ.get('IEEE754_SHARD'))
+# Pre-parsed values of the vector files read so far
+vector_values = {}
+
+
 def read_lines(filename):
-    result = []
-    with open(os.path.join('tests/data', filename)) as f:
-        for line in f:
-            hash_pos = line.find('#')
-            if hash_pos != -1:
-                line = line[:hash_pos]
-            line = line.strip()
-            if line:
-                result.append(line)
-    return result
+    vector_file = vectors.load(os.path.join('tests/data', filename))
+    vector_values.update(vector_file.values)
+    return vector_file.shard(*shard)
 
 
 def rounding_string_to_context(rounding):
@@ -113,12 +123,16 @@ def read_significand(significand):
 
 
 def from_string(fmt, string):
-    context = Context()
-    result = fmt.from_string(string, context)
+    cached = vector_values.get((fmt, string))
+    if cached is None:
+        context = Context()
+        result, flags = fmt.from_string(string, context), context.flags
+    else:
+        result, flags = cached
     if HEX_SIGNIFICAND_PREFIX.match(string):
-        assert context.flags == 0
+        assert flags == 0
     else:
-        assert context.flags & ~(Flags.UNDERFLOW | Flags.INEXACT) == 0
+        assert flags & ~(Flags.UNDERFLOW | Flags.INEXACT) == 0
     return result
 
 
@@ -194,6 +208,7 @@ class TestTextFormat:
         sign = boolean_codes[sign]
         exponent = int(exponent)
         assert text_format.format_decimal(sign, exponent, digits) == answer
+        assert text_format.compile().format_decimal(sign, exponent, digits) == answer
 
     @pytest.mark.parametrize('line', read_lines('format_hex.txt'))
     def test_format_hex(self, line):
@@ -210,6 +225,7 @@ class TestTextFormat:
                                  rstrip_zeroes=boolean_codes[rstrip_zeroes])
         value = from_string(IEEEdouble, value)
         assert text_format.format_hex(value) == answer
+        assert text_format.compile().format_hex(value) == answer
 
     @pytest.mark.parametrize('value', (-1.0, -0.0, 0.0, 1.0, 123.456e12, 123.456e-12,
                                        float('inf'), float('-inf'), float('nan')))
@@ -252,8 +268,48 @@ class TestContext:
         assert c.tininess_after == context.tininess_after
         assert c.handlers is not context.handlers
         assert c.handlers == context.handlers
+        # Recorded exceptions are not copied
         assert c.exceptions is not context.exceptions
-        assert c.exceptions == context.exceptions
+        assert c.exceptions == []
+
+    def test_exception_recorders(self):
+        context = Context()
+        context.set_handler((Inexact, Underflow), HandlerKind.RECORD_EXCEPTION)
+        one = IEEEdouble.make_one(False)
+        values = [IEEEdouble.from_int(n) for n in (3, 7, 11, 13)]
+
+        # A ring buffer
+        context.exceptions = deque(maxlen=2)
+        for value in values:
+            IEEEdouble.divide(one, value, context)
+        assert [exc.op_tuple[2] for exc in context.exceptions] == values[2:]
+        copy = context.copy()
+        assert isinstance(copy.exceptions, deque) and copy.exceptions.maxlen == 2
+        assert not copy.exceptions
+
+        # Counts with the first samples
+        sampler = context.exceptions = ExceptionSampler(samples=1)
+        for value in values:
+            IEEEdouble.divide(one, value, context)
+        IEEEdouble.from_string('1e-400', context)
+        assert sampler.counts == {Inexact: 5, UnderflowInexact: 1}
+        assert len(sampler) == 6
+        assert [exc.op_tuple[2] for exc in sampler.first[Inexact]] == values[:1]
+        assert [exc.__class__ for exc in sampler] == [Inexact, UnderflowInexact]
+        with local_context(context) as ctx:
+            assert isinstance(ctx.exceptions, ExceptionSampler)
+            assert ctx.exceptions.samples == 1 and not ctx.exceptions
+        sampler.clear()
+        assert not sampler
+
+        # A sink
+        recorded = []
+        context.exceptions = ExceptionSink(recorded.append)
+        with local_context(context) as ctx:
+            assert ctx.exceptions is context.exceptions
+            IEEEdouble.divide(one, values[0], ctx)
+        context.exceptions.extend([1, 2])
+        assert len(recorded) == 3 and isinstance(recorded[0], Inexact)
 
     def test_get_context(self):
         context = get_context()
@@ -334,6 +390,283 @@ class TestContext:
             assert not self.contexts_equal(ctx, context)
         assert get_context() is my_context
 
+    def test_local_context_tasks(self):
+        # Concurrent asyncio tasks each have their own current context
+        roundings = (ROUND_CEILING, ROUND_FLOOR, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN)
+        one = IEEEdouble.make_one(False)
+        three = IEEEdouble.from_int(3)
+
+        async def task(rounding):
+            with local_context() as ctx:
+                ctx.rounding = rounding
+                ctx.flags = 0
+                results = []
+                for _ in range(5):
+                    await asyncio.sleep(0)
+                    assert get_context() is ctx
+                    results.append(IEEEdouble.divide(one, three))
+                return results, ctx.flags
+
+        async def main():
+            outer = get_context()
+            results = await asyncio.gather(*(task(rounding) for rounding in roundings))
+            assert get_context() is outer
+            return results
+
+        context = get_context()
+        results = asyncio.run(main())
+        assert get_context() is context
+        for rounding, (values, flags) in zip(roundings, results):
+            with local_context(Context(rounding=rounding)):
+                expected = IEEEdouble.divide(one, three)
+            assert all(value.to_string() == expected.to_string() for value in values)
+            assert flags == Flags.INEXACT
+
+    def test_counters(self):
+        add = BinaryFormat.add
+        context = Context(rounding=ROUND_UP)
+        counters = context.enable_counters()
+        assert BinaryFormat.add is not add
+        one = IEEEdouble.from_int(1, context)
+        three = IEEEsingle.from_int(3, context)
+        IEEEdouble.divide(one, three, context)
+        with local_context(context):
+            -(one / one)
+            three.next_up()
+        Context(rounding=ROUND_DOWN).enable_counters(counters)
+        snapshot = counters.snapshot()
+        assert snapshot == {
+            'ops': {OP_FROM_INT: 2, OP_DIVIDE: 2, OP_MINUS: 1, OP_NEXT_UP: 1},
+            'formats': {IEEEdouble: 4, IEEEsingle: 2},
+            'roundings': {ROUND_UP: 6},
+            'signals': {'Inexact': 1},
+        }
+
+        # Merge a snapshot from a worker process
+        merged = OpCounters()
+        merged.merge(snapshot)
+        merged.merge(pickle.loads(pickle.dumps(snapshot)))
+        assert merged.ops[OP_DIVIDE] == 4 and merged.formats[IEEEsingle] == 4
+        assert merged.signals == {'Inexact': 2}
+
+        counters.reset()
+        assert counters.snapshot() == {'ops': {}, 'formats': {}, 'roundings': {},
+                                       'signals': {}}
+        assert context.disable_counters() is counters
+        assert context.disable_counters() is None
+        # Instrumentation is switched out once no context counts
+        assert BinaryFormat.add is add
+        IEEEdouble.divide(one, three, context)
+        assert counters.snapshot()['ops'] == {}
+
+    def test_memo(self):
+        add = BinaryFormat.add
+        memo = MemoCache(3)
+        context = Context(rounding=ROUND_UP)
+        context.set_memo(memo)
+        assert BinaryFormat.add is not add
+        one = IEEEdouble.from_int(1, context)
+        three = IEEEdouble.from_int(3, context)
+        assert memo.info() == (0, 2, 0, 3, 2)
+        for n in range(2):
+            context.flags = 0
+            result = IEEEdouble.divide(one, three, context)
+            assert result.to_string() == '0x1.5555555555556p-2'
+            assert context.flags == Flags.INEXACT
+        assert memo.info() == (1, 3, 0, 3, 3)
+        # The rounding mode is part of the key; the least-recently used entry is evicted
+        context.rounding = ROUND_DOWN
+        assert IEEEdouble.divide(one, three, context).to_string() == '0x1.5555555555555p-2'
+        assert memo.info() == (1, 4, 1, 3, 3)
+        # The two zeroes compare equal but are memoized separately
+        zero = IEEEdouble.make_zero(False)
+        assert IEEEdouble.add(zero, zero, context).sign is False
+        assert IEEEdouble.add(zero, zero.negate_quiet(), context).sign is False
+        assert IEEEdouble.add(zero.negate_quiet(), zero.negate_quiet(), context).sign is True
+        # Operands that cannot be memoized are not looked up
+        IEEEdouble.to_string(one, DefaultDecFormat, context)
+        assert memo.hits + memo.misses == 8
+        assert len(memo) == 3 and 'hits=1' in repr(memo)
+
+        # Copies share the memo cache
+        local = context.copy()
+        assert local.memo is memo
+        IEEEdouble.add(zero, zero, local)
+        assert memo.hits == 2
+        memo.clear()
+        assert memo.info() == (0, 0, 0, 3, 0)
+        local.set_memo(None)
+        context.set_memo(None)
+        assert BinaryFormat.add is add
+        with pytest.raises(ValueError):
+            MemoCache(0)
+
+    @pytest.mark.parametrize('kind', (HandlerKind.DEFAULT, HandlerKind.RECORD_EXCEPTION,
+                                      HandlerKind.SUBSTITUTE_VALUE, HandlerKind.RAISE,
+                                      HandlerKind.ABRUPT_UNDERFLOW))
+    def test_memo_replay(self, kind):
+        # Each operation performed under a memoizing context, missing then hitting,
+        # delivers the same results, flags, exceptions and handler calls as without
+        def make_context(calls):
+            context = Context(rounding=ROUND_FLOOR, tininess_after=False)
+            context.set_handler(Invalid, HandlerKind.RECORD_EXCEPTION)
+            if kind == HandlerKind.SUBSTITUTE_VALUE:
+                def handler(exc, context):
+                    calls.append(exc.__class__)
+                    if isinstance(exc.default_result, int):
+                        return 7
+                    return exc.default_result.fmt.from_int(7, context)
+                context.set_handler((Overflow, Inexact, UnderflowInexact), kind, handler)
+            elif kind == HandlerKind.ABRUPT_UNDERFLOW:
+                context.set_handler(Underflow, kind)
+            elif kind != HandlerKind.DEFAULT:
+                context.set_handler((Overflow, DivideByZero, UnderflowExact), kind)
+            return context
+
+        def outcomes(context, calls):
+            results = []
+            for obj, name, args in cases:
+                context.flags = 0
+                try:
+                    # Look the method up each time; memoizing replaces it
+                    result = getattr(obj, name)(*args, context)
+                except IEEEError as e:
+                    result = e.__class__
+                if isinstance(result, Binary):
+                    result = result.as_tuple()
+                results.append((result, context.flags, len(context.exceptions), len(calls)))
+            return results
+
+        fmt = IEEEhalf
+        values = [fmt.from_string(text, Context()) for text in
+                  ('0', '-0', '1', '-1.5', '3', '0x1p-24', '0x1.ffcp15', '0x1p-14', 'Inf',
+                   'NaN', 'sNaN5')]
+        cases = [(fmt, 'add', pair) for pair in product(values, repeat=2)]
+        cases += [(fmt, 'divide', pair) for pair in product(values, repeat=2)]
+        cases += [(fmt, 'sqrt', (value, )) for value in values]
+        cases += [(fmt, 'convert', (value, )) for value in
+                  (IEEEdouble.from_string(text, Context()) for text in ('0.1', '1e-6', '1e6'))]
+        cases += [(fmt, 'from_string', (text, ))
+                  for text in ('0.1', '-70000', '1e-8', 'sNaN', 'x')]
+        cases += [(value, 'next_up', ()) for value in values]
+        cases += [(value, 'compare', (other, )) for value, other in product(values[-3:],
+                                                                            repeat=2)]
+        cases += [(value, 'convert_to_integer_exact', (-10, 10, ROUND_HALF_EVEN))
+                  for value in values]
+
+        calls = []
+        expected = outcomes(make_context(calls), calls)
+        memo = MemoCache()
+        for n in range(2):
+            calls = []
+            context = make_context(calls)
+            context.set_memo(memo)
+            assert outcomes(context, calls) == expected
+            context.set_memo(None)
+        assert memo.hits > len(cases) // 2
+
+    def test_global_memo(self):
+        add = BinaryFormat.add
+        memo = MemoCache()
+        set_global_memo(memo)
+        try:
+            own = MemoCache()
+            context = Context()
+            results = [IEEEsingle.from_string('0.1', context) for n in range(2)]
+            assert results[0].as_tuple() == results[1].as_tuple()
+            assert memo.info().hits == 1 and context.flags == Flags.INEXACT
+            # A context's own memo cache takes precedence
+            context.set_memo(own)
+            IEEEsingle.from_string('0.1', context)
+            assert own.info()[:2] == (0, 1)
+            context.set_memo(None)
+            assert BinaryFormat.add is not add
+        finally:
+            set_global_memo(None)
+        assert BinaryFormat.add is add
+
+    def test_counters_copies(self):
+        add = BinaryFormat.add
+        context = Context()
+        counters = context.enable_counters()
+        copy = context.copy()
+        assert copy.counters is counters
+        IEEEdouble.add(IEEEdouble.make_one(False), IEEEdouble.make_one(False), copy)
+        assert counters.ops == {OP_ADD: 1}
+        # A live copy does not keep instrumentation switched in
+        context.disable_counters()
+        assert BinaryFormat.add is add
+        del copy
+        # Nor does a context freed without disabling counting
+        context.enable_counters()
+        assert BinaryFormat.add is not add
+        del context
+        gc.collect()
+        assert BinaryFormat.add is add
+
+    def test_resource_limits(self):
+        context = Context(max_input_digits=10)
+        assert context.copy().max_input_digits == 10
+        assert IEEEdouble.from_string('1.234567890', context) == IEEEdouble.from_float(
+            1.23456789)
+        assert context.flags == Flags.INEXACT
+        for text in ('1.2345678901', '123456789e10', '0x1.234567890p1', 'nan12345678901',
+                     '1' * 100000):
+            context.flags = 0
+            assert IEEEdouble.from_string(text, context).is_nan()
+            assert context.flags == Flags.INVALID
+
+        # Large exponents in a format with a huge exponent range
+        wide = BinaryFormat.from_triple(64, 1 << 40, -(1 << 40))
+        context = Context(max_bit_length=100000)
+        assert not wide.from_string('1e9999', context).is_nan()
+        assert wide.from_string('1e99999', context).is_nan()
+        assert wide.from_string('-1e-99999', context).is_nan()
+        assert context.flags & Flags.INVALID
+
+        # Fractions and rounding to decimal places
+        context = Context(max_bit_length=100000)
+        assert wide.from_fraction(Fraction(1, 3 ** 100), context) == \
+            wide.from_fraction(Fraction(1, 3 ** 100), Context())
+        context.flags = 0
+        assert wide.from_fraction(Fraction(1, 3 ** 100000), context).is_nan()
+        assert wide.from_fraction(Fraction(3 ** 100000, 7), context).is_nan()
+        assert context.flags & Flags.INVALID
+        big = wide.from_string('1e9999')
+        assert big.round(-9990, context=context) == big
+        assert big.round(-99999, context=context).is_zero()
+        for value, ndigits in ((wide.from_string('1e99999'), -99990),
+                               (wide.from_string('1e-99999'), 99999)):
+            context.flags = 0
+            assert value.round(ndigits, context=context).is_nan()
+            assert context.flags & Flags.INVALID
+        # Rounding to zero computes no power of ten
+        assert IEEEdouble.from_int(1).round(-(10 ** 12), context=context).is_zero()
+
+        # Output digits; 0.1 has 55 digits exactly
+        tenth = IEEEdouble.from_string('0.1')
+        context = Context(max_output_digits=55)
+        assert tenth.to_decimal_string(-1, context=context) == \
+            '0.1000000000000000055511151231257827021181583404541015625'
+        assert tenth.to_decimal_string(55, context=context).startswith('0.1')
+        assert context.flags == 0
+        assert tenth.to_decimal_string(56, context=context) == 'nan'
+        assert context.flags == Flags.INVALID
+        context = Context(max_output_digits=1000, max_bit_length=1000)
+        assert IEEEquad.make_smallest_subnormal(True).to_decimal_string(
+            -1, context=context) == 'nan'
+        assert IEEEdouble.format_many([tenth, IEEEdouble.make_zero(False)], precision=-1,
+                                      context=Context(max_output_digits=10)) == ['nan', '0.0']
+
+        # Precision escalations
+        text = '9007199254740993.' + '0' * 300 + '1'
+        context = Context(max_escalations=0)
+        context.set_handler(ResourceLimit, HandlerKind.RAISE)
+        with pytest.raises(ResourceLimit):
+            IEEEdouble.from_string(text, context)
+        context.max_escalations = None
+        assert IEEEdouble.from_string(text, context) == IEEEdouble.from_int(9007199254740994)
+
     def test_repr(self):
         c = Context(rounding=ROUND_UP, flags=Flags.INEXACT, tininess_after=True)
         assert repr(c) == (
@@ -1364,6 +1697,29 @@ class TestUnderflow:
 
 class TestBinaryFormat:
 
+    @pytest.mark.parametrize('fmt', (IEEEhalf, IEEEsingle, IEEEdouble, IEEEquad, x87extended,
+                                     x87double, x87single))
+    def test_pickle_predefined(self, fmt):
+        assert fmt.intern() is fmt
+        assert pickle.loads(pickle.dumps(fmt)) is fmt
+        assert len(pickle.dumps(fmt)) < 80
+
+    @pytest.mark.parametrize('fmt', (BinaryFormat.from_triple(7, 1000, -999),
+                                     BinaryFormat.from_IEEE(512)))
+    def test_pickle_interned(self, fmt):
+        triple = fmt[:3]
+        assert triple not in _interned_formats
+        # Unpickling does not intern the format
+        loaded = pickle.loads(pickle.dumps(fmt))
+        assert loaded == fmt
+        assert triple not in _interned_formats
+        assert pickle.loads(pickle.dumps(fmt)) is loaded
+        # Once interned, the interned format is unpickled
+        interned = fmt.intern()
+        assert pickle.loads(pickle.dumps(fmt)) is interned
+        assert pickle.loads(pickle.dumps(loaded)) is interned
+        assert BinaryFormat.from_triple(*triple).intern() is interned
+
     @pytest.mark.parametrize('fmt, is_if, precision, e_max', (
         (IEEEhalf, True, 11, 15),
         (IEEEsingle, True, 24, 127),
@@ -1461,6 +1817,64 @@ class TestBinaryFormat:
             assert floats_equal(value1, value2)
             assert ctx1.flags == ctx2.flags
 
+    @pytest.mark.parametrize('rounding', all_roundings)
+    def test_from_decimals(self, rounding):
+        texts = ('0', '-0', '-0e-20', '1.500', '-1.1', '2.5e-324', '1e-400', '-1.8e308',
+                 '123456789012345678901234567890e-10', '4.9406564584124654e-324',
+                 '1' * 50 + 'e280', '9' * 900 + 'e-600', 'Inf', '-Infinity', 'NaN', '-NaN12',
+                 'sNaN', 'sNaN7')
+        for fmt in (IEEEhalf, IEEEdouble, IEEEquad, x87extended):
+            results = []
+            for text in texts:
+                context = Context(rounding=rounding)
+                value = fmt.from_string(text, context)
+                results.append((value.as_tuple(), context.flags))
+            for n, text in enumerate(texts):
+                context = Context(rounding=rounding)
+                value = fmt.from_decimal(Decimal(text), context)
+                assert (value.as_tuple(), context.flags) == results[n]
+            context = Context(rounding=rounding)
+            values = fmt.from_decimals((Decimal(text) for text in texts), context)
+            assert [value.as_tuple() for value in values] == [pair[0] for pair in results]
+            assert context.flags == reduce(or_, (pair[1] for pair in results))
+
+    def test_from_decimals_signals(self):
+        context = Context()
+        context.set_handler(Overflow, HandlerKind.RAISE)
+        with pytest.raises(Overflow):
+            IEEEdouble.from_decimals([Decimal(1), Decimal('1e400')], context)
+        with pytest.raises(TypeError):
+            IEEEdouble.from_decimals([Decimal(1), 1.5])
+        context = Context(max_input_digits=10)
+        assert IEEEdouble.from_decimal(Decimal('1' * 20), context).is_nan()
+        assert context.flags == Flags.INVALID
+
+    @pytest.mark.parametrize('rounding', all_roundings)
+    def test_from_fractions(self, rounding):
+        fractions = (Fraction(0), Fraction(1, 3), Fraction(-2, 3), Fraction(5, 2),
+                     Fraction(1, 10 ** 330), Fraction(-(10 ** 309)), Fraction(3, 1 << 1074),
+                     Fraction(1, 3 << 1074), Fraction((1 << 200) + 1, 1 << 180))
+        for fmt in (IEEEhalf, IEEEdouble, IEEEquad, x87extended):
+            results = []
+            for fraction in fractions:
+                context = Context(rounding=rounding)
+                value = fmt.from_fraction(fraction, context)
+                # The reference: the numerator and denominator converted exactly and divided
+                wide = BinaryFormat.from_precision(max(fraction.numerator.bit_length(),
+                                                       fraction.denominator.bit_length(), 113))
+                ref_context = Context(rounding=rounding)
+                expected = fmt.divide(wide.from_int(fraction.numerator),
+                                      wide.from_int(fraction.denominator), ref_context)
+                assert value.as_tuple() == expected.as_tuple()
+                assert context.flags == ref_context.flags
+                results.append((value.as_tuple(), context.flags))
+            context = Context(rounding=rounding)
+            values = fmt.from_fractions(iter(fractions), context)
+            assert [value.as_tuple() for value in values] == [pair[0] for pair in results]
+            assert context.flags == reduce(or_, (pair[1] for pair in results))
+        with pytest.raises(TypeError):
+            IEEEdouble.from_fractions([Fraction(1), 1])
+
     @pytest.mark.parametrize('fmt, fraction, answer, flags', (
         (IEEEdouble, Fraction(1, 3), '0x1.5555555555555p-2', Flags.INEXACT),
         (IEEEdouble, Fraction(-1, 2), '-0.5', 0),
@@ -1522,6 +1936,44 @@ class TestBinaryFormat:
         with pytest.raises(TypeError):
             IEEEdouble.from_float(1)
 
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_from_floats(self, fmt):
+        floats = [0.0, -0.0, 1.0, -1.5, 0.1, 1e300, -1e-310, 5e-324, 2.2250738585072014e-308,
+                  float('inf'), float('-inf'), float('nan'),
+                  unpack('d', pack('Q', 0x7ff0000000000001))[0], 123456.789e-20]
+        context = Context()
+        context.set_handler(IEEEError, HandlerKind.RECORD_EXCEPTION)
+        expected_context = context.copy()
+        expected = [fmt.from_float(value, expected_context) for value in floats]
+        for values in (floats, array('d', floats), iter(floats)):
+            context.flags = 0
+            context.exceptions.clear()
+            results = fmt.from_floats(values, context)
+            assert [result.as_tuple() for result in results] == \
+                [value.as_tuple() for value in expected]
+            assert context.flags == expected_context.flags
+            assert [(type(e), e.op_tuple[0]) for e in context.exceptions] == \
+                [(type(e), e.op_tuple[0]) for e in expected_context.exceptions]
+        with pytest.raises(TypeError):
+            fmt.from_floats([1.0, 2])
+
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_to_floats(self, fmt):
+        context = Context()
+        values = [fmt.make_zero(True), fmt.make_one(False), fmt.make_largest_finite(True),
+                  fmt.make_smallest_normal(False), fmt.make_smallest_subnormal(False),
+                  fmt.make_infinity(True), fmt.make_nan(False, False, 3),
+                  fmt.from_string('0.1', context)]
+        context = Context()
+        results = fmt.to_floats(values, context)
+        assert isinstance(results, array) and results.typecode == 'd'
+        with local_context(Context()) as expected_context:
+            expected = [float(value) for value in values]
+        assert pack(f'{len(values)}d', *expected) == results.tobytes()
+        assert context.flags == expected_context.flags
+        with pytest.raises(ValueError):
+            fmt.to_floats([BinaryFormat.from_triple(5, 15, -14).make_one(False)])
+
     def test_from_string_type(self):
         with pytest.raises(TypeError):
             IEEEdouble.from_string(b'')
@@ -1541,6 +1993,138 @@ class TestBinaryFormat:
     def test_from_string_unicode(self, fmt):
         assert fmt.from_string(' ０x１＿０２p0 ') == fmt.from_int(0x102)
 
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_parse_many(self, fmt):
+        # Literals near the boundaries and of varying lengths, exactly as from_string()
+        rng = random.Random(fmt.precision)
+        strings = ['1', '-0', '_1_5e-1', b' 2.5 ', 'nan', '-sNaN3', '-inf', '0x1.8p1',
+                   ' ０x１＿０２p0 ', '1e99999', '-1e-99999']
+        for value in (fmt.make_largest_finite(False), fmt.make_smallest_normal(True),
+                      fmt.make_smallest_subnormal(False), fmt.make_one(False)):
+            for digits in (1, 3, fmt.decimal_precision, fmt.decimal_precision + 5):
+                text = value.to_decimal_string(digits)
+                strings.append(text)
+                strings.append(text.replace('e', '5e'))
+        for _ in range(40):
+            strings.append(f'{rng.getrandbits(rng.randrange(1, 200))}e'
+                           f'{rng.randrange(fmt.e_min // 3 - 60, fmt.e_max // 3 + 10)}')
+        for rounding in all_roundings:
+            for tininess_after in (False, True):
+                context = Context(rounding=rounding, tininess_after=tininess_after)
+                results, first_invalid = fmt.parse_many(strings, context)
+                assert first_invalid is None
+                expected_flags = 0
+                for string, result in zip(strings, results):
+                    expected_context = Context(rounding=rounding,
+                                               tininess_after=tininess_after)
+                    if isinstance(string, bytes):
+                        string = string.decode()
+                    expected = fmt.from_string(string, expected_context)
+                    assert result.as_tuple() == expected.as_tuple()
+                    expected_flags |= expected_context.flags
+                assert context.flags == expected_flags
+
+        if fmt.fmt_width:
+            raw, _ = fmt.parse_many(strings, Context(), packed=True, endianness='big')
+            assert bytes(raw) == b''.join(value.pack('big') for value in results)
+
+    def test_working_formats_not_interned(self):
+        interned = len(_interned_formats)
+        for n in range(1, 30):
+            IEEEdouble.from_string('1.' + '3' * (n * 40) + 'e-300', Context())
+        assert len(_interned_formats) == interned
+
+    def test_parse_many_invalid(self):
+        context = Context(flags=Flags.INVALID)
+        results, first_invalid = IEEEdouble.parse_many(iter(['1', '2', 'x', '3', 'y']),
+                                                       context)
+        assert first_invalid == 2 and len(results) == 5
+        assert results[2].is_nan() and results[3] == IEEEdouble.from_int(3)
+        assert context.flags == Flags.INVALID
+        # Invalid literals are found however their signal is handled
+        context = Context()
+        context.set_handler(InvalidFromString, HandlerKind.NO_FLAG)
+        results, first_invalid = IEEEdouble.parse_many(['1', 'nan', ' 0x1p', 'x'], context)
+        assert first_invalid == 2 and context.flags == 0
+        # Exceeding a resource limit is not a syntax error
+        context = Context(max_input_digits=3)
+        assert IEEEdouble.parse_many(['1', '12345'], context)[1] is None
+        assert context.flags == Flags.INVALID
+        context.set_handler(InvalidFromString, HandlerKind.RAISE)
+        with pytest.raises(InvalidFromString) as e:
+            IEEEdouble.parse_many(['1', '2', 'x'], context)
+        assert e.value.index == 2
+        with pytest.raises(InvalidFromString) as e:
+            IEEEdouble.from_string('x', context)
+        assert e.value.index is None
+        with pytest.raises(TypeError):
+            IEEEdouble.parse_many([1.5])
+
+    @pytest.mark.parametrize('binary', (False, True))
+    def test_parse_file(self, binary, tmp_path):
+        strings = [str(n * 1.5) for n in range(-200, 200)]
+        expected = [IEEEsingle.from_string(string) for string in strings]
+        text = ','.join(strings[:150]) + '\n' + '\r\n'.join(strings[150:300]) + ',\n\n' \
+            + ', '.join(strings[300:])
+        if binary:
+            text = text.encode()
+        make_file = io.BytesIO if binary else io.StringIO
+        for chunk_size in (1, 7, 1 << 20):
+            results, first_invalid = IEEEsingle.parse_file(make_file(text), ',',
+                                                           chunk_size=chunk_size)
+            assert results == expected and first_invalid is None
+        whitespace = text.replace(b',' if binary else ',', b'\t ' if binary else '\t ')
+        results, _ = IEEEsingle.parse_file(make_file(whitespace), chunk_size=5)
+        assert results == expected
+
+        path = tmp_path / 'values.csv'
+        path.write_text('1.5,x\n2.5,3')
+        results, first_invalid = IEEEsingle.parse_file(str(path), ',', Context(),
+                                                        packed=True, endianness='little')
+        assert len(results) == 16 and first_invalid == 1
+        assert results[8:] == b''.join(IEEEsingle.from_string(s).pack('little')
+                                       for s in ('2.5', '3'))
+
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_format_many(self, fmt):
+        values = [fmt.make_zero(True), fmt.make_one(False), fmt.make_largest_finite(True),
+                  fmt.make_smallest_normal(False), fmt.make_smallest_subnormal(True),
+                  fmt.make_infinity(False), fmt.make_nan(True, False, 5),
+                  fmt.from_int(1000), fmt.from_string('0.1'), fmt.from_string('-1e-3')]
+        text_formats = (None, Dec_g_Format, DefaultHexFormat,
+                        TextFormat(exp_digits=3, upper_case=True, force_leading_sign=True),
+                        TextFormat(exp_digits=-2, force_point=True, rstrip_zeroes=True,
+                                   force_exp_sign=False))
+        for text_format in text_formats:
+            for precision in (0, 1, 5, -1):
+                context = Context()
+                expected_context = Context()
+                expected = [value.to_decimal_string(precision, text_format, expected_context)
+                            for value in values]
+                assert fmt.format_many(values, text_format, precision, context=context) \
+                    == expected
+                assert context.flags == expected_context.flags
+            expected = [value.to_string(text_format) for value in values]
+            assert fmt.format_many(values, text_format, hexadecimal=True) == expected
+
+        out = io.StringIO()
+        assert fmt.format_many(iter(values), out=out, separator=',', chunk_size=3) == 10
+        assert out.getvalue() == ''.join(value.to_decimal_string() + ',' for value in values)
+
+    def test_format_many_signals(self):
+        values = [IEEEdouble.from_string(text) for text in ('0.1', '0.5', 'sNaN')]
+        context = Context()
+        context.set_handler(Inexact, HandlerKind.RECORD_EXCEPTION)
+        assert IEEEdouble.format_many(values, precision=3, context=context) == \
+            ['0.100', '0.500', 'snan']
+        assert len(context.exceptions) == 1 and context.flags == Flags.INEXACT
+        context = Context()
+        assert IEEEdouble.format_many(values, text_format=TextFormat(snan='', nan_payload='N'),
+                                      context=context)[2] == 'NaN'
+        assert context.flags == Flags.INVALID | Flags.INEXACT
+        with pytest.raises(ValueError):
+            IEEEdouble.format_many([IEEEsingle.make_one(False)])
+
     def test_repr(self):
         assert repr(IEEEdouble) == 'BinaryFormat(precision=53, e_max=1023, e_min=-1022)'
 
@@ -1903,6 +2487,38 @@ class TestPython:
         else:
             assert hash(value) == hash(Decimal(string))
 
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_hash_random(self, fmt):
+        for _ in range(200):
+            e_biased = random.randrange(1, fmt.e_max + fmt.e_bias + 1)
+            significand = random.randrange(0, fmt.max_significand + 1)
+            significand >>= random.randrange(0, fmt.precision)
+            if e_biased > 1:
+                significand |= fmt.int_bit
+            value = Binary(fmt, random.choice((False, True)), e_biased, significand)
+            n, d = value.as_integer_ratio()
+            assert d > 0 and d & (d - 1) == 0
+            assert Fraction(n, d) == Fraction(significand * (-1 if value.sign else 1)) * (
+                Fraction(2) ** value.exponent_int())
+            assert hash(value) == hash(Fraction(n, d))
+            if fmt is IEEEdouble:
+                assert hash(value) == hash(float(value))
+
+    @pytest.mark.parametrize('fmt', (IEEEhalf, IEEEsingle, IEEEdouble, IEEEquad, x87extended,
+                                     x87double, BinaryFormat.from_triple(5, 15, -14)))
+    def test_pickle(self, fmt):
+        values = [fmt.from_string(text) for text in (
+            '0', '-0', '1', '-2.5', 'Inf', '-Inf', 'NaN', '-NaN255', 'sNaN3')]
+        values.append(fmt.make_largest_finite(False))
+        values.append(fmt.make_smallest_subnormal(True))
+        loaded = pickle.loads(pickle.dumps(values))
+        assert [tuple(value) for value in loaded] == [tuple(value) for value in values]
+        assert all(value.fmt is loaded[0].fmt for value in loaded)
+        assert loaded[0].fmt == fmt
+        assert loaded[0].fmt is _interned_formats.get(fmt[:3], loaded[0].fmt)
+        # Values pickle compactly
+        assert len(pickle.dumps(values * 10)) < 40 * len(values) * 10 + 100
+
     @pytest.mark.parametrize('fmt', all_IEEE_fmts)
     def test_hash_NaN(self, fmt):
         value = fmt.from_string('nan2')
@@ -2718,6 +3334,82 @@ class TestGeneralNonComputationalOps:
         assert value.sign is sign
         assert value.fmt is fmt
 
+    @pytest.mark.parametrize('fmt, rounding, tininess_after',
+                             product(all_IEEE_fmts, all_roundings, (False, True)))
+    def test_normalize_kernels(self, fmt, rounding, tininess_after):
+        # A format equal to but not identical to a predefined one has its own kernel, kept
+        # in the bounded cache
+        uninterned_fmt = BinaryFormat.from_triple(fmt.precision, fmt.e_max, fmt.e_min)
+        assert fmt._normalizer(rounding) is fmt._normalizer(rounding)
+        assert uninterned_fmt._normalizer(rounding) is uninterned_fmt._normalizer(rounding)
+        assert uninterned_fmt._normalizer(rounding) is not fmt._normalizer(rounding)
+        for _ in range(50):
+            sign = random.choice((False, True))
+            significand = random.getrandbits(fmt.precision + 8) | random.choice((0, 1))
+            significand |= 1 << random.randrange(fmt.precision + 8)
+            exponent = random.randrange(fmt.e_min - fmt.precision * 2, fmt.e_max + 2)
+            answer_context = Context(rounding=rounding, tininess_after=tininess_after)
+            answer = reference_normalize(fmt, sign, exponent, significand, answer_context)
+            for test_fmt in (fmt, uninterned_fmt):
+                context = Context(rounding=rounding, tininess_after=tininess_after)
+                value = test_fmt._normalize(sign, exponent, significand, None, context)
+                assert value.fmt is test_fmt
+                assert value.as_tuple() == answer.as_tuple()
+                assert context.flags == answer_context.flags
+
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_next_up_kernels(self, fmt):
+        uninterned_fmt = BinaryFormat.from_triple(fmt.precision, fmt.e_max, fmt.e_min)
+        assert fmt._kernel('next_up', fmt._make_next_up) is not \
+            uninterned_fmt._kernel('next_up', uninterned_fmt._make_next_up)
+        max_key = fmt.make_infinity(False).total_order_key()
+        keys = [0, -1, 1, -2, max_key - 1, max_key, -max_key - 1, -max_key]
+        keys.extend(random.randrange(-max_key, max_key) for _ in range(50))
+        for key in keys:
+            for test_fmt in (fmt, uninterned_fmt):
+                value = test_fmt.from_total_order_key(key)
+                # The generic algorithm: the next key in the total order, skipping +0
+                answer_key = min(key + 1 + (key == -1), max_key)
+                context = Context()
+                result = value.next_up(context)
+                assert result.fmt is test_fmt
+                assert result.total_order_key() == answer_key
+                assert context.flags == 0
+                result = value.negate_quiet().next_down(context)
+                assert result.negate_quiet().total_order_key() == answer_key
+
+    def test_round_up_table(self):
+        for rounding, lost_fraction, sign, is_odd in product(
+                all_roundings, range(4), (False, True), (False, True)):
+            assert (round_up(rounding, lost_fraction, sign, is_odd)
+                    == _round_up_slow(rounding, lost_fraction, sign, is_odd))
+
+
+def reference_normalize(fmt, sign, exponent, significand, context):
+    '''The generic normalization algorithm the specialized kernels must agree with.'''
+    exponent += fmt.precision - 1
+    rshift = max(significand.bit_length() - fmt.precision, fmt.e_min - exponent)
+    significand, lost_fraction = shift_right(significand, rshift)
+    exponent += rshift
+    is_tiny = significand < fmt.int_bit
+    if _round_up_slow(context.rounding, lost_fraction, sign, bool(significand & 1)):
+        significand += 1
+        if significand > fmt.max_significand:
+            significand >>= 1
+            exponent += 1
+    if exponent > fmt.e_max:
+        return Overflow(None, fmt.make_overflow_value(context.rounding, sign)).signal(context)
+    if context.tininess_after:
+        is_tiny = significand < fmt.int_bit
+    is_inexact = lost_fraction != 0
+    result = Binary(fmt, sign, exponent + fmt.e_bias, significand)
+    if is_tiny:
+        cls = UnderflowInexact if is_inexact else UnderflowExact
+        return cls(None, result).signal(context)
+    if is_inexact:
+        return Inexact(None, result).signal(context)
+    return result
+
 
 class TestUnaryOps:
 
@@ -2764,6 +3456,12 @@ class TestUnaryOps:
 
             assert result.as_tuple() == answer_tuple
             assert context.flags == status
+
+            # The batch conversion agrees
+            context = rounding_string_to_context(parts[1])
+            results, first_invalid = fmt.parse_many([test_str], context)
+            assert results[0].as_tuple() == answer_tuple
+            assert context.flags == status and first_invalid is None
         else:
             assert False, f'bad line: {line}'
 
@@ -2858,6 +3556,31 @@ class TestUnaryOps:
             assert floats_equal(answer, fmt.from_string(answer_str))
         assert quiet_context.flags == status
 
+    @pytest.mark.parametrize('fmt', (IEEEdouble, x87extended, BinaryFormat.from_IEEE(256)))
+    def test_round_extremes(self, fmt):
+        # Values with thousands of digits, which once went through a decimal string
+        context = Context()
+        largest = fmt.make_largest_finite(False)
+        assert largest.round(3, ROUND_HALF_EVEN, context) is largest
+        tiny = fmt.make_smallest_subnormal(True)
+        assert tiny.round(-fmt.e_min + fmt.precision, ROUND_HALF_EVEN, context) is tiny
+        assert tiny.round(3, ROUND_HALF_EVEN, context).as_tuple() == \
+            fmt.make_zero(True).as_tuple()
+        assert context.flags == 0
+        assert tiny.round(3, ROUND_FLOOR, context) == fmt.from_string('-0.001', Context())
+        assert context.flags == Flags.INEXACT
+        # Rounding to a huge power of ten
+        context.flags = 0
+        assert largest.round(-10 ** 6, ROUND_HALF_EVEN, context).is_zero()
+        assert context.flags == 0
+        assert largest.round(-10 ** 6, ROUND_UP, context).is_infinite()
+        assert context.flags == Flags.OVERFLOW | Flags.INEXACT
+        context.flags = 0
+        value = fmt.from_string('123456.789', Context())
+        assert value.round(-2, ROUND_HALF_EVEN, context) == fmt.from_int(123500)
+        assert value.round(2, ROUND_HALF_EVEN, context) == fmt.from_string('123456.79', Context())
+        assert context.flags == Flags.INEXACT
+
     @pytest.mark.parametrize('line', read_lines('convert.txt'))
     def test_convert(self, line):
         parts = line.split()
@@ -2877,6 +3600,49 @@ class TestUnaryOps:
         assert floats_equal(result, answer)
         assert context.flags == status
 
+        context.flags = 0
+        result, = dst_fmt.convert_many([src_value], context)
+        assert floats_equal(result, answer)
+        assert context.flags == status
+
+    @pytest.mark.parametrize('src_fmt, dst_fmt', product(format_codes.values(), repeat=2))
+    def test_convert_widening(self, src_fmt, dst_fmt):
+        assert dst_fmt.is_superset(src_fmt) == (
+            dst_fmt.precision >= src_fmt.precision and dst_fmt.e_max >= src_fmt.e_max
+            and dst_fmt.e_min <= src_fmt.e_min)
+        # An equal but uninterned destination format, and a wider uninterned one, have
+        # their kernels in the bounded cache
+        equal_dst_fmt = BinaryFormat.from_triple(*dst_fmt[:3])
+        other_dst_fmt = BinaryFormat.from_triple(dst_fmt.precision + 1, dst_fmt.e_max,
+                                                 dst_fmt.e_min)
+        assert other_dst_fmt._widener(src_fmt) is other_dst_fmt._widener(src_fmt)
+        assert (other_dst_fmt._widener(BinaryFormat.from_triple(*src_fmt[:3]))
+                is other_dst_fmt._widener(BinaryFormat.from_triple(*src_fmt[:3])))
+        values = [src_fmt.make_smallest_subnormal(False), src_fmt.make_smallest_normal(True),
+                  src_fmt.make_largest_finite(False), src_fmt.make_one(True)]
+        values.extend(Binary(src_fmt, random.choice((False, True)), 1,
+                             random.randrange(1, src_fmt.int_bit)) for _ in range(10))
+        values.extend(Binary(src_fmt, random.choice((False, True)),
+                             random.randrange(1, src_fmt.e_max + src_fmt.e_bias + 1),
+                             random.randrange(src_fmt.int_bit, src_fmt.max_significand + 1))
+                      for _ in range(10))
+        for fmt in (dst_fmt, equal_dst_fmt, other_dst_fmt):
+            for value in values:
+                context = Context()
+                result = fmt.convert(value, context)
+                answer_context = Context()
+                answer = fmt._normalize(value.sign, value.exponent_int(), value.significand,
+                                        (OP_CONVERT, value), answer_context)
+                assert floats_equal(result, answer)
+                assert context.flags == answer_context.flags
+                if fmt.is_superset(src_fmt):
+                    assert (fmt._convert_quiet(value).as_integer_ratio()
+                            == value.as_integer_ratio())
+            context = Context()
+            results = fmt.convert_many(values, context)
+            assert all(floats_equal(result, fmt.convert(value, Context()))
+                       for result, value in zip(results, values))
+
     @pytest.mark.parametrize('line', read_lines('from_int.txt'))
     def test_from_int(self, line):
         parts = line.split()
@@ -2897,6 +3663,36 @@ class TestUnaryOps:
         assert floats_equal(result, answer)
         assert context.flags == status
 
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_iter_decimal_digits(self, fmt):
+        for value in (fmt.make_smallest_subnormal(True), fmt.make_smallest_normal(False),
+                      fmt.make_largest_finite(False), fmt.make_one(True),
+                      fmt.from_string('0.1'), fmt.from_int(1000)):
+            numerator, denominator = value.as_integer_ratio()
+            exponent, chunks = value.iter_decimal_digits(5)
+            chunks = list(chunks)
+            assert all(len(chunk) == 5 for chunk in chunks[:-1])
+            assert 0 < len(chunks[-1]) <= 5 and chunks[-1][-1] != '0'
+            digits = ''.join(chunks)
+            assert digits[0] != '0'
+            # Python limits the length of strings converted to int
+            significand = 0
+            for chunk in chunks:
+                significand = significand * 10 ** len(chunk) + int(chunk)
+            assert significand * Fraction(10) ** (exponent + 1 - len(digits)) == \
+                Fraction(abs(numerator), denominator)
+            text = value.to_decimal_string(-1, TextFormat(exp_digits=1))
+            assert text.replace('.', '').lstrip('-').startswith(digits)
+            assert text.endswith(f'e{exponent:+d}')
+
+        exponent, chunks = fmt.make_zero(False).iter_decimal_digits()
+        assert (exponent, list(chunks)) == (0, ['0'])
+        # Lazy: the first chunk of a huge expansion is available at once
+        exponent, chunks = fmt.make_smallest_subnormal(False).iter_decimal_digits(3)
+        assert len(next(chunks)) == 3
+        with pytest.raises(ValueError):
+            fmt.make_infinity(False).iter_decimal_digits()
+
     @pytest.mark.parametrize('line', read_lines('to_hex.txt'))
     def test_to_hex(self, line):
         parts = line.split()
@@ -3303,6 +4099,40 @@ class TestBinaryOps:
     def test_min_mag_num(self, line):
         min_max_op(line, 'min_mag_num')
 
+    @pytest.mark.parametrize('flags, fmt', product(
+        [MinMaxFlags(n) for n in range(8)], (IEEEhalf, IEEEdouble)))
+    def test_reduce_max_min(self, flags, fmt):
+        samples = [fmt.make_zero(False), fmt.make_zero(True), fmt.make_one(False),
+                   fmt.make_one(True), fmt.make_infinity(False), fmt.make_infinity(True),
+                   fmt.make_nan(False, False, 3), fmt.make_nan(True, True, 4),
+                   fmt.make_nan(False, True, 1), fmt.make_largest_finite(True),
+                   fmt.make_smallest_subnormal(False), fmt.make_smallest_subnormal(True)]
+        method = getattr(Binary, flags.op_name())
+        for length in range(1, 8):
+            for _ in range(30):
+                values = [random.choice(samples) for _ in range(length)]
+                answer_context = Context()
+                answer = values[0]
+                for value in values[1:]:
+                    answer = method(answer, value, answer_context)
+                context = Context()
+                result = fmt.reduce_max_min(iter(values), flags, context)
+                assert floats_equal(result, answer)
+                assert context.flags == answer_context.flags
+
+        context = Context()
+        context.set_handler(SignallingNaNOperand, HandlerKind.RECORD_EXCEPTION)
+        snan = fmt.make_nan(False, True, 1)
+        fmt.reduce_max_min([snan, fmt.make_one(False), snan, snan], flags, context)
+        assert len(context.exceptions) == 1
+        assert context.exceptions[0].op_tuple == (flags.op_name(), snan)
+
+        with pytest.raises(ValueError):
+            fmt.reduce_max_min([], flags, context)
+        with pytest.raises(ValueError):
+            fmt.reduce_max_min([fmt.make_one(False), IEEEsingle.make_one(False)], flags,
+                               context)
+
     @pytest.mark.parametrize('operation', ('remainder', 'fmod', 'mod', 'floordiv'))
     def test_diff_formats(self, operation, context):
         lhs = IEEEsingle.make_one(False)
@@ -3454,6 +4284,112 @@ class TestBinaryOps:
 
         assert lhs.compare_total_mag(rhs) is lhs_abs.compare_total(rhs_abs)
 
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_total_order_key(self, fmt):
+        values = [fmt.make_zero(False), fmt.make_zero(True), fmt.make_infinity(False),
+                  fmt.make_infinity(True), fmt.make_nan(False, False, 0),
+                  fmt.make_nan(True, True, 1), fmt.make_nan(False, True, 5),
+                  fmt.make_nan(True, False, 3), fmt.make_largest_finite(True),
+                  fmt.make_smallest_subnormal(False), fmt.make_smallest_normal(True)]
+        for _ in range(40):
+            e_biased = random.randrange(1, fmt.e_max + fmt.e_bias + 1)
+            significand = random.randrange(0, fmt.int_bit)
+            if e_biased > 1 or random.choice((False, True)):
+                significand |= fmt.int_bit
+            values.append(Binary(fmt, random.choice((False, True)), e_biased, significand))
+
+        keys = fmt.total_order_keys(values)
+        mag_keys = fmt.total_order_keys(values, mag=True)
+        for value, key, mag_key in zip(values, keys, mag_keys):
+            assert value.total_order_key() == key
+            assert value.total_order_mag_key() == mag_key == value.abs_quiet().total_order_key()
+            assert floats_equal(fmt.from_total_order_key(key), value)
+
+        # Compare with the general implementation via another format object
+        other_fmt = BinaryFormat.from_triple(fmt.precision, fmt.e_max, fmt.e_min)
+        for lhs, lhs_key in zip(values, keys):
+            for rhs, rhs_key in zip(values, keys):
+                rhs_other = Binary(other_fmt, rhs.sign, rhs.e_biased, rhs.significand)
+                assert (lhs_key <= rhs_key) is lhs.compare_total(rhs_other)
+                assert ((lhs.total_order_mag_key() <= rhs.total_order_mag_key())
+                        is lhs.compare_total_mag(rhs_other))
+
+        # Adjacent keys are adjacent values
+        value = fmt.make_largest_finite(True)
+        assert floats_equal(fmt.from_total_order_key(value.total_order_key() + 1),
+                            value.next_up(Context()))
+        assert floats_equal(fmt.from_total_order_key(-1), fmt.make_zero(True))
+
+        with pytest.raises(ValueError):
+            fmt.from_total_order_key(fmt.make_nan(False, False, fmt.quiet_bit - 1)
+                                     .total_order_key() + 1)
+        with pytest.raises(ValueError):
+            fmt.total_order_keys([IEEEsingle.make_zero(False), IEEEdouble.make_zero(False)])
+
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts + (x87extended, ))
+    def test_iter_range(self, fmt):
+        def keys(values):
+            return [value.total_order_key() for value in values]
+
+        # Ranges across the NaNs and infinities, zeroes, subnormals and binades
+        neg_inf_key = fmt.make_infinity(True).total_order_key()
+        inf_key = fmt.make_infinity(False).total_order_key()
+        normal_key = fmt.make_smallest_normal(False).total_order_key()
+        one_key = fmt.make_one(False).total_order_key()
+        ranges = [(key - 10, key + 10)
+                  for key in (neg_inf_key, 0, normal_key, -one_key, one_key, inf_key)]
+        for lo_key, hi_key in ranges:
+            lo = fmt.from_total_order_key(lo_key)
+            hi = fmt.from_total_order_key(hi_key)
+            for step in (1, 3, fmt.int_bit + 1):
+                expected = list(range(lo_key, hi_key + 1, step))
+                values = list(fmt.iter_range(lo, hi, step))
+                assert keys(values) == expected
+                packed = list(fmt.iter_range(lo, hi, step, packed=True, endianness='big'))
+                assert packed == [value.pack('big') for value in values]
+            assert fmt.count_between(lo, hi) == hi_key - lo_key + 1
+            assert fmt.count_between(hi, lo) == 0
+            assert not list(fmt.iter_range(hi, lo))
+
+            parts = fmt.split_range(lo, hi, 4)
+            assert len(parts) == 4
+            assert floats_equal(parts[0][0], lo)
+            assert floats_equal(parts[-1][1], hi)
+            sizes = [fmt.count_between(part_lo, part_hi) for part_lo, part_hi in parts]
+            assert sum(sizes) == hi_key - lo_key + 1 and max(sizes) - min(sizes) <= 1
+            assert keys(value for part in parts for value in fmt.iter_range(*part)) \
+                == list(range(lo_key, hi_key + 1))
+
+        # Adjacent values are those of next_up, except for the zeroes
+        context = Context()
+        one = fmt.make_one(False)
+        value = one
+        for result in fmt.iter_range(one, fmt.from_total_order_key(one.total_order_key() + 5)):
+            assert floats_equal(result, value)
+            value = value.next_up(context)
+        assert keys(fmt.iter_range(fmt.make_zero(True), fmt.make_zero(False))) == [-1, 0]
+        zero = fmt.make_zero(False)
+        assert len(fmt.split_range(zero, fmt.from_total_order_key(2), 5)) == 3
+
+        with pytest.raises(ValueError):
+            fmt.iter_range(zero, zero, 0)
+        with pytest.raises(ValueError):
+            fmt.split_range(zero, zero, 0)
+        with pytest.raises(ValueError):
+            fmt.count_between(IEEEsingle.make_zero(False), IEEEdouble.make_zero(False))
+        other_fmt = BinaryFormat.from_triple(5, 15, -14)
+        with pytest.raises(RuntimeError):
+            other_fmt.iter_range(other_fmt.make_zero(False), other_fmt.make_one(False),
+                                 packed=True)
+
+    @pytest.mark.parametrize('fmt', all_IEEE_fmts)
+    def test_compare_subnormal_normal(self, fmt, quiet_context):
+        normal = fmt.make_smallest_normal(False)
+        subnormal = Binary(fmt, False, 1, fmt.int_bit - 1)
+        assert normal.compare(subnormal) == Compare.GREATER_THAN
+        assert subnormal.compare(normal) == Compare.LESS_THAN
+        assert normal.negate_quiet().compare(subnormal.negate_quiet()) == Compare.LESS_THAN
+
     def test_compare_formats(self):
         assert IEEEsingle.make_zero(True).compare_total(IEEEdouble.make_zero(False))
         assert not IEEEsingle.make_zero(False).compare_total(IEEEquad.make_zero(True))
@@ -0,0 +1,114 @@
+import pytest
+
+from ieee754 import *
+from ieee754.random import Generator, DISTRIBUTIONS, generate
+
+
+small_fmt = BinaryFormat.from_triple(5, 15, -14)
+all_fmts = (IEEEhalf, IEEEsingle, IEEEdouble, IEEEquad, x87extended, small_fmt)
+
+
+def tuples(values):
+    # Binary equality is IEEE equality so NaNs compare unequal
+    return [tuple(value) for value in values]
+
+
+@pytest.mark.parametrize('fmt', all_fmts)
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+def test_values_valid(fmt, distribution):
+    values = Generator(fmt, 1).values(distribution, 500)
+    assert len(values) == 500
+    for value in values:
+        assert value.fmt is fmt
+        # The validating constructor accepts it
+        assert tuple(Binary(*value)) == tuple(value)
+    assert any(value.sign for value in values)
+    assert not all(value.sign for value in values)
+
+
+@pytest.mark.parametrize('fmt', all_fmts)
+def test_distributions(fmt):
+    generator = Generator(fmt, 2)
+    values = generator.uniform(2000)
+    if fmt is small_fmt:
+        # Small enough to see every kind of encoding
+        assert any(value.is_subnormal() for value in values)
+        assert any(value.is_infinite() for value in values)
+        assert any(value.is_nan() for value in values)
+    assert any(value.is_normal() for value in values)
+
+    assert all(value.is_normal() for value in generator.log_uniform(1000))
+
+    values = generator.subnormal(1000)
+    assert all(value.is_subnormal() for value in values)
+    assert any(value.significand < fmt.int_bit >> 2 for value in values)
+
+    values = generator.subnormal_heavy(1000)
+    assert all(value.is_finite() for value in values)
+    assert 600 < sum(value.is_subnormal() or value.is_zero() for value in values) < 900
+    assert all(value.e_biased <= 4 for value in values)
+
+    values = generator.near_overflow(1000)
+    assert all(value.is_normal() and value.e_biased > fmt.e_max + fmt.e_bias - 4
+               for value in values)
+    assert any(value.next_up().is_infinite() for value in values)
+
+    bits = min(fmt.precision, 11)
+    values = generator.short_significand(1000)
+    assert all(value.is_normal() for value in values)
+    assert all(value.significand % (1 << (fmt.precision - bits)) == 0 for value in values)
+
+    values = generator.nans(1000)
+    assert all(value.is_nan() for value in values)
+    assert any(value.is_snan() for value in values)
+    assert not all(value.is_snan() for value in values)
+
+
+def test_short_significand_bits():
+    values = Generator(IEEEdouble, 3).short_significand(1000, bits=3)
+    assert {value.significand >> 50 for value in values} == {4, 5, 6, 7}
+
+
+def test_reproducible():
+    assert tuples(Generator(IEEEsingle, 5).uniform(100)) == \
+        tuples(Generator(IEEEsingle, 5).uniform(100))
+    assert tuples(Generator(IEEEsingle, 5).uniform(100)) != \
+        tuples(Generator(IEEEsingle, 6).uniform(100))
+    assert tuples(Generator(IEEEsingle, 5).uniform(100)) != \
+        tuples(Generator(IEEEsingle, 5, 1).uniform(100))
+    assert Generator(IEEEsingle).seed != Generator(IEEEsingle).seed
+    # Formats of similar size draw different values
+    fmt = BinaryFormat.from_triple(24, 126, -125)
+    assert [value.significand for value in Generator(IEEEsingle, 5).log_uniform(100)] != \
+        [value.significand for value in Generator(fmt, 5).log_uniform(100)]
+
+
+@pytest.mark.parametrize('distribution', ('uniform', 'nans'))
+def test_generate(distribution):
+    values = generate(IEEEdouble, distribution, 250, 7, workers=1, chunksize=100)
+    assert len(values) == 250
+    # Chunk n is stream n
+    assert tuples(values[100:200]) == tuples(Generator(IEEEdouble, 7, 1).values(
+        distribution, 100))
+    assert tuples(generate(IEEEdouble, distribution, 250, 7, workers=2, chunksize=100)) \
+        == tuples(values)
+
+
+def test_packed():
+    generator = Generator(IEEEsingle, 8)
+    raw = generator.packed('log_uniform', 10, 'big')
+    assert len(raw) == 40
+    values = Generator(IEEEsingle, 8).log_uniform(10)
+    assert [IEEEsingle.unpack_value(raw[n * 4: n * 4 + 4], 'big') for n in range(10)] \
+        == values
+    raw = generate(IEEEsingle, 'log_uniform', 10, 8, workers=1, packed=True)
+    assert raw == b''.join(value.pack() for value in values)
+
+
+def test_errors():
+    with pytest.raises(TypeError):
+        Generator(IEEEsingle.precision, 1)
+    with pytest.raises(ValueError):
+        Generator(IEEEsingle, 1).values('normal', 1)
+    with pytest.raises(RuntimeError):
+        Generator(small_fmt, 1).packed('uniform', 1)
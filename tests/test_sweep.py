@@ -0,0 +1,123 @@
+import io
+
+import pytest
+
+from ieee754 import *
+from ieee754.sweep import Sweep, FORMATS, OPERATIONS, read_sweep, main, _operand_table
+
+
+E5M2 = FORMATS['E5M2']
+
+
+def add_reference(operands, rounding, tininess_after):
+    context = Context(rounding=rounding, tininess_after=tininess_after)
+    return E5M2.add(*operands, context), context.flags
+
+
+def wrong_reference(operands, rounding, tininess_after):
+    if operands[0].is_zero():
+        return operands[0], 0
+    return add_reference(operands, rounding, tininess_after)
+
+
+def test_formats():
+    assert FORMATS['bfloat16'].fmt_width == 17
+    assert E5M2.fmt_width == 9 and FORMATS['E4M3'].fmt_width == 9
+
+
+def test_sweep_unary():
+    output = io.BytesIO()
+    result = Sweep('next_up', E5M2, roundings=[ROUND_HALF_EVEN]).run(output, workers=1,
+                                                                      chunksize=100)
+    assert result.cases == 512 and not result.mismatches
+    output.seek(0)
+    header, records = read_sweep(output)
+    assert header['op'] == 'next_up' and header['format'] == [3, 15, -14]
+    assert header['record_size'] == 2
+    records = list(records)
+    assert len(records) == 512
+    for rounding, tininess_after, (encoding, ), result, flags in records:
+        assert rounding == ROUND_HALF_EVEN
+        value = E5M2.unpack_value(bytes((encoding, )), 'big')
+        context = Context()
+        expected = value.next_up(context)
+        assert expected.pack('big') == bytes((result, ))
+        assert flags == context.flags
+
+
+def test_sweep_binary():
+    sweep = Sweep('add', E5M2, roundings=[ROUND_UP], tininess=[False])
+    assert sweep.cases == 65536
+    output = io.BytesIO()
+    result = sweep.run(output, add_reference, workers=2, chunksize=20000)
+    assert result.cases == sweep.cases and not result.mismatches
+    one_worker = io.BytesIO()
+    sweep.run(one_worker, workers=1)
+    assert one_worker.getvalue() == output.getvalue()
+
+    output.seek(0)
+    header, records = read_sweep(output)
+    # 1.5 + 1.5 = 3 exactly
+    index = 0x3e * 256 + 0x3e
+    for n, record in enumerate(records):
+        if n == index:
+            assert record == (ROUND_UP, False, (0x3e, 0x3e), 0x42, 0)
+            break
+
+
+def test_sweep_mismatches():
+    sweep = Sweep('add', E5M2, roundings=[ROUND_HALF_EVEN], tininess=[True])
+    result = sweep.run(reference=wrong_reference, workers=1, max_mismatches=5)
+    assert len(result.mismatches) == 5
+    mismatch = result.mismatches[0]
+    assert mismatch.operands[0].is_zero() and mismatch.rounding == ROUND_HALF_EVEN
+    assert tuple(mismatch.result) != tuple(mismatch.expected)
+
+
+def test_sweep_result_format():
+    sweep = Sweep('convert', E5M2, IEEEhalf, roundings=[ROUND_HALF_EVEN])
+    output = io.BytesIO()
+    sweep.run(output, workers=1)
+    output.seek(0)
+    header, records = read_sweep(output)
+    assert header['record_size'] == 3
+    # Conversion to a wider format is exact
+    assert all(IEEEhalf.unpack_value(result.to_bytes(2, 'big'), 'big').pack('big')[0] ==
+               encoding for _, _, (encoding, ), result, flags in records
+               if flags == 0 and encoding & 0x7c != 0x7c)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        Sweep('frobnicate', E5M2)
+    with pytest.raises(RuntimeError):
+        Sweep('add', BinaryFormat.from_triple(5, 15, -14))
+    # These deliver results in the operand format
+    for op in ('next_up', 'remainder', 'max_num'):
+        with pytest.raises(ValueError):
+            Sweep(op, E5M2, IEEEhalf)
+    assert Sweep('next_up', E5M2, E5M2).result_fmt is E5M2
+    with pytest.raises(ValueError):
+        read_sweep(io.BytesIO(b'not a sweep\n'))
+    output = io.BytesIO()
+    Sweep('next_up', E5M2, roundings=[ROUND_UP]).run(output, workers=1)
+    header, records = read_sweep(io.BytesIO(output.getvalue()[:-1]))
+    with pytest.raises(ValueError):
+        list(records)
+
+
+def test_main(tmp_path, capsys):
+    path = str(tmp_path / 'sweep')
+    assert main(['sqrt', 'E4M3', '--rounding', 'ROUND_UP', '--workers', '1', '-o', path]) == 0
+    assert '512 cases' in capsys.readouterr().out
+    with open(path, 'rb') as f:
+        header, records = read_sweep(f)
+        assert len(list(records)) == 512
+    assert set(OPERATIONS) >= {'add', 'sqrt', 'convert'}
+    with pytest.raises(SystemExit):
+        main(['next_up', 'E5M2', '--result-format', 'IEEEhalf', '--workers', '1'])
+    assert 'operand format' in capsys.readouterr().err
+
+
+def test_operand_table_cached():
+    assert _operand_table(E5M2) is _operand_table(E5M2)
@@ -0,0 +1,116 @@
+import io
+import json
+
+from ieee754 import *
+from ieee754.tracing import *
+
+
+def test_tracer():
+    add = BinaryFormat.add
+    records = []
+    context = Context()
+    context.set_tracer(records.append)
+    assert BinaryFormat.add is not add
+    one = IEEEdouble.from_int(1, context)
+    half = IEEEsingle.from_string('0.5', context)
+    IEEEdouble.add(one, half, context)
+    with local_context(context):
+        one.next_up()
+    # Needs precision escalations to round correctly
+    IEEEdouble.from_string('9007199254740993.' + '0' * 300 + '1', context)
+    context.set_tracer(None)
+    assert BinaryFormat.add is add
+    IEEEdouble.add(one, half, context)
+
+    assert [record.op for record in records] == [
+        OP_FROM_INT, OP_FROM_STRING, OP_ADD, OP_NEXT_UP, OP_FROM_STRING]
+    assert [record.fmt for record in records] == [
+        IEEEdouble, IEEEsingle, IEEEdouble, IEEEdouble, IEEEdouble]
+    assert records[0].operands == (1, )
+    assert records[1].operands == ('0.5', )
+    assert records[2].operands == (one, half)
+    assert records[2].operand_formats == (IEEEdouble, IEEEsingle)
+    assert records[2].precisions == (53, 24)
+    assert records[3].operands == (one, )
+    assert all(record.elapsed_ns > 0 for record in records)
+    assert [record.escalations for record in records[:4]] == [0, 0, 0, 0]
+    assert records[4].escalations > 0
+    assert records[4].escalations == context.escalations
+
+
+def test_tracer_copies():
+    add = BinaryFormat.add
+    records = []
+    context = Context()
+    context.set_tracer(records.append)
+    copy = context.copy()
+    IEEEdouble.from_int(1, copy)
+    assert [record.op for record in records] == [OP_FROM_INT]
+    # A live copy does not keep tracing switched in
+    context.set_tracer(None)
+    assert BinaryFormat.add is add
+    IEEEdouble.from_int(1, copy)
+    assert len(records) == 1
+    # Escalations are counted whether or not tracing
+    IEEEdouble.from_string('9007199254740993.' + '0' * 300 + '1', copy)
+    assert copy.escalations > 0
+
+
+def test_tracer_raise():
+    records = []
+    context = Context()
+    context.set_handler(DivisionByZero, HandlerKind.RAISE)
+    context.set_tracer(records.append)
+    try:
+        IEEEdouble.divide(IEEEdouble.make_one(False), IEEEdouble.make_zero(False), context)
+    except DivideByZero:
+        pass
+    finally:
+        context.set_tracer(None)
+    assert [record.op for record in records] == [OP_DIVIDE]
+
+
+def test_histogram():
+    histogram = LatencyHistogram(keep_slowest=2)
+    context = Context()
+    context.set_tracer(histogram)
+    one = IEEEdouble.make_one(False)
+    for n in range(10):
+        IEEEdouble.add(one, one, context)
+    IEEEdouble.from_string('1' * 2000, context)
+    context.set_tracer(None)
+
+    assert histogram.count() == 11
+    assert histogram.count(OP_ADD) == 10
+    assert histogram.count(OP_SUBTRACT) == 0
+    assert histogram.percentile(OP_SUBTRACT, 50) is None
+    assert histogram.percentile(OP_ADD, 50) <= histogram.percentile(OP_ADD, 100)
+    slowest = histogram.slowest()
+    assert len(slowest) == 2
+    assert OP_FROM_STRING in [record.op for record in slowest]
+    assert slowest[0].elapsed_ns >= slowest[1].elapsed_ns
+    histogram.reset()
+    assert histogram.count() == 0 and not histogram.slowest()
+
+
+def test_json_lines():
+    file = io.StringIO()
+    context = Context()
+    context.set_tracer(JSONLinesWriter(file))
+    value = IEEEdouble.from_string('1.5', context)
+    IEEEquad.convert(value, context)
+    context.set_tracer(JSONLinesWriter(file, min_elapsed_ns=10 ** 12))
+    IEEEquad.convert(value, context)
+    context.set_tracer(None)
+
+    lines = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]['op'] == OP_FROM_STRING and lines[0]['operands'] == ['1.5']
+    line = lines[1]
+    assert line['op'] == OP_CONVERT
+    assert line['fmt'] == [113, 16383, -16382]
+    assert line['operand_formats'] == [[53, 1023, -1022]]
+    assert line['precisions'] == [53]
+    assert line['operands'] == [str(value)]
+    assert line['elapsed_ns'] > 0
+    assert line['escalations'] == 0
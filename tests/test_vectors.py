@@ -0,0 +1,101 @@
+import os
+import pickle
+
+import pytest
+
+from ieee754 import *
+
+import conftest as vectors
+
+
+VECTORS = '''# Test format: Context LHSFormat LHS RHSFormat RHS DstFormat Status String
+E D 1.5 S 0x1p-149 S I 1.5   # A comment
+
+d H 1e-9 Q -NaN3 Q K -NaN3
+'''
+
+
+class UnpicklingFails:
+
+    def __reduce__(self):
+        return (getattr, (UnpicklingFails, 'no_such_attribute'))
+
+
+def write_vectors(tmp_path, text=VECTORS):
+    path = os.path.join(tmp_path, 'add.txt')
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def test_compile_file(tmp_path):
+    vector_file = vectors.compile_file(write_vectors(tmp_path))
+    assert vector_file.lines == ['E D 1.5 S 0x1p-149 S I 1.5',
+                                 'd H 1e-9 Q -NaN3 Q K -NaN3']
+    value, flags = vector_file.values[(IEEEsingle, '0x1p-149')]
+    assert value.fmt is IEEEsingle and value == IEEEsingle.make_smallest_subnormal(False)
+    assert flags == 0
+    value, flags = vector_file.values[(IEEEhalf, '1e-9')]
+    assert value.is_zero() and flags == Flags.UNDERFLOW | Flags.INEXACT
+    assert (IEEEquad, '-NaN3') in vector_file.values
+    # Only formats on the line; and not the codes
+    assert (IEEEquad, '1.5') not in vector_file.values
+    assert (IEEEdouble, 'I') not in vector_file.values
+
+
+def test_load(tmp_path):
+    path = write_vectors(tmp_path)
+    cached = vectors.cache_path(path)
+    assert not os.path.exists(cached)
+    vector_file = vectors.load(path)
+    assert os.path.exists(cached)
+    loaded = vectors.load(path)
+    assert loaded.lines == vector_file.lines
+    assert loaded.values.keys() == vector_file.values.keys()
+    assert loaded.values[(IEEEdouble, '1.5')][0].fmt is IEEEdouble
+
+    # Changing the file or this helper's source changes the key
+    key = vectors.cache_key(path)
+    assert vectors.cache_key(path) == key
+    paths = vectors._source_paths
+    vectors._source_paths = paths[:1]
+    try:
+        assert vectors.cache_key(path) != key
+    finally:
+        vectors._source_paths = paths
+
+    # Changing the file rebuilds the cache
+    write_vectors(tmp_path, VECTORS + 'E D 2 D 3 D K 5\n')
+    assert len(vectors.load(path).lines) == 3
+
+    # A corrupt cache is rebuilt
+    with open(cached, 'wb') as f:
+        f.write(b'junk')
+    assert len(vectors.load(path).lines) == 3
+
+    # As is one that fails to unpickle
+    with open(cached, 'wb') as f:
+        pickle.dump((vectors.cache_key(path), UnpicklingFails()), f)
+    assert len(vectors.load(path).lines) == 3
+    assert vectors.load_all(tmp_path).keys() == {'add.txt'}
+
+
+def test_shard():
+    vector_file = vectors.VectorFile([str(n) for n in range(10)], {})
+    shards = [vector_file.shard(index, 3) for index in range(3)]
+    assert sorted(sum(shards, []), key=int) == vector_file.lines
+    assert shards[1] == ['1', '4', '7']
+    with pytest.raises(ValueError):
+        vector_file.shard(3, 3)
+
+
+@pytest.mark.parametrize('spec, result', (
+    (None, (0, 1)), ('', (0, 1)), ('0/4', (0, 4)), ('3/4', (3, 4)),
+    ('4/4', ValueError), ('1', ValueError), ('a/b', ValueError),
+))
+def test_parse_shard(spec, result):
+    if result is ValueError:
+        with pytest.raises(ValueError):
+            vectors.parse_shard(spec)
+    else:
+        assert vectors.parse_shard(spec) == result